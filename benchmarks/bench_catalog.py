@@ -0,0 +1,52 @@
+"""Schema catalog cost: parse once at ingest vs. load from the store afterwards.
+
+    python -m benchmarks.bench_catalog --tables 5000
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from nl2sql import catalog as catalog_mod
+from nl2sql import config
+
+from .synth import generate_schema
+
+
+def _ms(fn):
+    start = time.perf_counter()
+    result = fn()
+    return (time.perf_counter() - start) * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tables", type=int, default=5000)
+    args = parser.parse_args()
+
+    schema = generate_schema(args.tables)
+    with tempfile.TemporaryDirectory() as tmp:
+        config.STATE_DIR = Path(tmp)
+        parse_ms, cat = _ms(lambda: catalog_mod.build_catalog(schema))
+        ingest_ms, _ = _ms(lambda: catalog_mod.load_catalog(schema))  # parse + store, what `method` pays
+        catalog_mod._loaded.clear()
+        cold_ms, stored = _ms(lambda: catalog_mod.load_catalog(schema))  # a later command, new process
+        lookup_ms, _ = _ms(lambda: stored.table(cat.names[len(cat.names) // 2]))
+        all_ms, _ = _ms(lambda: stored.tables)
+        warm_ms, _ = _ms(lambda: catalog_mod.load_catalog(schema))      # same process
+        size = sum(p.stat().st_size for p in (Path(tmp) / "catalogs").glob("*.json"))
+
+    stats = cat.stats()
+    print(f"schema: {len(schema) / 1e6:.1f} MB, {stats['tables']} tables, {stats['columns']} columns, "
+          f"{stats['foreign_keys']} FKs, {stats['checks']} checks")
+    print(f"{'parse DDL':<34} {parse_ms:>9.1f} ms")
+    print(f"{'ingest (parse + store)':<34} {ingest_ms:>9.1f} ms")
+    print(f"{'load from store (new process)':<34} {cold_ms:>9.1f} ms")
+    print(f"{'  + look up one table':<34} {lookup_ms:>9.3f} ms")
+    print(f"{'  + decode every table':<34} {all_ms:>9.1f} ms")
+    print(f"{'load again (same process)':<34} {warm_ms:>9.3f} ms")
+    print(f"{'stored catalog size':<34} {size / 1e6:>9.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Prompt tokens and latency: the schema as DDL vs. the compact notation.
+
+First the schema itself: estimated tokens of the DDL and of the compact
+text, what building the compact lines costs once per schema and what
+loading them from the store costs every later command, and how many tables
+a pruned prompt fits in the default budget. Then real `qcraft convert`
+processes against the stub LLM with SCHEMA_FORMAT=ddl and =compact, the
+stub reading the prompt at --prefill tokens/s as a local model would.
+
+    python -m benchmarks.bench_compact
+    python -m benchmarks.bench_compact --schemas schema.txt,200,2000 --runs 5 --prefill 1000
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from nl2sql import catalog as catalog_mod
+from nl2sql import compact, config
+from nl2sql.prune import DEFAULT_SCHEMA_BUDGET, estimate_tokens, prune_schema
+
+from .bench_e2e import ROOT, _invoke, _sequential, _setup
+from .stub_llm import StubConfig, StubServer
+from .synth import generate_schema
+
+# names tables of every synthetic schema, so over-budget schemas really get pruned
+QUESTION = "payments of customer orders with status Active"
+
+
+def _ms(fn):
+    start = time.perf_counter()
+    result = fn()
+    return (time.perf_counter() - start) * 1000, result
+
+
+def _sizes(label, schema):
+    with tempfile.TemporaryDirectory() as tmp:
+        config.STATE_DIR = Path(tmp)
+        catalog_mod._loaded.clear()
+        compact._loaded.clear()
+        catalog_mod.load_catalog(schema)  # what `method` already did
+        build_ms, lines = _ms(lambda: compact.compact_lines(schema))
+        compact._loaded.clear()
+        load_ms, _ = _ms(lambda: compact.compact_lines(schema))
+        ddl, ddl_info = prune_schema(schema, QUESTION)
+        dense, dense_info = prune_schema(schema, QUESTION, lines=lines)
+    full_ddl, full_dense = estimate_tokens(schema), estimate_tokens(compact.render(lines))
+    print(f"{label:<24} full: {full_ddl:>9,} -> {full_dense:>9,} tokens ({1 - full_dense / full_ddl:.0%} fewer)  "
+          f"build {build_ms:7.1f} ms once, load {load_ms:6.1f} ms")
+    if ddl_info["pruned"] or dense_info["pruned"]:
+        print(f"{'':<24} pruned to {DEFAULT_SCHEMA_BUDGET}: {len(ddl_info['tables'] or [])} tables "
+              f"({estimate_tokens(ddl):,} tokens) as DDL, {len(dense_info['tables'] or [])} tables "
+              f"({estimate_tokens(dense):,} tokens) compact")
+
+
+def _latency(label, schema, stub, runs, extra):
+    rows = {}
+    with tempfile.TemporaryDirectory() as home:
+        env = _setup(home, schema, "ollama", stub.base, 1)
+        for fmt in ("ddl", "compact"):
+            _invoke(["config", "set", "SCHEMA_FORMAT", fmt], env)
+            stub.take_records()
+            argv = lambda i: ["convert", f"{QUESTION} [bench {i}]", "--no-cache", "--no-local", *extra]
+            rows[fmt] = _sequential(stub, env, fmt, argv, runs)
+    ddl, dense = rows["ddl"]["latency_ms"]["p50"], rows["compact"]["latency_ms"]["p50"]
+    print(f"{label:<24} convert p50 {ddl:8.0f} ms (ddl) -> {dense:8.0f} ms (compact), "
+          f"{ddl - dense:7.0f} ms saved; failed runs {rows['ddl']['failed_runs']}/{rows['compact']['failed_runs']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--schemas", default="schema.txt,200,2000",
+                        help="comma separated: files (relative to the repo) or table counts for synthetic schemas")
+    parser.add_argument("--runs", type=int, default=5, help="convert invocations per schema and format")
+    parser.add_argument("--prefill", type=float, default=1000.0, help="stub prompt tokens read per second")
+    parser.add_argument("--latency", type=float, default=0.2, help="stub seconds before the first token")
+    args = parser.parse_args()
+
+    schemas = []
+    for spec in (s.strip() for s in args.schemas.split(",") if s.strip()):
+        if spec.isdigit():
+            schemas.append((f"synthetic {spec} tables", generate_schema(int(spec))))
+        else:
+            schemas.append((spec, (ROOT / spec).read_text()))
+    print("schema tokens (estimated at 4 characters per token)")
+    for label, schema in schemas:
+        _sizes(label, schema)
+    print(f"\nlatency, stub reading prompts at {args.prefill:.0f} tokens/s "
+          f"(full schema up to 200 tables, pruned to the default budget beyond)")
+    stub = StubServer(StubConfig(latency=args.latency, tokens_per_sec=200, completion_tokens=20,
+                                 prefill_tokens_per_sec=args.prefill)).start()
+    try:
+        for label, schema in schemas:
+            full = len(catalog_mod.build_catalog(schema)) <= 200
+            _latency(label + (" full" if full else ""), schema, stub, args.runs, ["--full-schema"] if full else [])
+    finally:
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
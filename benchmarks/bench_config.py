@@ -0,0 +1,91 @@
+"""Config writes and reads with a large schema: inline vs. the schema store.
+
+With a synthetic schema of --tables tables, compares the old layout (the
+schema escaped inline in ~/.mycli_config) against the store (the config
+holds a hash): the cost of one small `set_config` as convert does after
+every answer, the start of a `qcraft config get TYPE` process, what
+`qcraft config list` prints, and switching schemas with `qcraft use`
+against ingesting the file again with `qcraft method --extract`.
+
+    python -m benchmarks.bench_config
+    python -m benchmarks.bench_config --tables 10000 --runs 20
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from nl2sql import config
+
+from .bench_e2e import ROOT, _invoke
+from .synth import generate_schema
+
+
+def _median_ms(fn, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def _inline_write(data):
+    # what set_config did before the store: re-read the whole file, write it all back
+    with config._locked():
+        current = config._parse(config.CONFIG_FILE.read_text())
+        current.update(data)
+        config._replace(config.CONFIG_FILE, config._serialize(current))
+
+
+def _output_bytes(argv, env):
+    return len(subprocess.run([sys.executable, "-m", "nl2sql.cli", *argv], env=env, cwd=ROOT,
+                              capture_output=True).stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tables", type=int, default=10_000)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+    schema = generate_schema(args.tables)
+    print(f"{args.tables:,} tables, {len(schema) / 1e6:.1f} MB of DDL")
+
+    with tempfile.TemporaryDirectory() as home:
+        env = dict(os.environ, HOME=home, USERPROFILE=home, PYTHONPATH=str(ROOT))
+        config.CONFIG_FILE = Path(home) / ".mycli_config"
+        inline = {"TYPE": "sqlite", "SCHEMA": schema, "DEFAULT_PROVIDER": "ollama", "REC_OUTPUT": None}
+        config.CONFIG_FILE.write_text(config._serialize(inline))
+        rows = {"inline": {}, "store": {}}
+        rows["inline"]["set"] = _median_ms(lambda: _inline_write({"REC_OUTPUT": "SELECT 1"}), args.runs)
+        rows["inline"]["get"] = statistics.median(_invoke(["config", "get", "TYPE"], env)[0] * 1000
+                                                  for _ in range(args.runs // 4 or 1))
+        # `config list` printed every value as it was, the schema with it
+        rows["inline"]["list"] = sum(len(f"  {k}: {v}\n") for k, v in inline.items())
+
+        config.save_config(inline)  # the same settings, schema in the store
+        rows["store"]["set"] = _median_ms(lambda: config.set_config("REC_OUTPUT", "SELECT 1"), args.runs)
+        rows["store"]["get"] = statistics.median(_invoke(["config", "get", "TYPE"], env)[0] * 1000
+                                                 for _ in range(args.runs // 4 or 1))
+        rows["store"]["list"] = _output_bytes(["config", "list"], env)
+        for label, row in rows.items():
+            print(f"{label:<7} set_config {row['set']:8.2f} ms   qcraft config get TYPE {row['get']:7.1f} ms   "
+                  f"config list prints {row['list']:>11,} bytes")
+
+        for name, text in (("warehouse", schema), ("app", generate_schema(50, seed=1))):
+            path = Path(home) / f"{name}.sql"
+            path.write_text(text)
+            _invoke(["method", "--name", name, "--extract", str(path)], env)
+        extract = _invoke(["method", "--extract", str(Path(home) / "warehouse.sql")], env)[0] * 1000
+        _invoke(["use", "app"], env)
+        use = statistics.median(_invoke(["use", name], env)[0] * 1000
+                                for name in ("warehouse", "app") * (args.runs // 8 or 1))
+        print(f"switch schema: qcraft use {use:7.1f} ms   vs qcraft method --extract again {extract:9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Cold CLI vs. `qcraft serve`-backed latency of convert / assist.
+
+Runs the same real `qcraft` processes as bench_e2e against the stub LLM,
+first with no daemon (every call imports the SDK, parses the config and
+opens its connections) and then with `qcraft serve` running in the same
+HOME, so the commands forward to it. The stub's own time is reported as
+server time; the rest is what each mode costs around the model.
+
+    python -m benchmarks.bench_daemon
+    python -m benchmarks.bench_daemon --schemas 2000 --providers ollama --runs 30 --json
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from .bench_e2e import QUESTION, ROOT, _concurrent, _sequential, _setup
+from .stub_llm import StubConfig, StubServer
+from .synth import generate_schema
+
+
+def _start_daemon(env, home):
+    info = Path(home) / ".qcraft" / "daemon.json"
+    proc = subprocess.Popen([sys.executable, "-m", "nl2sql.cli", "serve"], env=env, cwd=ROOT,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT)
+    deadline = time.monotonic() + 30
+    while not info.exists():
+        if proc.poll() is not None or time.monotonic() > deadline:
+            proc.kill()
+            raise RuntimeError("qcraft serve did not start")
+        time.sleep(0.05)
+    return proc
+
+
+def _scenarios(stub, env, runs, concurrency, extra):
+    return [
+        _sequential(stub, env, "convert", lambda i: ["convert", f"{QUESTION} [bench {i}]", *extra], runs),
+        _sequential(stub, env, "assist explain", lambda i: ["assist", "explain", *extra], runs),
+        _concurrent(stub, env, f"convert x{concurrency} processes",
+                    lambda i: ["convert", f"{QUESTION} [bench {i}]", *extra], runs, concurrency),
+    ]
+
+
+def run(schemas, providers, runs, concurrency, stub_config):
+    stub = StubServer(stub_config).start()
+    results = []
+    try:
+        for spec in schemas:
+            schema_text = (ROOT / spec).read_text() if not spec.isdigit() else generate_schema(int(spec))
+            label = spec if not spec.isdigit() else f"synthetic {spec} tables"
+            for provider in providers:
+                with tempfile.TemporaryDirectory() as home:
+                    env = _setup(home, schema_text, provider, stub.base, concurrency)
+                    stub.take_records()
+                    cold = _scenarios(stub, env, runs, concurrency, ["--no-cache"])
+                    daemon = _start_daemon(env, home)
+                    try:
+                        warm = _scenarios(stub, env, runs, concurrency, ["--no-cache"])
+                    finally:
+                        daemon.terminate()
+                        daemon.wait(10)
+                    for mode, scenarios in (("cold", cold), ("daemon", warm)):
+                        for scenario in scenarios:
+                            scenario.update(mode=mode, schema=label, schema_bytes=len(schema_text),
+                                            provider=provider)
+                            results.append(scenario)
+    finally:
+        stub.stop()
+    return results
+
+
+def _print_table(results):
+    print(f"{'schema':<24} {'provider':<8} {'scenario':<28} {'mode':<7} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'server':>8} {'overhd':>8} {'req/s':>7} {'fail':>4}")
+    for r in results:
+        lat, srv, ovh = r["latency_ms"], r["server_ms"], r["overhead_ms"]
+        print(f"{r['schema'][:24]:<24} {r['provider']:<8} {r['scenario'][:28]:<28} {r['mode']:<7} "
+              f"{lat['p50']:>8.1f} {lat['p95']:>8.1f} {srv['p50']:>8.1f} {ovh['p50']:>8.1f} "
+              f"{r['throughput_rps'] or 0:>7.2f} {r['failed_runs']:>4}")
+    cold = {(r["schema"], r["provider"], r["scenario"]): r for r in results if r["mode"] == "cold"}
+    for r in results:
+        before = cold.get((r["schema"], r["provider"], r["scenario"]))
+        if r["mode"] == "daemon" and before:
+            print(f"{r['schema'][:24]:<24} {r['provider']:<8} {r['scenario'][:28]:<28} p50 "
+                  f"{before['latency_ms']['p50']:.0f} -> {r['latency_ms']['p50']:.0f} ms "
+                  f"({before['latency_ms']['p50'] / r['latency_ms']['p50']:.2f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--schemas", default="schema.txt,2000",
+                        help="comma separated: files (relative to the repo) or table counts for synthetic schemas")
+    parser.add_argument("--providers", default="ollama,free", help="ollama/lmstudio/openai (OpenAI API) and/or free")
+    parser.add_argument("--runs", type=int, default=10, help="invocations per scenario and mode")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.2, help="stub seconds before the first token")
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--tokens-per-sec", type=float, default=80.0)
+    parser.add_argument("--completion-tokens", type=int, default=30)
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args()
+
+    stub_config = StubConfig(args.latency, args.jitter, args.tokens_per_sec, args.completion_tokens)
+    results = run([s.strip() for s in args.schemas.split(",") if s.strip()],
+                  [p.strip() for p in args.providers.split(",") if p.strip()],
+                  args.runs, args.concurrency, stub_config)
+    if args.json:
+        print(json.dumps({"python": platform.python_version(), "platform": platform.platform(),
+                          "stub": {k: v for k, v in vars(stub_config).items() if k != "random"},
+                          "runs": args.runs, "concurrency": args.concurrency, "results": results}, indent=2))
+    else:
+        _print_table(results)
+    sys.exit(0 if all(r["failed_runs"] == 0 for r in results) else 1)
+
+
+if __name__ == "__main__":
+    main()
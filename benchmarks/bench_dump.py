@@ -0,0 +1,107 @@
+"""Extracting the DDL from large SQL dumps: time and peak memory.
+
+Writes synthetic pg_dump-style (COPY blocks), pg_dump --inserts-style (one
+INSERT per row) and mysqldump-style (extended INSERTs) dumps of a 200-table schema plus data, at each of --sizes, then
+runs the extractor on each in a fresh process and reports MB/s and peak
+RSS. The old `open(path).read()` is run on the dumps up to --read-limit for
+comparison.
+
+    python -m benchmarks.bench_dump
+    python -m benchmarks.bench_dump --sizes 256,1024,4096 --dir /var/tmp
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from .bench_e2e import _RSS_UNIT, ROOT
+from .synth import generate_schema
+
+_MB = 1024 * 1024
+
+
+def _ddl():
+    return [s.strip() + ";" for s in generate_schema(200).split(";") if s.strip()]
+
+
+def _write_dump(path, style, size_mb):
+    ddl = _ddl()
+    names = [s.split()[2] for s in ddl]
+    row = "{i}\tsome text; with a semicolon\t2024-01-{d:02d}\t{i}.50\tTrue\n"
+    value = "({i},'it\\'s; text',\'2024-01-{d:02d}\',{i}.50,1)"
+    with open(path, "w") as f:
+        f.write("SET standard_conforming_strings = on;\n\n" if style != "mysql" else "/*!40101 SET NAMES utf8mb4 */;\n\n")
+        f.write("\n\n".join(ddl) + "\n\n")
+        target, t = size_mb * _MB, 0
+        while f.tell() < target:
+            table = names[t % len(names)]
+            t += 1
+            if style == "inserts":
+                f.write("".join(f"INSERT INTO {table} VALUES ({i}, 'it''s; text', '2024-01-{i % 28 + 1:02d}', "
+                                f"{i}.50, true);\n" for i in range(20_000)))
+            elif style == "pg":
+                block = "".join(row.format(i=i, d=i % 28 + 1) for i in range(20_000))
+                f.write(f"COPY {table} FROM stdin;\n{block}\\.\n\n")
+            else:
+                for _ in range(20):
+                    values = ",".join(value.format(i=i, d=i % 28 + 1) for i in range(1_000))
+                    f.write(f"INSERT INTO `{table}` VALUES {values};\n")
+    return len(ddl)
+
+
+def _child(mode, path):
+    start = time.perf_counter()
+    if mode == "read":
+        with open(path, "r") as f:
+            kept = len(f.read())
+    else:
+        from nl2sql.dump import extract_ddl
+        ddl, info = extract_ddl(path)
+        kept = info["statements"]
+    print(time.perf_counter() - start, kept)
+
+
+def _run(mode, path):
+    proc = subprocess.Popen([sys.executable, "-m", "benchmarks.bench_dump", "--child", mode, str(path)],
+                            cwd=ROOT, env=dict(os.environ, PYTHONPATH=str(ROOT)), stdout=subprocess.PIPE)
+    out = proc.stdout.read().decode()
+    proc.stdout.close()
+    _, status, usage = os.wait4(proc.pid, 0)
+    if os.waitstatus_to_exitcode(status) != 0:
+        return None
+    seconds, kept = out.split()
+    return float(seconds), int(kept), usage.ru_maxrss * _RSS_UNIT / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="256,2048", help="comma separated dump sizes in MB")
+    parser.add_argument("--styles", default="pg,inserts,mysql")
+    parser.add_argument("--read-limit", type=int, default=512, help="largest dump (MB) the old full read is run on")
+    parser.add_argument("--dir", default=None, help="where the dumps are written (default: the temp dir)")
+    parser.add_argument("--child", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return _child(*args.child)
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        for style in args.styles.split(","):
+            for size in (int(s) for s in args.sizes.split(",")):
+                path = Path(tmp) / f"{style}-{size}.sql"
+                tables = _write_dump(path, style, size)
+                mb = path.stat().st_size / _MB
+                seconds, kept, rss = _run("extract", path)
+                line = (f"{style:<6} {mb:7,.0f} MB  extract {seconds:6.2f} s ({mb / seconds:6,.0f} MB/s), "
+                        f"peak RSS {rss:6.1f} MB, {kept}/{tables} statements kept")
+                if size <= args.read_limit:
+                    read = _run("read", path)
+                    line += f"  | read(): {read[0]:5.2f} s, peak RSS {read[2]:7.1f} MB" if read else "  | read(): failed"
+                print(line, flush=True)
+                path.unlink()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""End-to-end latency and throughput of convert / assist against a local stub LLM.
+
+Every run is a real `qcraft` process talking to benchmarks.stub_llm over
+loopback, so the numbers include interpreter startup, config and catalog
+loading, prompt building, validation and output. The stub times each
+request it serves; what the CLI spends around that is reported as overhead.
+
+    python -m benchmarks.bench_e2e                              # schema.txt and a 2000-table schema
+    python -m benchmarks.bench_e2e --schemas 500,5000 --providers ollama --runs 50 --concurrency 16
+    python -m benchmarks.bench_e2e --error-rate 0.1 --json > before.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from nl2sql.batch import percentile
+
+from .stub_llm import StubConfig, StubServer
+from .synth import generate_schema
+
+ROOT = Path(__file__).resolve().parent.parent
+QUESTION = "show every row of the first table"
+_RSS_UNIT = 1 if sys.platform == "darwin" else 1024  # ru_maxrss is bytes on macOS, KiB elsewhere
+
+
+def _union(intervals):
+    # seconds covered by at least one request, overlapping requests count once
+    total, end = 0.0, None
+    for start, stop in sorted(intervals):
+        if end is None or start > end:
+            total, end = total + stop - start, stop
+        elif stop > end:
+            total, end = total + stop - end, stop
+    return total
+
+
+def _invoke(argv, env):
+    """Run one qcraft command; returns (seconds, peak RSS in MB or None, ok)."""
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-m", "nl2sql.cli", *argv], env=env, cwd=ROOT,
+                            stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    out = proc.stdout.read()
+    proc.stdout.close()
+    rss = None
+    if hasattr(os, "wait4"):
+        _, status, usage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        rss = usage.ru_maxrss * _RSS_UNIT / 1e6
+    else:
+        proc.wait()
+    seconds = time.perf_counter() - start
+    return seconds, rss, proc.returncode == 0 and b"Error:" not in out
+
+
+def _stats(ms):
+    if not ms:
+        return None
+    return {"p50": round(percentile(ms, 50), 2), "p95": round(percentile(ms, 95), 2),
+            "p99": round(percentile(ms, 99), 2), "mean": round(sum(ms) / len(ms), 2)}
+
+
+def _summary(name, runs, wall, records, requests_total, failures):
+    # runs: (wall_s, server_s, rss_mb) per invocation
+    latency = [r[0] * 1000 for r in runs]
+    server = [r[1] * 1000 for r in runs]
+    rss = [r[2] for r in runs if r[2] is not None]
+    return {
+        "scenario": name,
+        "runs": len(runs),
+        "failed_runs": failures,
+        "requests": requests_total,
+        "injected_errors": sum(r["status"] != 200 for r in records),
+        "cached_prompt_tokens": sum(r.get("cached_tokens", 0) for r in records),
+        "latency_ms": _stats(latency),
+        "server_ms": _stats(server),
+        "overhead_ms": _stats([a - b for a, b in zip(latency, server)]),
+        "throughput_rps": round(len(runs) / wall, 3) if wall else None,
+        "peak_rss_mb": round(max(rss), 1) if rss else None,
+    }
+
+
+def _sequential(stub, env, name, argv_for, runs):
+    results, records, failures = [], [], 0
+    start = time.perf_counter()
+    for i in range(runs):
+        seconds, rss, ok = _invoke(argv_for(i), env)
+        mine = stub.take_records()
+        records += mine
+        failures += not ok
+        results.append((seconds, _union([(r["start"], r["end"]) for r in mine]), rss))
+    return _summary(name, results, time.perf_counter() - start, records, len(records), failures)
+
+
+def _concurrent(stub, env, name, argv_for, runs, concurrency):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        outcomes = list(pool.map(lambda i: _invoke(argv_for(i), env), range(runs)))
+    wall = time.perf_counter() - start
+    records = stub.take_records()
+    by_tag = {}
+    for r in records:
+        by_tag.setdefault(r["tag"], []).append((r["start"], r["end"]))
+    results = [(seconds, _union(by_tag.get(i, [])), rss) for i, (seconds, rss, _) in enumerate(outcomes)]
+    return _summary(name, results, wall, records, len(records), sum(not ok for _, _, ok in outcomes))
+
+
+def _batch(stub, env, home, runs, concurrency):
+    questions = Path(home) / "questions.txt"
+    questions.write_text("".join(f"{QUESTION} [bench {i}]\n" for i in range(runs)))
+    out = Path(home) / "questions.results.jsonl"
+    out.unlink(missing_ok=True)
+    seconds, rss, ok = _invoke(["convert", "--batch", str(questions), "--out", str(out), "--no-cache",
+                                "--concurrency", str(concurrency)], env)
+    records = stub.take_records()
+    server = _union([(r["start"], r["end"]) for r in records])
+    result = _summary(f"convert --batch x{runs} ({concurrency} at a time)", [(seconds, server, rss)], seconds,
+                      records, len(records), int(not ok))
+    # one process, so per-question latency comes from the results file
+    latencies = [json.loads(line)["latency"] * 1000 for line in out.read_text().splitlines() if line.strip()] \
+        if out.exists() else []
+    result["question_latency_ms"] = _stats(latencies)
+    result["throughput_rps"] = round(len(latencies) / seconds, 3) if seconds else None
+    return result
+
+
+def _setup(home, schema_text, provider, base, concurrency):
+    env = dict(os.environ, HOME=home, USERPROFILE=home, PYTHONPATH=str(ROOT))
+    schema_file = Path(home) / "schema.sql"
+    schema_file.write_text(schema_text)
+    _invoke(["method", "--extract", str(schema_file)], env)  # builds the catalog and validation DB once
+    settings = {"TYPE": "sqlite", "DEFAULT_PROVIDER": provider, "DEFAULT_MODEL": "stub",
+                "OLLAMA_BASE_URL": base + "/v1", "LMSTUDIO_BASE_URL": base + "/v1",
+                "OPENAI_BASE_URL": base + "/v1", "API_KEY": "stub", "FREE_URL": base + "/api/chat",
+                f"{provider.upper()}_CONCURRENCY": str(concurrency)}
+    for key, value in settings.items():
+        _invoke(["config", "set", key, value], env)
+    return env
+
+
+def run(schemas, providers, runs, concurrency, stub_config, stream=False):
+    stub = StubServer(stub_config).start()
+    results = []
+    try:
+        for spec in schemas:
+            schema_text = (ROOT / spec).read_text() if not spec.isdigit() else generate_schema(int(spec))
+            label = spec if not spec.isdigit() else f"synthetic {spec} tables"
+            for provider in providers:
+                with tempfile.TemporaryDirectory() as home:
+                    env = _setup(home, schema_text, provider, stub.base, concurrency)
+                    extra = ["--no-cache"] + (["--stream"] if stream and provider != "free" else [])
+                    stub.take_records()
+                    scenarios = [
+                        _sequential(stub, env, "convert", lambda i: ["convert", f"{QUESTION} [bench {i}]", *extra],
+                                    runs),
+                        _sequential(stub, env, "assist retry",
+                                    lambda i: ["assist", "retry", f"[bench {i}] wrong table", *extra], runs),
+                        _sequential(stub, env, "assist explain", lambda i: ["assist", "explain", *extra], runs),
+                        _concurrent(stub, env, f"convert x{concurrency} processes",
+                                    lambda i: ["convert", f"{QUESTION} [bench {i}]", *extra], runs, concurrency),
+                        _batch(stub, env, home, runs, concurrency),
+                    ]
+                    for scenario in scenarios:
+                        scenario.update(schema=label, schema_bytes=len(schema_text), provider=provider)
+                        results.append(scenario)
+    finally:
+        stub.stop()
+    return results
+
+
+def _print_table(results):
+    print(f"{'schema':<24} {'provider':<8} {'scenario':<36} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'server':>8} {'overhd':>8} {'req/s':>7} {'RSS MB':>7} {'fail':>4}")
+    for r in results:
+        lat, srv, ovh = r["latency_ms"], r["server_ms"], r["overhead_ms"]
+        print(f"{r['schema'][:24]:<24} {r['provider']:<8} {r['scenario'][:36]:<36} {lat['p50']:>8.1f} "
+              f"{lat['p95']:>8.1f} {lat['p99']:>8.1f} {srv['p50']:>8.1f} {ovh['p50']:>8.1f} "
+              f"{r['throughput_rps'] or 0:>7.2f} {r['peak_rss_mb'] or 0:>7.1f} {r['failed_runs']:>4}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--schemas", default="schema.txt,2000",
+                        help="comma separated: files (relative to the repo) or table counts for synthetic schemas")
+    parser.add_argument("--providers", default="ollama,free", help="ollama/lmstudio/openai (OpenAI API) and/or free")
+    parser.add_argument("--runs", type=int, default=10, help="invocations per scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--stream", action="store_true", help="pass --stream to the OpenAI-compatible runs")
+    parser.add_argument("--latency", type=float, default=0.2, help="stub seconds before the first token")
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--tokens-per-sec", type=float, default=80.0)
+    parser.add_argument("--completion-tokens", type=int, default=30)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of stub requests that fail")
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--prefix-cache", action="store_true", help="stub reuses cached prompt prefixes")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args()
+
+    stub_config = StubConfig(args.latency, args.jitter, args.tokens_per_sec, args.completion_tokens,
+                             args.error_rate, args.error_status, prefix_cache=args.prefix_cache)
+    results = run([s.strip() for s in args.schemas.split(",") if s.strip()],
+                  [p.strip() for p in args.providers.split(",") if p.strip()],
+                  args.runs, args.concurrency, stub_config, args.stream)
+    if args.json:
+        report = {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "stub": {k: v for k, v in vars(stub_config).items() if k != "random"},
+            "runs": args.runs,
+            "concurrency": args.concurrency,
+            "results": results,
+        }
+        print(json.dumps(report, indent=2))
+    else:
+        _print_table(results)
+    sys.exit(0 if all(r["failed_runs"] == 0 for r in results) or args.error_rate else 1)
+
+
+if __name__ == "__main__":
+    main()
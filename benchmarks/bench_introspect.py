@@ -0,0 +1,83 @@
+"""Reading the schema from a SQLite database, and refreshing it.
+
+Builds a SQLite file with a synthetic schema, then times real `qcraft
+method` processes: the first --from-sqlite (read, catalog, validation DB),
+a --refresh with nothing changed (only the schema version is compared), and
+a --refresh after one table was added. Also times the in-process read of
+the database alone.
+
+    python -m benchmarks.bench_introspect
+    python -m benchmarks.bench_introspect --tables 10000 --runs 5
+"""
+import argparse
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from nl2sql.introspect import read_sqlite, sqlite_fingerprint
+from nl2sql.validate import sqlite_script
+
+from .bench_e2e import ROOT, _invoke
+from .synth import generate_schema
+
+
+def _build(path, n_tables):
+    conn = sqlite3.connect(path)
+    conn.executescript("BEGIN;\n" + sqlite_script(generate_schema(n_tables)) + "\nCOMMIT;")
+    conn.close()
+
+
+def _ms(fn):
+    start = time.perf_counter()
+    result = fn()
+    return (time.perf_counter() - start) * 1000, result
+
+
+def _timed(argv, env, runs):
+    times = []
+    for _ in range(runs):
+        seconds, _, ok = _invoke(argv, env)
+        if not ok:
+            raise SystemExit(f"qcraft {' '.join(argv)} failed")
+        times.append(seconds * 1000)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tables", type=int, default=10_000)
+    parser.add_argument("--runs", type=int, default=5, help="invocations per measurement (median reported)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as home:
+        env = dict(os.environ, HOME=home, USERPROFILE=home, PYTHONPATH=str(ROOT))
+        db = Path(home) / "warehouse.db"
+        start = time.perf_counter()
+        _build(db, args.tables)
+        print(f"{args.tables:,} tables in {db.stat().st_size / 1e6:.1f} MB, built in {time.perf_counter() - start:.1f} s")
+
+        read_ms, (ddl, _) = _ms(lambda: read_sqlite(db))
+        fingerprint_ms, _ = _ms(lambda: sqlite_fingerprint(db))
+        print(f"in process: read_sqlite {read_ms:8.1f} ms ({len(ddl) / 1e6:.1f} MB of DDL), "
+              f"sqlite_fingerprint {fingerprint_ms:6.2f} ms")
+
+        first = _timed(["method", "--from-sqlite", str(db)], env, 1)
+        unchanged = _timed(["method", "--refresh"], env, args.runs)
+        version = _timed(["config", "get", "TYPE"], env, args.runs)  # bare process start, for reference
+        changed = []
+        for i in range(args.runs):
+            conn = sqlite3.connect(db)
+            conn.execute(f"CREATE TABLE bench_added_{i} (id INTEGER PRIMARY KEY, note TEXT)")
+            conn.close()
+            changed.append(_timed(["method", "--refresh"], env, 1))
+        print(f"qcraft method --from-sqlite (first read):  {first:9.1f} ms")
+        print(f"qcraft method --refresh, unchanged:        {unchanged:9.1f} ms  "
+              f"(qcraft config get alone: {version:.1f} ms)")
+        print(f"qcraft method --refresh, one table added:  {statistics.median(changed):9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
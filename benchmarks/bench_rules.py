@@ -0,0 +1,80 @@
+"""Time the local rules that answer simple questions without a model.
+
+Runs rules.generate over questions on schema.txt and on a synthetic schema
+(templated per table: filters, CHECK values, counts, top-N, one FK join),
+with the catalog already loaded as convert has it, and reports how many
+were answered locally and how long a local answer or a fall-through takes.
+
+    python -m benchmarks.bench_rules --tables 2000
+"""
+import argparse
+import random
+import time
+
+from nl2sql.batch import percentile
+from nl2sql.catalog import build_catalog
+from nl2sql.rules import generate
+
+from .bench_e2e import ROOT
+from .synth import generate_schema
+
+SCHEMA_QUESTIONS = [
+    "show all customers", "customers in state CA", "how many orders are shipped", "count orders by status",
+    "average price of products", "products with price over 100", "orders not cancelled",
+    "top 5 products by price", "count shipped orders by customer state", "emails of customers",
+    "products in category Books sorted by price desc", "delivered orders with total amount at least 500",
+    # for the model
+    "which customers have never ordered", "best selling product last month", "revenue per month this year",
+    "customers with more than 3 orders",
+]
+
+
+def _synthetic_questions(catalog, rng, n):
+    questions = []
+    names = list(catalog.names)
+    while len(questions) < n:
+        table = catalog.table(rng.choice(names))
+        label = table.name.replace("_", " ")
+        status = table.column("status")
+        numeric = [c.name for c in table.columns if c.type.upper().startswith(("INT", "DECIMAL"))]
+        templates = [f"all {label}", f"how many {label}", f"{label} which were merged last week"]
+        if status:
+            templates += [f"{label} with status {rng.choice(status.check_values)}", f"count {label} by status"]
+        if numeric:
+            templates += [f"top 5 {label} by {rng.choice(numeric).replace('_', ' ')}",
+                          f"{label} with {rng.choice(numeric).replace('_', ' ')} over {rng.randint(1, 999)}"]
+        for fk in table.foreign_keys:
+            templates.append(f"{label} of {fk.ref_table.replace('_', ' ')} with {fk.ref_table.replace('_', ' ')} "
+                             f"id {rng.randint(1, 99)}")
+        questions.append(rng.choice(templates))
+    return questions
+
+
+def _run(label, catalog, questions, query_type):
+    local_ms, model_ms = [], []
+    for question in questions:
+        start = time.perf_counter()
+        sql = generate(catalog, question, query_type)
+        (local_ms if sql else model_ms).append((time.perf_counter() - start) * 1000)
+    print(f"{label:<28} {len(local_ms)}/{len(questions)} answered locally")
+    for name, ms in (("local answer", local_ms), ("fall through", model_ms)):
+        if ms:
+            print(f"  {name:<26} p50 {percentile(ms, 50):7.3f} ms  p95 {percentile(ms, 95):7.3f} ms  "
+                  f"p99 {percentile(ms, 99):7.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tables", type=int, default=2000, help="tables in the synthetic schema")
+    parser.add_argument("--questions", type=int, default=2000, help="questions asked of the synthetic schema")
+    parser.add_argument("--type", default="postgres", help="query type")
+    args = parser.parse_args()
+
+    _run("schema.txt", build_catalog((ROOT / "schema.txt").read_text()), SCHEMA_QUESTIONS * 20, args.type)
+    catalog = build_catalog(generate_schema(args.tables))
+    questions = _synthetic_questions(catalog, random.Random(0), args.questions)
+    _run(f"synthetic {args.tables} tables", catalog, questions, args.type)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Near-duplicate question lookups against a large similarity index.
+
+Fills a fresh cache with synthetic questions, then times find_similar for
+reworded copies of stored questions (should hit) and for questions that
+only differ in a value (must miss), plus what indexing one question costs.
+
+    python -m benchmarks.bench_similar --entries 100000
+"""
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from nl2sql.batch import percentile
+from nl2sql.cache import ResponseCache
+
+SUBJECTS = ["orders", "customers", "invoices", "payments", "shipments", "products", "refunds", "tickets",
+            "employees", "suppliers", "reviews", "sessions"]
+FILTERS = ["created after {n}", "with total under {n}$", "with more than {n} items", "in region {n}",
+           "placed by customer {n}", "with status code {n}", "older than {n} days", "rated below {n}"]
+EXTRAS = ["", " sorted by date", " grouped by month", " with their owner", " per country", " top 10"]
+# rewordings that keep the meaning (and every value)
+REWORD = [("under", "below"), ("more than", "over"), ("below", "less than"), ("orders", "order"),
+          ("sorted by", "sorted by the")]
+
+
+def _question(rng, i):
+    # the running number keeps every stored question distinct
+    return f"{rng.choice(SUBJECTS)} {rng.choice(FILTERS).format(n=i)}{rng.choice(EXTRAS)}"
+
+
+def _reworded(question):
+    for a, b in REWORD:
+        if a in question:
+            return "show me all " + question.replace(a, b, 1)
+    return "please list " + question.upper()
+
+
+def _timed(fn, items):
+    ms, results = [], []
+    for item in items:
+        start = time.perf_counter()
+        results.append(fn(item))
+        ms.append((time.perf_counter() - start) * 1000)
+    return ms, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=100_000)
+    parser.add_argument("--lookups", type=int, default=1000)
+    parser.add_argument("--threshold", type=float, default=0.8)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    questions = [_question(rng, i) for i in range(args.entries)]
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ResponseCache(Path(tmp) / "cache.db", max_similar=args.entries)
+        start = time.perf_counter()
+        for i, question in enumerate(questions):
+            cache.put_similar("bench", question, f"SELECT {i}", 100, 20)
+        fill = time.perf_counter() - start
+        sample = rng.sample(range(args.entries), min(args.lookups, args.entries))
+        hit_ms, found = _timed(lambda i: cache.find_similar("bench", _reworded(questions[i]), args.threshold),
+                               sample)
+        hits = sum(f is not None and f[0] == f"SELECT {i}" for f, i in zip(found, sample))
+        # same wording, another value: must never reuse the stored answer
+        miss_ms, wrong = _timed(lambda i: cache.find_similar("bench", questions[i].replace(str(i), str(i) + "7"),
+                                                             args.threshold), sample)
+        false_hits = sum(f is not None for f in wrong)
+        size = (Path(tmp) / "cache.db").stat().st_size
+
+    print(f"index: {args.entries} questions, {size / 1e6:.1f} MB on disk, "
+          f"filled at {args.entries / fill:,.0f} questions/s ({fill / args.entries * 1000:.2f} ms each)")
+    for label, ms in (("reworded lookup", hit_ms), ("different value lookup", miss_ms)):
+        print(f"{label:<24} p50 {percentile(ms, 50):7.3f} ms  p95 {percentile(ms, 95):7.3f} ms  "
+              f"p99 {percentile(ms, 99):7.3f} ms")
+    print(f"reworded questions answered: {hits}/{len(sample)}, wrong value answered: {false_hits}/{len(sample)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Startup cost per subcommand, measured with `python -X importtime`.
+
+Each subcommand runs in a fresh interpreter against a throwaway HOME. The run
+fails (exit 1) when a subcommand imports a module it should not need, or
+when its total import time goes over its budget.
+
+    python -m benchmarks.bench_startup            # table + pass/fail
+    python -m benchmarks.bench_startup --json     # machine-readable
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+HEAVY = ("openai", "requests", "httpx", "pyperclip", "nl2sql.tutorial_system", "nl2sql.llm", "rich.progress")
+
+# (argv, import budget in ms, modules that must not be imported)
+SUBCOMMANDS = [
+    (["config", "get", "TYPE"], 150, HEAVY + ("sqlite3", "nl2sql.cache", "nl2sql.catalog")),
+    (["config", "set", "TYPE", "sqlite"], 150, HEAVY + ("sqlite3", "nl2sql.cache", "nl2sql.catalog")),
+    (["config", "list"], 150, HEAVY + ("sqlite3", "nl2sql.cache", "nl2sql.catalog")),
+    (["query-type", "sqlite"], 150, HEAVY + ("sqlite3", "nl2sql.cache", "nl2sql.catalog")),
+    (["use"], 150, HEAVY + ("sqlite3", "nl2sql.cache", "nl2sql.catalog")),
+    (["convert", "--help"], 150, HEAVY),
+    (["assist", "--help"], 150, HEAVY),
+    (["cache", "stats"], 200, HEAVY),
+    (["tutorial", "--help"], 150, HEAVY),
+]
+
+
+def parse_importtime(stderr):
+    """{module: cumulative_us} plus the total over top-level imports."""
+    modules, total = {}, 0
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        if not cumulative.strip().isdigit():
+            continue  # header line
+        us = int(cumulative)
+        modules[name.strip()] = us
+        if not name[1:].startswith(" "):
+            total += us
+    return modules, total
+
+
+def measure(argv, home):
+    env = dict(os.environ, HOME=home, USERPROFILE=home)
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-m", "nl2sql.cli", *argv],
+                          env=env, capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    modules, total = parse_importtime(proc.stderr)
+    return {"argv": argv, "returncode": proc.returncode, "import_ms": total / 1000, "wall_ms": wall * 1000,
+            "modules": modules}
+
+
+def run(subcommands=SUBCOMMANDS):
+    results = []
+    with tempfile.TemporaryDirectory() as home:
+        with open(os.path.join(home, ".mycli_config"), "w") as f:
+            f.write("SCHEMA=CREATE TABLE t (id INT);\nTYPE=sqlite")
+        for argv, budget, forbidden in subcommands:
+            result = measure(argv, home)
+            result["budget_ms"] = budget
+            result["forbidden"] = sorted(m for m in result.pop("modules")
+                                         if any(m == f or m.startswith(f + ".") for f in forbidden))
+            result["ok"] = result["returncode"] == 0 and not result["forbidden"] and result["import_ms"] <= budget
+            results.append(result)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+    results = run()
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'subcommand':<28} {'import ms':>10} {'budget':>8} {'wall ms':>9}  status")
+        for r in results:
+            status = "ok" if r["ok"] else "FAIL " + ", ".join(r["forbidden"][:3])
+            print(f"{' '.join(r['argv']):<28} {r['import_ms']:>10.1f} {r['budget_ms']:>8} {r['wall_ms']:>9.1f}  {status}")
+    sys.exit(0 if all(r["ok"] for r in results) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Per-request HTTP overhead, bare requests.post vs. the pooled transport.
+
+Runs a local stand-in for the free /api/chat endpoint and an OpenAI-compatible
+/v1/chat/completions endpoint that answer instantly, so what is measured is
+qcraft's own connection and decoding overhead, not the model.
+
+    python -m benchmarks.bench_transport -n 300
+
+The bare baseline needs requests, which qcraft itself does not use:
+pip install ".[bench]".
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import openai
+import requests
+
+from nl2sql.transport import Transport
+
+CHAT_BODY = json.dumps({"response": "SELECT 1", "usage": {"input_tokens": 10, "output_tokens": 2}}).encode()
+COMPLETION_BODY = json.dumps({
+    "id": "chatcmpl-bench", "object": "chat.completion", "created": 0, "model": "bench",
+    "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "SELECT 1"}}],
+    "usage": {"prompt_tokens": 10, "completion_tokens": 2, "total_tokens": 12},
+}).encode()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real endpoints
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = COMPLETION_BODY if self.path.endswith("/chat/completions") else CHAT_BODY
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _timed(fn, n):
+    samples = []
+    for _ in range(n):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.mean(samples), statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", type=int, default=200, help="requests per scenario")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    payload = {"message": "x" * 2000}
+    transport = Transport()
+    loop = asyncio.new_event_loop()  # the pooled clients belong to one loop, as in a qcraft run
+
+    def bare_post():
+        response = requests.post(base + "/api/chat", json=payload, headers={"Content-Type": "application/json"})
+        return response.json()["response"], response.json()["usage"]["input_tokens"], response.json()["usage"]["output_tokens"]
+
+    def pooled_post():
+        data = loop.run_until_complete(transport.post_json_async(base + "/api/chat", payload))
+        return data["response"], data["usage"]["input_tokens"], data["usage"]["output_tokens"]
+
+    messages = [{"role": "user", "content": "x" * 2000}]
+
+    async def fresh_request():
+        async with openai.AsyncOpenAI(api_key="bench", base_url=base + "/v1", max_retries=0) as client:
+            await client.chat.completions.create(model="bench", messages=messages)
+
+    def fresh_client():
+        loop.run_until_complete(fresh_request())
+
+    async def shared_request():
+        client = transport.async_openai_client(api_key="bench", base_url=base + "/v1")
+        await client.chat.completions.create(model="bench", messages=messages)
+
+    def shared_client():
+        loop.run_until_complete(shared_request())
+
+    scenarios = [
+        ("free endpoint, requests.post per call", bare_post),
+        ("free endpoint, pooled transport", pooled_post),
+        ("openai-compatible, new client per call", fresh_client),
+        ("openai-compatible, shared client", shared_client),
+    ]
+    print(f"{'scenario':<42} {'mean ms':>9} {'p50 ms':>9}")
+    for name, fn in scenarios:
+        fn()  # warm up imports and the first connection
+        mean, p50 = _timed(fn, args.n)
+        print(f"{name:<42} {mean:>9.3f} {p50:>9.3f}")
+    transport.close()
+    loop.close()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
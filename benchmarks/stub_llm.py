@@ -0,0 +1,243 @@
+"""A local stand-in LLM server for the benchmarks and manual testing.
+
+Speaks the OpenAI chat completions API (plain and streamed, with `n`) on
+/v1/chat/completions and the free endpoint's protocol on /api/chat. Every
+answer waits `latency` seconds (plus up to `jitter`) before the first token
+and then produces `tokens_per_sec`; a share of requests (or the first
+`fail_first`) fail with `error_status`, with a Retry-After header when
+`retry_after` is set. With `prefix_cache` it behaves like a server reusing
+the KV cache of earlier prompts: the longest prefix shared with a recent
+prompt is reported as cached_tokens and cuts the wait before the first
+token. With
+`prefill_tokens_per_sec` reading the (uncached part of the) prompt adds to
+that wait, as it does on a local model. Convert and retry answers are valid
+SQL against the first table of the schema in the prompt, DDL or compact
+notation, so local validation passes.
+
+    python -m benchmarks.stub_llm --port 11434 --latency 0.3 --tokens-per-sec 40
+    qcraft config set OLLAMA_BASE_URL http://127.0.0.1:11434/v1
+    qcraft config set FREE_URL http://127.0.0.1:11434/api/chat
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_TABLE = re.compile(r"CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?[\"`\[]?(\w+)|^(\w+)\((?=\w)",
+                    re.IGNORECASE | re.MULTILINE)
+_TAG = re.compile(r"\[bench (\d+)\]")
+
+
+class StubConfig:
+    def __init__(self, latency=0.2, jitter=0.0, tokens_per_sec=50.0, completion_tokens=30, error_rate=0.0,
+                 error_status=500, retry_after=None, seed=0, prefix_cache=False, prefill_tokens_per_sec=None,
+                 fail_first=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.tokens_per_sec = tokens_per_sec
+        self.completion_tokens = completion_tokens
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self.fail_first = fail_first
+        self.prefix_cache = prefix_cache
+        self.prefill_tokens_per_sec = prefill_tokens_per_sec
+        self.random = random.Random(seed)
+
+
+def _answer(prompt, n_tokens):
+    """Words of an answer to `prompt`, at least `n_tokens` long."""
+    if "explain in few lines" in prompt:
+        words = "This query reads the table named in the question and returns the matching rows".split()
+    else:
+        table = _TABLE.search(prompt)
+        words = ["SELECT", "*", "FROM", (table.group(1) or table.group(2)) if table else "t"]
+        if len(words) < n_tokens:
+            words += ["--"]  # padding rides in a comment so the SQL stays valid
+    while len(words) < n_tokens:
+        words.append("x")
+    return [w if i == 0 else " " + w for i, w in enumerate(words)]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        server = self.server
+        start = time.perf_counter()
+        raw = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = json.loads(raw or b"{}")
+        text = raw.decode("utf-8", "replace")
+        tag = _TAG.search(text)
+        record = {"path": self.path, "start": start, "tag": int(tag.group(1)) if tag else None,
+                  "prompt_bytes": len(raw), "status": 200}
+        cfg = server.config
+        with server.lock:
+            failing = cfg.random.random() < cfg.error_rate or cfg.fail_first > 0
+            cfg.fail_first -= cfg.fail_first > 0
+            delay = cfg.latency + cfg.random.random() * cfg.jitter
+        try:
+            if failing:
+                time.sleep(delay)
+                record["status"] = cfg.error_status
+                headers = {"Retry-After": str(cfg.retry_after)} if cfg.retry_after is not None else {}
+                self._json(cfg.error_status, {"error": {"message": "injected failure", "type": "stub_error"}},
+                           headers)
+            elif self.path.endswith("/chat/completions"):
+                self._completion(body, delay, record)
+            elif self.path.endswith("/api/chat"):
+                prefill = len(raw) // 4 / cfg.prefill_tokens_per_sec if cfg.prefill_tokens_per_sec else 0
+                time.sleep(delay + prefill + cfg.completion_tokens / cfg.tokens_per_sec)
+                words = _answer(body.get("message", ""), cfg.completion_tokens)
+                self._json(200, {"response": "".join(words),
+                                 "usage": {"input_tokens": len(raw) // 4, "output_tokens": len(words)}})
+            else:
+                record["status"] = 404
+                self._json(404, {"error": {"message": f"no route {self.path}"}})
+        finally:
+            record["end"] = time.perf_counter()
+            with server.lock:
+                server.records.append(record)
+
+    def _completion(self, body, delay, record):
+        cfg = self.server.config
+        prompt = "\n".join(m.get("content") or "" for m in body.get("messages", []))
+        words = _answer(prompt, cfg.completion_tokens)
+        n = max(1, int(body.get("n") or 1))
+        usage = {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(words) * n,
+                 "total_tokens": len(prompt) // 4 + len(words) * n}
+        cached = 0
+        if cfg.prefix_cache:
+            cached = self.server.reuse(prompt) // 4
+            usage["prompt_tokens_details"] = {"cached_tokens": cached}
+            record["cached_tokens"] = cached
+            # reading the prompt is most of the wait before the first token
+            delay *= 0.2 + 0.8 * (1 - cached / max(1, usage["prompt_tokens"]))
+        if cfg.prefill_tokens_per_sec:
+            delay += (usage["prompt_tokens"] - cached) / cfg.prefill_tokens_per_sec
+        meta = {"id": "chatcmpl-stub", "created": 0, "model": body.get("model") or "stub"}
+        time.sleep(delay)
+        if not body.get("stream"):
+            time.sleep(len(words) / cfg.tokens_per_sec)
+            choices = [{"index": i, "finish_reason": "stop", "message": {"role": "assistant", "content": "".join(words)}}
+                       for i in range(n)]
+            self._json(200, dict(meta, object="chat.completion", choices=choices, usage=usage))
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        record["first_token"] = time.perf_counter()
+        for i, word in enumerate(words):
+            if i:
+                time.sleep(1 / cfg.tokens_per_sec)
+            delta = {"role": "assistant", "content": word} if i == 0 else {"content": word}
+            self._event(dict(meta, object="chat.completion.chunk",
+                             choices=[{"index": 0, "delta": delta, "finish_reason": None}]))
+        self._event(dict(meta, object="chat.completion.chunk",
+                         choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}], usage=usage))
+        self._chunk(b"data: [DONE]\n\n")
+        self._chunk(b"")
+
+    def _event(self, data):
+        self._chunk(b"data: " + json.dumps(data).encode() + b"\n\n")
+
+    def _chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def _json(self, status, data, headers=None):
+        out = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(out)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    """The stub on a background thread. `records` holds one dict per request
+    with path, start/end (perf_counter), status and the [bench N] tag found
+    in the request, if any."""
+
+    daemon_threads = True
+
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        super().__init__((host, port), _Handler)
+        self.config = config or StubConfig()
+        self.lock = threading.Lock()
+        self.records = []
+        self.recent = []  # prompts whose prefixes a real server would still have cached
+
+    def reuse(self, prompt):
+        """Characters at the start of `prompt` shared with a recent prompt."""
+        with self.lock:
+            shared = max((len(os.path.commonprefix([prompt, p])) for p in self.recent), default=0)
+            self.recent = (self.recent + [prompt])[-32:]
+        return shared
+
+    @property
+    def base(self):
+        return f"http://{self.server_address[0]}:{self.server_port}"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def take_records(self):
+        with self.lock:
+            records, self.records = self.records, []
+        return records
+
+    def handle_error(self, request, client_address):
+        # clients that gave up (a deadline, a cancelled stream) are expected,
+        # their broken pipes are not worth a traceback on stderr
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds before the first token")
+    parser.add_argument("--jitter", type=float, default=0.0, help="up to this many extra seconds per request")
+    parser.add_argument("--tokens-per-sec", type=float, default=50.0)
+    parser.add_argument("--completion-tokens", type=int, default=30)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests that fail, 0..1")
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--retry-after", type=float, help="Retry-After header sent with failures")
+    parser.add_argument("--fail-first", type=int, default=0, help="fail this many requests before any succeeds")
+    parser.add_argument("--prefix-cache", action="store_true", help="model a server reusing cached prompt prefixes")
+    parser.add_argument("--prefill-tokens-per-sec", type=float, help="prompt tokens read per second before answering")
+    args = parser.parse_args()
+    server = StubServer(StubConfig(args.latency, args.jitter, args.tokens_per_sec, args.completion_tokens,
+                                   args.error_rate, args.error_status, args.retry_after,
+                                   prefix_cache=args.prefix_cache,
+                                   prefill_tokens_per_sec=args.prefill_tokens_per_sec, fail_first=args.fail_first),
+                        port=args.port)
+    print(f"stub LLM on {server.base} (/v1/chat/completions, /api/chat)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
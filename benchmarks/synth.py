@@ -0,0 +1,28 @@
+"""Synthetic schemas for the benchmarks, shaped like schema.txt but N tables wide."""
+import random
+
+_NOUNS = ("customer", "order", "product", "invoice", "payment", "shipment", "warehouse", "supplier",
+          "employee", "department", "region", "country", "city", "category", "review", "cart", "session",
+          "event", "audit", "refund", "coupon", "account", "ledger", "contract", "ticket", "asset")
+_TYPES = ("INT", "VARCHAR(50)", "VARCHAR(255)", "DECIMAL(10, 2)", "DATE", "TIMESTAMP", "TEXT", "BOOLEAN")
+_STATUSES = ("'Pending'", "'Active'", "'Closed'", "'Cancelled'", "'Archived'")
+
+
+def generate_schema(n_tables, seed=0, columns=(5, 12)):
+    """CREATE TABLE DDL for `n_tables` tables with PKs, FKs to earlier tables and CHECKs."""
+    rng = random.Random(seed)
+    names, statements = [], []
+    for i in range(n_tables):
+        name = f"{rng.choice(_NOUNS)}_{rng.choice(_NOUNS)}_{i}"
+        lines = [f"    {name}_id INT PRIMARY KEY"]
+        for j in range(rng.randint(*columns)):
+            null = " NOT NULL" if rng.random() < 0.4 else ""
+            lines.append(f"    {rng.choice(_NOUNS)}_{j} {rng.choice(_TYPES)}{null}")
+        if rng.random() < 0.3:
+            lines.append(f"    status VARCHAR(20) CHECK (status IN ({', '.join(rng.sample(_STATUSES, 3))}))")
+        for ref in rng.sample(names, min(len(names), rng.randint(0, 2))):
+            lines.append(f"    {ref}_id INT")
+            lines.append(f"    FOREIGN KEY ({ref}_id) REFERENCES {ref}({ref}_id)")
+        names.append(name)
+        statements.append(f"CREATE TABLE {name} (\n" + ",\n".join(lines) + "\n);")
+    return "\n\n".join(statements) + "\n"
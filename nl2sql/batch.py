@@ -0,0 +1,172 @@
+import asyncio
+import json
+import math
+import os
+import time
+from pathlib import Path
+
+
+def load_questions(path):
+    """Read a batch file into a list of (id, nl_query) pairs.
+
+    Every non-empty line is either a JSON object with an "nl_query" (or
+    "question") field and an optional "id", a JSON string, or plain text.
+    Items without an id get their 1-based line number as id.
+    """
+    items = []
+    with open(path, "r", encoding="utf-8") as f:
+        for lineno, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                entry = line
+            if isinstance(entry, dict):
+                nl_query = entry.get("nl_query") or entry.get("question")
+                item_id = str(entry.get("id", lineno))
+            else:
+                nl_query = str(entry)
+                item_id = str(lineno)
+            if nl_query:
+                items.append((item_id, nl_query))
+    return items
+
+
+def load_done(out_path):
+    """(id, nl_query) pairs that already have a successful result in the output file.
+
+    The output file doubles as the checkpoint: failed items and a torn last
+    line (from a killed run) are simply converted again on resume. The
+    question is part of the key, as ids default to line numbers: after the
+    input file was edited, line 3 may be a different question.
+    """
+    done = set()
+    out_path = Path(out_path)
+    if not out_path.exists():
+        return done
+    with open(out_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get("error") is None and "id" in record:
+                done.add((str(record["id"]), record.get("nl_query")))
+    return done
+
+
+def percentile(values, pct):
+    # nearest-rank percentile, values need not be sorted
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = min(len(ordered), max(1, math.ceil(pct / 100 * len(ordered))))
+    return ordered[rank - 1]
+
+
+def _record(item_id, nl_query, result, error, start):
+    record = {"id": item_id, "nl_query": nl_query}
+    if error is None:
+        query, i_tokens, o_tokens, *extra = result
+        record.update(query=query, prompt_tokens=i_tokens or 0, completion_tokens=o_tokens or 0, error=None)
+        for fields in extra:  # e.g. which raced backend answered
+            record.update(fields)
+    else:
+        record.update(query=None, prompt_tokens=0, completion_tokens=0, error=str(error))
+    record["latency"] = round(time.perf_counter() - start, 4)
+    return record
+
+
+def _open_results(out_path):
+    """`out_path` opened for appending, with a torn last line (from a killed
+    run) cut off first so the next record starts on a line of its own."""
+    try:
+        with open(out_path, "r+b") as f:
+            end = pos = f.seek(0, os.SEEK_END)
+            while pos > 0:
+                step = min(4096, pos)
+                pos -= step
+                f.seek(pos)
+                newline = f.read(step).rfind(b"\n")
+                if newline != -1:
+                    pos += newline + 1
+                    break
+            if pos != end:
+                f.truncate(pos)
+    except FileNotFoundError:
+        pass
+    return open(out_path, "a", encoding="utf-8")
+
+
+def _emit(out, records, record, on_result):
+    out.write(json.dumps(record) + "\n")
+    out.flush()
+    records.append(record)
+    if on_result:
+        on_result(record)
+
+
+async def run_batch_async(items, convert_one, out_path, concurrency=4, on_result=None):
+    """Convert `items` on the event loop, appending to `out_path`.
+
+    `convert_one(nl_query)` is a coroutine function returning (query,
+    prompt_tokens, completion_tokens), optionally followed by a dict of
+    extra fields for the record. At most `concurrency` requests are in
+    flight at once, as tasks; each result line is written and flushed as
+    soon as its request finishes, so an interrupted run loses nothing
+    already paid for. Returns the list of records written by this run.
+
+    Cancelling the run (Ctrl-C under asyncio.run) cancels the requests still
+    in flight; everything already finished is in `out_path`.
+    """
+    records = []
+
+    async def work(item_id, nl_query):
+        start = time.perf_counter()
+        try:
+            result, error = await convert_one(nl_query), None
+        except Exception as e:
+            result, error = None, e
+        return _record(item_id, nl_query, result, error, start)
+
+    pending = iter(items)
+    in_flight = set()
+    with _open_results(out_path) as out:
+        try:
+            while True:
+                while len(in_flight) < concurrency:
+                    nxt = next(pending, None)
+                    if nxt is None:
+                        break
+                    in_flight.add(asyncio.ensure_future(work(*nxt)))
+                if not in_flight:
+                    break
+                finished, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for task in finished:
+                    _emit(out, records, task.result(), on_result)
+        finally:
+            for task in in_flight:
+                task.cancel()
+    return records
+
+
+def summarize(records, wall_time):
+    latencies = [r["latency"] for r in records if r.get("error") is None]
+    ok = len(latencies)
+    prompt_tokens = sum(r.get("prompt_tokens") or 0 for r in records)
+    completion_tokens = sum(r.get("completion_tokens") or 0 for r in records)
+    return {
+        "total": len(records),
+        "ok": ok,
+        "failed": len(records) - ok,
+        "wall_time": wall_time,
+        "throughput": ok / wall_time if wall_time > 0 else 0.0,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
@@ -0,0 +1,221 @@
+import hashlib
+import sqlite3
+import threading
+import time
+
+from .catalog import schema_hash
+from .config import state_path
+
+DEFAULT_MAX_ENTRIES = 5000
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_AGE = 30 * 24 * 3600  # seconds
+DEFAULT_MAX_SIMILAR = 100_000  # questions kept for near-duplicate lookups
+
+
+def normalize(text):
+    # case and whitespace differences should not miss the cache
+    return " ".join(str(text or "").lower().split())
+
+
+def make_key(kind, provider, model, schema, query_type, *parts):
+    """Cache key for one prompt: kind is convert/retry/explain, parts are the
+    prompt inputs (the NL query, or previous query/answer/reason)."""
+    fields = [kind, provider or "", model or "", schema_hash(schema), normalize(query_type)]
+    fields += [normalize(p) for p in parts]
+    return hashlib.sha256("\x1f".join(fields).encode("utf-8")).hexdigest()
+
+
+def similar_scope(schema, query_type):
+    # near-duplicate answers are only shared between questions on the same schema and dialect
+    return f"{schema_hash(schema)}:{normalize(query_type)}"
+
+
+class ResponseCache:
+    """On-disk LRU cache of LLM answers, shared by every qcraft process.
+
+    Backed by SQLite in WAL mode, so concurrent readers never block and
+    writers serialize on the database lock. Entries older than `max_age`
+    seconds are dropped, and the least recently used ones go first once
+    the cache holds more than `max_entries` rows or `max_bytes` of text.
+    """
+
+    def __init__(self, path=None, max_entries=DEFAULT_MAX_ENTRIES,
+                 max_bytes=DEFAULT_MAX_BYTES, max_age=DEFAULT_MAX_AGE, max_similar=DEFAULT_MAX_SIMILAR):
+        self.path = path or state_path("cache.db")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.max_similar = max_similar
+        self._conn = None
+        self._lock = threading.RLock()  # batch workers share one connection
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("""CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                response TEXT NOT NULL,
+                prompt_tokens INTEGER NOT NULL,
+                completion_tokens INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL)""")
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries(last_used)")
+            conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            # answered questions for near-duplicate lookups, found through their LSH bands
+            conn.execute("""CREATE TABLE IF NOT EXISTS similar (
+                id INTEGER PRIMARY KEY,
+                scope TEXT NOT NULL,
+                question TEXT NOT NULL,
+                tokens TEXT NOT NULL,
+                response TEXT NOT NULL,
+                prompt_tokens INTEGER NOT NULL,
+                completion_tokens INTEGER NOT NULL,
+                created REAL NOT NULL)""")
+            conn.execute("CREATE TABLE IF NOT EXISTS similar_bands (band INTEGER NOT NULL, id INTEGER NOT NULL, "
+                         "PRIMARY KEY (band, id)) WITHOUT ROWID")
+            conn.execute("CREATE INDEX IF NOT EXISTS similar_bands_id ON similar_bands(id)")
+            self._conn = conn
+        return self._conn
+
+    def _bump(self, name):
+        self.conn.execute(
+            "INSERT INTO counters(name, value) VALUES (?, 1) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + 1", (name,))
+
+    def get(self, key):
+        """Return (response, prompt_tokens, completion_tokens) or None."""
+        now = time.time()
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT response, prompt_tokens, completion_tokens, created FROM entries WHERE key = ?",
+                (key,)).fetchone()
+            if row is None or now - row[3] > self.max_age:
+                self._bump("misses")
+                return None
+            self.conn.execute("UPDATE entries SET last_used = ? WHERE key = ?", (now, key))
+            self._bump("hits")
+        return row[0], row[1], row[2]
+
+    def put(self, key, kind, response, prompt_tokens=0, completion_tokens=0):
+        now = time.time()
+        size = len(response.encode("utf-8"))
+        with self._lock:
+            conn = self.conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (key, kind, response, int(prompt_tokens or 0), int(completion_tokens or 0), size, now, now))
+                self._evict(now)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _evict(self, now):
+        conn = self.conn
+        conn.execute("DELETE FROM entries WHERE created < ?", (now - self.max_age,))
+        count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        # walk from least recently used until both limits hold again
+        doomed = []
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY last_used"):
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            doomed.append((key,))
+            count -= 1
+            total -= size
+        conn.executemany("DELETE FROM entries WHERE key = ?", doomed)
+
+    def find_similar(self, scope, question, threshold, vocabulary=None):
+        """The answer to the most similar earlier question in `scope`, as
+        (response, prompt_tokens, completion_tokens, question, score), or None
+        when nothing reaches `threshold`. `vocabulary` (similar.vocabulary of
+        the scope's schema) tells values from names.
+
+        Only questions sharing an LSH band are compared, so a lookup reads a
+        handful of rows however many questions are stored.
+        """
+        from .similar import band_keys, decode, features, similarity
+        tokens = features(question, vocabulary)
+        keys = band_keys(tokens, scope)
+        with self._lock:
+            rows = self.conn.execute(
+                f"SELECT DISTINCT s.id, s.question, s.tokens, s.response, s.prompt_tokens, s.completion_tokens, "
+                f"s.created FROM similar_bands b JOIN similar s ON s.id = b.id "
+                f"WHERE b.band IN ({','.join('?' * len(keys))}) AND s.scope = ?", (*keys, scope)).fetchall()
+            best = None
+            for _, text, stored, response, i_tokens, o_tokens, created in rows:
+                if time.time() - created > self.max_age:
+                    continue
+                score = similarity(tokens, decode(stored))
+                if score >= threshold and (best is None or score > best[4]):
+                    best = (response, i_tokens, o_tokens, text, score)
+            self._bump("similar_hits" if best else "similar_misses")
+        return best
+
+    def put_similar(self, scope, question, response, prompt_tokens=0, completion_tokens=0, vocabulary=None):
+        """Remember the answer to `question` for find_similar; the oldest go
+        once more than `max_similar` are stored."""
+        from .similar import band_keys, encode, features
+        tokens = features(question, vocabulary)
+        keys = band_keys(tokens, scope)
+        with self._lock:
+            conn = self.conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row_id = conn.execute(
+                    "INSERT INTO similar(scope, question, tokens, response, prompt_tokens, completion_tokens, created) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)", (scope, question, encode(tokens), response,
+                                                     int(prompt_tokens or 0), int(completion_tokens or 0),
+                                                     time.time())).lastrowid
+                conn.executemany("INSERT OR IGNORE INTO similar_bands VALUES (?, ?)", [(k, row_id) for k in keys])
+                # ids only grow, so the oldest rows are the ones below the cut
+                cut = row_id - self.max_similar
+                if cut > 0 and conn.execute("SELECT 1 FROM similar WHERE id <= ? LIMIT 1", (cut,)).fetchone():
+                    conn.execute("DELETE FROM similar_bands WHERE id <= ?", (cut,))
+                    conn.execute("DELETE FROM similar WHERE id <= ?", (cut,))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def counters(self):
+        with self._lock:
+            return dict(self.conn.execute("SELECT name, value FROM counters").fetchall())
+
+    def stats(self):
+        count, total, oldest = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0), MIN(created) FROM entries").fetchone()
+        by_kind = dict(self.conn.execute("SELECT kind, COUNT(*) FROM entries GROUP BY kind").fetchall())
+        counters = self.counters()
+        return {
+            "path": str(self.path),
+            "entries": count,
+            "bytes": total,
+            "oldest": oldest,
+            "by_kind": by_kind,
+            "hits": counters.get("hits", 0),
+            "misses": counters.get("misses", 0),
+            "similar": self.conn.execute("SELECT COUNT(*) FROM similar").fetchone()[0],
+            "similar_hits": counters.get("similar_hits", 0),
+        }
+
+    def clear(self):
+        self.conn.execute("DELETE FROM entries")
+        self.conn.execute("DELETE FROM similar_bands")
+        self.conn.execute("DELETE FROM similar")
+        self.conn.execute("DELETE FROM counters")
+        self.conn.execute("VACUUM")
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
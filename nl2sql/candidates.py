@@ -0,0 +1,95 @@
+import json
+import os
+import re
+
+from .cache import normalize
+from .catalog import schema_hash
+from .config import state_path
+
+_FENCE = re.compile(r"^\s*```[\w-]*\s*\n?|\n?\s*```\s*$")
+_STATUS_RANK = {"ok": 0, "unchecked": 1, None: 1, "error": 2}
+
+
+def _key(text):
+    # formatting, case and a trailing semicolon do not make a different query
+    return normalize(_FENCE.sub("", text or "")).rstrip("; ")
+
+
+def dedupe(texts):
+    """Distinct answers in first-seen order, as (text, votes) pairs."""
+    seen = {}
+    for text in texts:
+        if not (text or "").strip():
+            continue
+        key = _key(text)
+        if key in seen:
+            seen[key][1] += 1
+        else:
+            seen[key] = [text.strip(), 1]
+    return [tuple(pair) for pair in seen.values()]
+
+
+def rank(texts, validator=None):
+    """Distinct candidates, best first.
+
+    A candidate that passes EXPLAIN beats one SQLite cannot check, which
+    beats one naming a table or column that does not exist. Ties go to the
+    shortest plan, then to the answer more samples agreed on, then to the
+    shorter text. Each candidate is a dict with query, votes, status,
+    error and plan (EXPLAIN instruction count).
+    """
+    ranked = []
+    for text, votes in dedupe(texts):
+        status, error, plan = None, None, None
+        if validator is not None:
+            status, error = validator.check(text)
+            if status == "ok":
+                plan = validator.plan_size(text)
+        ranked.append({"query": text, "votes": votes, "status": status, "error": error, "plan": plan})
+    ranked.sort(key=lambda c: (_STATUS_RANK[c["status"]], c["plan"] if c["plan"] is not None else float("inf"),
+                               -c["votes"], len(c["query"])))
+    return ranked
+
+
+def _path():
+    return state_path("candidates.json")
+
+
+def _write(data):
+    path = _path()
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(data), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def save(nl_query, schema, ranked):
+    """Remember the ranked candidates of the last convert for `assist next`."""
+    _write({"nl_query": nl_query, "schema_hash": schema_hash(schema), "candidates": ranked, "current": 0})
+
+
+def discard():
+    # a plain convert replaces the last candidate set
+    try:
+        _path().unlink()
+    except FileNotFoundError:
+        pass
+
+
+def next_candidate(nl_query, schema):
+    """Advance to the next stored candidate for `nl_query`.
+
+    Returns (candidate, position, total), or None when there is no candidate
+    set for this question and schema, or it is used up.
+    """
+    try:
+        data = json.loads(_path().read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if data.get("nl_query") != nl_query or data.get("schema_hash") != schema_hash(schema):
+        return None
+    current = data["current"] + 1
+    if current >= len(data["candidates"]):
+        return None
+    data["current"] = current
+    _write(data)
+    return data["candidates"][current], current + 1, len(data["candidates"])
@@ -0,0 +1,342 @@
+import gc
+import hashlib
+import json
+import os
+import re
+from dataclasses import dataclass, field
+
+from .config import state_path
+
+CATALOG_VERSION = 1
+
+_CREATE_TABLE = re.compile(
+    r"CREATE\s+(?:OR\s+REPLACE\s+)?(?:(?:GLOBAL\s+|LOCAL\s+)?(?:TEMP|TEMPORARY)\s+|UNLOGGED\s+)?TABLE\s+"
+    r"(?:IF\s+NOT\s+EXISTS\s+)?(?P<name>[\w\"`\[\]\.]+)\s*\(",
+    re.IGNORECASE,
+)
+_ALTER_FK = re.compile(
+    r"ALTER\s+TABLE\s+(?:ONLY\s+)?(?:IF\s+EXISTS\s+)?(?P<table>[\w\"`\[\]\.]+)\s+ADD\s+(?:CONSTRAINT\s+\S+\s+)?"
+    r"FOREIGN\s+KEY\s*\((?P<cols>[^)]*)\)\s*REFERENCES\s+(?P<ref>[\w\"`\[\]\.]+)\s*(?:\((?P<ref_cols>[^)]*)\))?",
+    re.IGNORECASE,
+)
+_REFERENCES = re.compile(r"REFERENCES\s+(?P<ref>[\w\"`\[\]\.]+)\s*(?:\((?P<ref_cols>[^)]*)\))?", re.IGNORECASE)
+_CHECK_IN = re.compile(r"CHECK\s*\(\s*[\"`\[]?(?P<col>\w+)[\"`\]]?\s+IN\s*\((?P<values>[^)]*)\)", re.IGNORECASE)
+_STRUCTURE = re.compile(r"[(),'\"`]")
+_CHECK = re.compile(r"\bCHECK\s*\(", re.IGNORECASE)
+_TYPE_END = re.compile(r"\s+(?:NOT|NULL|PRIMARY|UNIQUE|DEFAULT|CHECK|REFERENCES|CONSTRAINT|GENERATED|"
+                       r"AUTO_INCREMENT|AUTOINCREMENT|COLLATE|IDENTITY|ON)\b", re.IGNORECASE)
+_TABLE_CONSTRAINT = ("CONSTRAINT", "PRIMARY", "FOREIGN", "UNIQUE", "CHECK", "INDEX", "KEY", "EXCLUDE", "FULLTEXT", "SPATIAL")
+
+
+@dataclass
+class Column:
+    name: str
+    type: str = ""
+    nullable: bool = True
+    primary_key: bool = False
+    unique: bool = False
+    check_values: list = None  # allowed literals from CHECK (col IN (...))
+
+
+@dataclass
+class ForeignKey:
+    columns: list
+    ref_table: str
+    ref_columns: list
+
+
+@dataclass
+class Table:
+    name: str
+    columns: list = field(default_factory=list)
+    primary_key: list = field(default_factory=list)
+    foreign_keys: list = field(default_factory=list)
+    checks: list = field(default_factory=list)
+    ddl: str = ""
+
+    def column(self, name):
+        name = name.lower()
+        for column in self.columns:
+            if column.name == name:
+                return column
+        return None
+
+    def referenced_tables(self):
+        return {fk.ref_table for fk in self.foreign_keys}
+
+
+class Catalog:
+    """Structured view of a stored schema: tables, columns, keys and checks.
+
+    Built once per distinct schema text and persisted under the state dir,
+    keyed by the schema's content hash, so every later command gets it with
+    one JSON read instead of re-parsing the DDL. A loaded catalog decodes each
+    table the first time it is asked for, so looking up a couple of tables in
+    a 5,000-table schema does not pay for the other 4,998.
+    """
+
+    def __init__(self, tables=None, schema_hash="", rows=None):
+        self._tables = dict(tables or {})
+        self._rows = rows or {}  # name -> encoded row, not decoded yet
+        self.names = list(tables) if tables is not None else list(self._rows)
+        self.schema_hash = schema_hash
+        self._neighbours = None
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        name = unquote(name)
+        return name in self._tables or name in self._rows
+
+    @property
+    def tables(self):
+        """Every table as {name: Table}, in schema order."""
+        if self._rows:
+            # tens of thousands of small objects, the cyclic GC only slows this down
+            enabled = gc.isenabled()
+            gc.disable()
+            try:
+                for name in list(self._rows):
+                    self.table(name)
+            finally:
+                if enabled:
+                    gc.enable()
+            self._tables = {name: self._tables[name] for name in self.names}
+        return self._tables
+
+    def table(self, name):
+        name = unquote(name)
+        table = self._tables.get(name)
+        if table is None and name in self._rows:
+            table = self._tables[name] = _decode_table(json.loads(self._rows.pop(name)))
+        return table
+
+    def column(self, table, column):
+        t = self.table(table)
+        return t.column(column) if t else None
+
+    def neighbours(self, name):
+        """Tables one foreign key away from `name`, in either direction."""
+        if self._neighbours is None:
+            links = {t: set() for t in self.names}
+            for t, table in self.tables.items():
+                for ref in table.referenced_tables():
+                    if ref in links and ref != t:
+                        links[t].add(ref)
+                        links[ref].add(t)
+            self._neighbours = links
+        return self._neighbours.get(unquote(name), set())
+
+    def stats(self):
+        tables = self.tables.values()
+        return {
+            "tables": len(self.names),
+            "columns": sum(len(t.columns) for t in tables),
+            "foreign_keys": sum(len(t.foreign_keys) for t in tables),
+            "checks": sum(len(t.checks) for t in tables),
+        }
+
+    def to_dict(self):
+        # one compact JSON string per table: loading only splits the outer list,
+        # tables are decoded when first used
+        rows = [json.dumps(_encode_table(t), separators=(",", ":")) for t in self.tables.values()]
+        return {"version": CATALOG_VERSION, "schema_hash": self.schema_hash, "names": self.names, "rows": rows}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(schema_hash=data.get("schema_hash", ""), rows=dict(zip(data["names"], data["rows"])))
+
+
+def _encode_table(t):
+    # positional rows instead of one dict per column keep the store small
+    columns = [[c.name, c.type, c.nullable | c.primary_key << 1 | c.unique << 2, c.check_values] for c in t.columns]
+    fks = [[fk.columns, fk.ref_table, fk.ref_columns] for fk in t.foreign_keys]
+    return [t.name, columns, t.primary_key, fks, t.checks, t.ddl]
+
+
+def _decode_table(row):
+    name, columns, primary_key, fks, checks, ddl = row
+    return Table(
+        name,
+        [Column(c, ctype, bool(flags & 1), bool(flags & 2), bool(flags & 4), values)
+         for c, ctype, flags, values in columns],
+        primary_key,
+        [ForeignKey(*fk) for fk in fks],
+        checks,
+        ddl,
+    )
+
+
+def unquote(identifier):
+    # "public"."orders" / `orders` / [orders] -> orders (schema prefix dropped)
+    return identifier.split(".")[-1].strip("\"`[]").lower()
+
+
+def _names(text):
+    return [unquote(part.strip()) for part in (text or "").split(",") if part.strip()]
+
+
+def _literals(text):
+    return [v.strip().strip("'\"") for v in text.split(",") if v.strip()]
+
+
+def _scan(text, start, stop_at_comma=False):
+    """Index of the ")" closing the group that starts at `start`, or with
+    stop_at_comma the list of top-level comma positions inside it as well.
+
+    Only the structural characters are visited (via regex), which keeps this
+    fast on multi-megabyte dumps.
+    """
+    depth, quote, commas = 0, None, []
+    for m in _STRUCTURE.finditer(text, start):
+        ch = m.group()
+        if quote:
+            if ch == quote:
+                quote = None
+        elif ch in "'\"`":
+            quote = ch
+        elif ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+            if depth == 0:
+                return m.start(), commas
+        elif depth == 1 and stop_at_comma:
+            commas.append(m.start())
+    return -1, commas
+
+
+def _parse_item(table, item):
+    upper = item.upper()
+    head = upper.split(None, 1)[0].strip("\"`[]")
+    if head in _TABLE_CONSTRAINT:
+        cols = re.search(r"(?P<kind>PRIMARY|FOREIGN|UNIQUE)\s*(?:KEY\s*)?(?:\w+\s*)?\((?P<cols>[^)]*)\)", item, re.IGNORECASE)
+        kind = cols.group("kind").upper() if cols else None
+        if kind == "FOREIGN":
+            ref = _REFERENCES.search(item)
+            if ref:
+                table.foreign_keys.append(ForeignKey(_names(cols.group("cols")), unquote(ref.group("ref")),
+                                                     _names(ref.group("ref_cols"))))
+        elif kind == "PRIMARY":
+            table.primary_key = _names(cols.group("cols"))
+            for name in table.primary_key:
+                column = table.column(name)
+                if column:
+                    column.primary_key, column.nullable = True, False
+        elif kind == "UNIQUE" and len(_names(cols.group("cols"))) == 1:
+            column = table.column(_names(cols.group("cols"))[0])
+            if column:
+                column.unique = True
+        check = _CHECK.search(item)
+        if check:
+            table.checks.append(item[check.start():].strip())
+            check = _CHECK_IN.search(item)
+            column = check and table.column(check.group("col"))
+            if column:
+                column.check_values = _literals(check.group("values"))
+        return
+    tokens = item.split(None, 1)
+    name = unquote(tokens[0])
+    rest = tokens[1] if len(tokens) > 1 else ""
+    end = _TYPE_END.search(rest)
+    column = Column(name, (rest[:end.start()] if end else rest).strip())
+    flags = re.sub(r"'[^']*'", "", rest[end.start():] if end else "").upper()
+    column.nullable = "NOT NULL" not in flags and "PRIMARY KEY" not in flags
+    column.primary_key = "PRIMARY KEY" in flags
+    column.unique = "UNIQUE" in flags
+    table.columns.append(column)
+    if column.primary_key:
+        table.primary_key = [name]
+    ref = _REFERENCES.search(rest)
+    if ref:
+        table.foreign_keys.append(ForeignKey([name], unquote(ref.group("ref")), _names(ref.group("ref_cols"))))
+    check = _CHECK.search(rest)
+    if check:
+        table.checks.append(rest[check.start():].strip())
+        check = _CHECK_IN.search(rest)
+        if check:
+            column.check_values = _literals(check.group("values"))
+
+
+def parse_schema(text):
+    """Parse CREATE TABLE / ALTER TABLE ... FOREIGN KEY statements into tables.
+
+    Returns {table_name: Table} in schema order. Schemas that are not SQL DDL
+    (a Mongo collection description, free text) just yield no tables.
+    """
+    tables = {}
+    text = text or ""
+    pos = 0
+    while True:
+        m = _CREATE_TABLE.search(text, pos)
+        if not m:
+            break
+        close, commas = _scan(text, m.end() - 1, stop_at_comma=True)
+        if close == -1:
+            break
+        end = close + 1
+        # keep trailing table options and the terminating semicolon with the DDL
+        semi = text.find(";", end)
+        next_create = _CREATE_TABLE.search(text, end)
+        if semi != -1 and (next_create is None or semi < next_create.start()):
+            end = semi + 1
+        table = Table(unquote(m.group("name")), ddl=text[m.start():end].strip())
+        bounds = [m.end() - 1] + commas + [close]
+        for a, b in zip(bounds, bounds[1:]):
+            item = text[a + 1:b].strip()
+            if item:
+                _parse_item(table, item)
+        tables[table.name] = table
+        pos = end
+    if "ALTER" in text.upper():
+        for m in _ALTER_FK.finditer(text):
+            table = tables.get(unquote(m.group("table")))
+            if table is not None:
+                table.foreign_keys.append(ForeignKey(_names(m.group("cols")), unquote(m.group("ref")),
+                                                     _names(m.group("ref_cols"))))
+                table.ddl += "\n" + m.group(0).strip() + ";"
+    return tables
+
+
+def schema_hash(schema):
+    return hashlib.sha256((schema or "").encode("utf-8")).hexdigest()
+
+
+def build_catalog(schema):
+    return Catalog(parse_schema(schema), schema_hash(schema))
+
+
+def _catalog_path(digest):
+    return state_path("catalogs") / f"{digest}.json"
+
+
+_loaded = {}
+
+
+def load_catalog(schema):
+    """Catalog for `schema`, parsed at most once per distinct schema text.
+
+    Looks in this process first, then in the on-disk store, and only parses
+    (and stores the result) when neither has it.
+    """
+    digest = schema_hash(schema)
+    catalog = _loaded.get(digest)
+    if catalog is not None:
+        return catalog
+    path = _catalog_path(digest)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+        if data.get("version") == CATALOG_VERSION:
+            catalog = Catalog.from_dict(data)
+    except (OSError, ValueError, KeyError, TypeError):
+        catalog = None
+    if catalog is None:
+        catalog = build_catalog(schema)
+        # write to a temp file first so a concurrent reader never sees half a catalog
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(catalog.to_dict(), separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp, path)
+    _loaded[digest] = catalog
+    return catalog
@@ -1,18 +1,100 @@
 import click
+import contextvars
 import time
+from pathlib import Path
 from rich.console import Console
-from rich.text import Text
 
-from .config import get_config,set_config, flush_config, load_config
-from .llm import OpenAI , req_call , retry_req_call ,req_explain
-import pyperclip
+from .config import get_config,set_config, flush_config, load_config, update_config, SCHEMA_REF
+from .trace import span
 
-from .tutorial_system import NL2SQLTutorial
-
-tutorial_system = NL2SQLTutorial(package_name="qcraft")
+# Everything heavier (provider SDKs, clipboard, the rich-based tutorial, the
+# cache/catalog machinery) is imported inside the commands that use it, so
+# quick commands like `qcraft config get TYPE` start in a few tens of ms.
+# tests/test_startup.py keeps it that way.
 
 console = Console()
 
+_tutorial_system = None
+# for the running command: prompt tokens providers served from their prompt cache, and
+# the earlier question whose answer was reused, if any, and the seconds the local
+# rules took when they answered; a context variable so concurrent `qcraft serve`
+# jobs each keep their own
+_usage = contextvars.ContextVar("qcraft_usage", default={"cached_tokens": 0, "similar": None, "local": None})
+
+
+def _tutorial():
+    global _tutorial_system
+    if _tutorial_system is None:
+        from .tutorial_system import NL2SQLTutorial
+        _tutorial_system = NL2SQLTutorial(package_name="qcraft")
+    return _tutorial_system
+
+
+def _copy(text):
+    with span("clipboard"):
+        import pyperclip
+        try:
+            pyperclip.copy(text)
+        except pyperclip.PyperclipException:
+            # headless boxes (CI, ssh) have no clipboard, the query is printed anyway
+            console.print("[dim]Clipboard not available, query not copied.[/dim]")
+
+
+def _profiled(f):
+    """Adds --profile/--profile-out to a command.
+
+    --profile prints how long each traced phase took (and with --profile-out
+    writes a Chrome trace JSON for chrome://tracing or ui.perfetto.dev);
+    --profile=cprofile runs the command under cProfile and dumps pstats.
+    Without the flag the command runs untouched and spans stay no-ops.
+    """
+    import functools
+
+    @click.option('--profile', is_flag=False, flag_value="phases", type=click.Choice(["phases", "cprofile"]),
+                  help='Print a per-phase time breakdown; --profile=cprofile dumps a pstats file instead.')
+    @click.option('--profile-out', type=click.Path(dir_okay=False),
+                  help='Where --profile writes its Chrome trace JSON, or --profile=cprofile its pstats file.')
+    @functools.wraps(f)
+    def wrapper(*args, profile=None, profile_out=None, **kwargs):
+        if not profile:
+            return f(*args, **kwargs)
+        if profile == "cprofile":
+            import cProfile
+            import pstats
+            out = profile_out or f"qcraft-{f.__name__}.pstats"
+            profiler = cProfile.Profile()
+            try:
+                return profiler.runcall(f, *args, **kwargs)
+            finally:
+                profiler.dump_stats(out)
+                console.print(f"[bold cyan]Profile:[/bold cyan] pstats written to {out} "
+                              f"(python -m pstats {out}, or snakeviz)")
+                pstats.Stats(profiler, stream=console.file).sort_stats("cumulative").print_stats(12)
+        from . import trace
+        tracer = trace.start()
+        try:
+            return f(*args, **kwargs)
+        finally:
+            trace.stop()
+            _print_profile(tracer, time.perf_counter() - tracer.origin, profile_out)
+    return wrapper
+
+
+def _print_profile(tracer, wall, out_file=None):
+    console.print(f"[bold cyan]Profile:[/bold cyan] {wall * 1000:.1f} ms in the command")
+    traced = 0.0
+    for depth, name, seconds, count in tracer.breakdown():
+        traced += seconds if depth == 0 else 0.0
+        times = f" x{count}" if count > 1 else ""
+        console.print(f"  {'  ' * depth}{name:<{28 - 2 * depth}} {seconds * 1000:>9.1f} ms {seconds / wall * 100:>5.1f}%{times}")
+    rest = max(0.0, wall - traced)
+    console.print(f"  {'(untraced)':<28} {rest * 1000:>9.1f} ms {rest / wall * 100:>5.1f}%")
+    if out_file:
+        import json
+        with open(out_file, "w", encoding="utf-8") as f:
+            json.dump(tracer.chrome_trace(), f)
+        console.print(f"[bold cyan]Trace:[/bold cyan] {out_file} (open in ui.perfetto.dev or chrome://tracing)")
+
 @click.group()
 def tutorial():
     """Interactive tutorial and help system for query-crafter-cli
@@ -44,7 +126,7 @@ def complete():
     
     Perfect for new users!
     """
-    tutorial_system.run_complete_tutorial()
+    _tutorial().run_complete_tutorial()
 
 @tutorial.command()
 def quick():
@@ -57,7 +139,7 @@ def quick():
     
     Perfect when you need to get up and running fast!
     """
-    tutorial_system.run_quick_tutorial()
+    _tutorial().run_quick_tutorial()
 
 @tutorial.command()
 def commands():
@@ -72,7 +154,7 @@ def commands():
     
     Your complete command manual!
     """
-    tutorial_system.show_commands_guide()
+    _tutorial().show_commands_guide()
 
 @tutorial.command()
 def workflow():
@@ -86,7 +168,7 @@ def workflow():
     
     See qcraft in action!
     """
-    tutorial_system.show_workflow_example()
+    _tutorial().show_workflow_example()
 
 @tutorial.command()
 def config():
@@ -100,7 +182,7 @@ def config():
     
     Master your qcraft setup!
     """
-    tutorial_system.show_configuration_guide()
+    _tutorial().show_configuration_guide()
 
 @tutorial.command()  
 def tips():
@@ -114,7 +196,7 @@ def tips():
     
     Level up your qcraft skills!
     """
-    tutorial_system.show_tips_and_tricks()
+    _tutorial().show_tips_and_tricks()
 
 @click.group()
 def cli():
@@ -128,12 +210,107 @@ def cli():
 
     
     
+def _build_catalog(schema, previous=None):
+    # parse the DDL once now so later commands only load the stored catalog
+    # and the empty SQLite copy used to validate generated SQL (patched from
+    # the previous schema's copy when there is one)
+    from .catalog import load_catalog
+    from .validate import build_database
+    from .compact import compact_lines, render
+    from .prune import estimate_tokens
+    stats = load_catalog(schema).stats()
+    if stats["tables"]:
+        console.print(f"[green]Catalog: {stats['tables']} tables, {stats['columns']} columns, "
+                      f"{stats['foreign_keys']} foreign keys, {stats['checks']} checks.[/green]")
+        build_database(schema, previous)
+        lines = compact_lines(schema)
+        if lines:
+            console.print(f"[green]Compact schema: ~{estimate_tokens(render(lines))} prompt tokens instead of "
+                          f"~{estimate_tokens(schema)} (SCHEMA_FORMAT={_schema_format()}).[/green]")
+        elif _schema_format() == "compact":
+            console.print("[dim]Compact schema: not used, the DDL is smaller or has views or other objects "
+                          "the notation leaves out.[/dim]")
+
+
+# what `qcraft use NAME` puts back
+_SCHEMA_SETTINGS = (SCHEMA_REF, "SCHEMA_SOURCE", "SCHEMA_FINGERPRINT", "SCHEMA_DSN")
+
+
+def _keep_name(name):
+    # the schema in the config is now `name`'s, or no name's
+    from .config import name_schema
+    if name != get_config("SCHEMA_NAME"):
+        set_config("SCHEMA_NAME", name)
+    if name:
+        name_schema(name, {key: get_config(key) for key in _SCHEMA_SETTINGS})
+
+
+def _set_schema(schema, source=None, fingerprint=None, dsn=None, name=None):
+    # one write that swaps the schema and keeps every other setting; the last
+    # question and answer were about the old schema, so they go
+    previous = get_config("SCHEMA")
+    update_config({"SCHEMA": schema, "SCHEMA_SOURCE": source, "SCHEMA_FINGERPRINT": fingerprint,
+                   "SCHEMA_DSN": dsn, "SCHEMA_NAME": name, "REC_Q": None, "REC_OUTPUT": None})
+    _build_catalog(schema, previous)
+    _keep_name(name)
+
+
+def _extract(path):
+    # a schema file is taken as written; a dump with data in it (or too big to
+    # be hand-written) is reduced to its DDL, streamed so the data is never loaded
+    from .dump import PLAIN_LIMIT, extract_ddl
+    with span("schema.extract"):
+        ddl, info = extract_ddl(path)
+    if not info["skipped"] and info["bytes"] <= PLAIN_LIMIT:
+        with open(path, "r") as f:
+            data = f.read()
+        console.print(f"[green]Schema extracted from {path}.[/green]")
+        return data
+    if not ddl:
+        raise ValueError(f"no CREATE TABLE, VIEW or INDEX statements in {path}")
+    console.print(f"[green]Schema extracted from {path}: {info['statements']} DDL statements "
+                  f"({len(ddl) / 1e3:,.0f} KB) kept, {info['skipped'] / 1e6:,.1f} of {info['bytes'] / 1e6:,.1f} MB "
+                  f"of INSERT/COPY data skipped.[/green]")
+    return ddl
+
+
+def _ingest_database(source, read, fingerprint=None, dsn=None, name=None):
+    """Store the schema read from a database, unless it did not change.
+
+    `fingerprint` is a cheap change marker taken before reading (SQLite's
+    schema version); without one the schema is read and compared by hash.
+    """
+    from .catalog import schema_hash
+    current = get_config("SCHEMA")
+    if current and fingerprint and fingerprint == get_config("SCHEMA_FINGERPRINT"):
+        console.print(f"[green]Schema unchanged since the last read of {source}.[/green]")
+        _keep_name(name)
+        return
+    with span("schema.introspect"):
+        schema, fingerprint = read()
+    if current and schema_hash(schema) == schema_hash(current):
+        update_config({"SCHEMA_SOURCE": source, "SCHEMA_FINGERPRINT": fingerprint, "SCHEMA_DSN": dsn})
+        console.print(f"[green]Schema unchanged since the last read of {source}.[/green]")
+        _keep_name(name)
+        return
+    console.print(f"[green]Schema read from {source}.[/green]")
+    _set_schema(schema, source, fingerprint, dsn, name)
+
+
 @cli.command()
 @click.option('--paste', help="Provide schema by pasting it directly.")
 @click.option('--extract', type=click.Path(exists=True), help="Provide schema by extracting it from a file.")
-def method(paste, extract):
+@click.option('--from-sqlite', 'sqlite_path', type=click.Path(exists=True, dir_okay=False), help="Read the schema from a SQLite database file.")
+@click.option('--from-dbapi', 'dbapi', metavar='MODULE:CALLABLE', help="Read the schema through a DB-API driver's connect function, e.g. psycopg2:connect (with --dsn).")
+@click.option('--dsn', help="Connection string passed to the --from-dbapi callable.")
+@click.option('--refresh', is_flag=True, help="Read the database the schema came from again, if it changed.")
+@click.option('--name', help="Save the schema under NAME too, to switch back to it with `qcraft use NAME`; alone it names the current schema.")
+def method(paste, extract, sqlite_path, dbapi, dsn, refresh, name):
     """Sets the database schema to be used for the conversion.
 
+    Other settings (query type, provider, model, API key) are kept.
+    Schemas are stored by content hash; the config only refers to one.
+
     Example:
 
       qcraft method --extract "schema.txt" \n Simply provide schema file in any format
@@ -147,19 +324,86 @@ def method(paste, extract):
         price DECIMAL(10, 2) NOT NULL,
         category VARCHAR(50)
       )" \n Simply paste the schema
+
+      or
+
+      qcraft method --from-sqlite shop.db \n read it from the database; run it again
+      (or qcraft method --refresh) to pick up changes, an unchanged database is not re-read
+
+      qcraft method --from-dbapi psycopg2:connect --dsn "dbname=shop"
+
+      qcraft method --name warehouse --from-sqlite warehouse.db \n then qcraft use warehouse
     """
-    if paste:
-        flush_config()
-        console.print("[green]Schema provided via paste.[/green]")
-        set_config("SCHEMA", paste)
-    elif extract:
-        flush_config()
-        with open(extract, "r") as f:
-            data = f.read()
-        console.print(f"[green]Schema extracted from {extract}.[/green]")
-        set_config("SCHEMA", data)
-    else:
-        console.print("[yellow]Please provide a schema using --paste or --extract.[/yellow]")
+    from . import introspect
+    if refresh:
+        name = name or get_config("SCHEMA_NAME")
+        source = get_config("SCHEMA_SOURCE") or ""
+        if source.startswith("sqlite:"):
+            sqlite_path = source[len("sqlite:"):]
+        elif source.startswith("dbapi:"):
+            dbapi, dsn = source[len("dbapi:"):], get_config("SCHEMA_DSN")
+        else:
+            console.print("[yellow]The schema was not read from a database, nothing to refresh.[/yellow]")
+            return
+    try:
+        if paste:
+            console.print("[green]Schema provided via paste.[/green]")
+            _set_schema(paste, name=name)
+        elif extract:
+            _set_schema(_extract(extract), name=name)
+        elif sqlite_path:
+            _ingest_database(introspect.source_of(sqlite_path), lambda: introspect.read_sqlite(sqlite_path),
+                             introspect.sqlite_fingerprint(sqlite_path), name=name)
+        elif dbapi:
+            def read():
+                conn = introspect.connect(dbapi, dsn)
+                try:
+                    return introspect.read_dbapi(conn)
+                finally:
+                    conn.close()
+            _ingest_database(f"dbapi:{dbapi}", read, dsn=dsn, name=name)
+        elif name and get_config(SCHEMA_REF):
+            _keep_name(name)
+            console.print(f"[green]Current schema saved as '{name}'.[/green]")
+        else:
+            console.print("[yellow]Please provide a schema using --paste, --extract, --from-sqlite or --from-dbapi.[/yellow]")
+    except Exception as e:  # DB-API drivers raise their own error classes
+        console.print(f"[bold red]Error:[/bold red] {e}")
+
+
+@cli.command()
+@click.argument("name", required=False)
+def use(name):
+    """Switch to a schema saved with `qcraft method --name NAME`.
+
+    Nothing is read or parsed again, so this is instant for any schema size.
+    Without NAME, lists the saved schemas.
+
+    Example:
+
+      qcraft method --name warehouse --from-sqlite warehouse.db
+
+      qcraft method --name app --extract app.sql
+
+      qcraft use warehouse
+    """
+    from .config import schema_names, schema_store
+    names = schema_names()
+    if not name:
+        if not names:
+            console.print("[yellow]No saved schemas, add one with qcraft method --name NAME ...[/yellow]")
+        active = get_config("SCHEMA_NAME")
+        for saved, settings in sorted(names.items()):
+            marker = "*" if saved == active else " "
+            console.print(f"{marker} [cyan]{saved}[/cyan] {settings.get('SCHEMA_SOURCE') or ''}")
+        return
+    settings = names.get(name)
+    if settings is None or not (schema_store() / f"{settings.get(SCHEMA_REF)}.sql").exists():
+        known = ", ".join(sorted(names)) or "none"
+        console.print(f"[bold red]Error:[/bold red] no saved schema '{name}' (saved: {known}).")
+        return
+    update_config({**settings, "SCHEMA_NAME": name, "REC_Q": None, "REC_OUTPUT": None})
+    console.print(f"[green]Using schema '{name}'.[/green]")
 
 
 @cli.command(name="query-type")
@@ -178,17 +422,713 @@ def query_type(query_type):
         console.print("[yellow]Please provide a schema first using the 'method' command.[/yellow]")
 
 
+async def _cached_call_async(cache, kind, provider, model, api_key, schema, query_type, on_token=None, **prompt):
+    """Serve a prompt from the response cache, or ask the provider and remember the answer.
+
+    Returns (text, prompt_tokens, completion_tokens, hit). With cache=None every
+    call goes to the provider. on_token gets the streamed text deltas. The
+    SQLite lookups and the ledger write run on a worker thread, so other
+    requests on the loop (batch, `qcraft serve`) keep going meanwhile.
+    """
+    import asyncio
+    from .cache import make_key
+    from .ledger import record
+    from .providers import get_provider
+    llm = get_provider(provider, model, api_key)
+    model = None if provider == 'free' else model
+    start = time.perf_counter()
+    try:
+        if cache is None:
+            result = (*await llm.complete(kind, schema, query_type, on_token, **prompt), False)
+        else:
+            parts = [prompt.get(name) for name in ("nl_query", "rec_q", "rec_o", "reason") if prompt.get(name) is not None]
+            with span("cache.lookup"):
+                key = make_key(kind, provider, model, schema, query_type, *parts)
+                cached = await asyncio.to_thread(cache.get, key)
+            if cached is None and kind == "convert":
+                cached = await asyncio.to_thread(_find_similar, cache, schema, query_type, prompt.get("nl_query"))
+            if cached is not None:
+                result = (*cached, True)
+            else:
+                text, i_tokens, o_tokens = await llm.complete(kind, schema, query_type, on_token, **prompt)
+                with span("cache.store"):
+                    await asyncio.to_thread(cache.put, key, kind, text, i_tokens, o_tokens)
+                result = (text, i_tokens, o_tokens, False)
+    except Exception as e:
+        await asyncio.to_thread(record, kind, provider, model, schema, time.perf_counter() - start, ok=False,
+                                error=str(e) or type(e).__name__)
+        raise
+    _usage.get()["cached_tokens"] += llm.cached_tokens
+    await asyncio.to_thread(record, kind, provider, model, schema, time.perf_counter() - start, result[1], result[2],
+                            hit=result[3], cached_tokens=llm.cached_tokens)
+    return result
+
+
+def _similar_threshold():
+    # SIMILAR_THRESHOLD in the config, 0..1; 0 or "off" turns near-duplicate answers off
+    from .similar import DEFAULT_THRESHOLD
+    value = (get_config("SIMILAR_THRESHOLD") or "").strip().lower()
+    if value == "off":
+        return None
+    try:
+        threshold = float(value) if value else DEFAULT_THRESHOLD
+    except ValueError:
+        return DEFAULT_THRESHOLD
+    return threshold if threshold > 0 else None
+
+
+def _find_similar(cache, schema, query_type, nl_query):
+    """(text, prompt_tokens, completion_tokens) answering a near-duplicate of
+    `nl_query` asked before, or None."""
+    from .cache import similar_scope
+    from .similar import vocabulary
+    threshold = _similar_threshold()
+    if not nl_query or threshold is None:
+        return None
+    with span("cache.similar"):
+        found = cache.find_similar(similar_scope(schema, query_type), nl_query, threshold, vocabulary(schema))
+    if found is None:
+        return None
+    _usage.get()["similar"] = (found[3], found[4])
+    return found[:3]
+
+
+def _remember_similar(cache, schema, query_type, nl_query, text, i_tokens, o_tokens):
+    if cache is not None and _similar_threshold() is not None:
+        from .cache import similar_scope
+        from .similar import vocabulary
+        with span("cache.similar"):
+            cache.put_similar(similar_scope(schema, query_type), nl_query, text, i_tokens, o_tokens,
+                              vocabulary(schema))
+
+
+def _cached_call(cache, kind, provider, model, api_key, schema, query_type, on_token=None, **prompt):
+    # the one-shot commands block on the async call
+    from .providers import run
+    return run(_cached_call_async(cache, kind, provider, model, api_key, schema, query_type, on_token, **prompt))
+
+
+def _backends(race, hedge_after, provider, model):
+    # what to race, in launch order, or None for one plain request
+    from .hedge import parse_backends
+    if race:
+        try:
+            return parse_backends(race, model)
+        except ValueError as e:
+            raise click.BadParameter(str(e), param_hint="--race")
+    if hedge_after is not None:
+        return [(provider, model), (provider, model)]  # hedge against a second copy of itself
+    return None
+
+
+async def _answer_async(cache, kind, provider, model, api_key, schema, query_type, on_token=None, backends=None,
+                        hedge_after=None, **prompt):
+    """_cached_call_async, raced across `backends` when there are any.
+
+    Returns (text, prompt_tokens, completion_tokens, hit, race_info); race_info
+    is None for a plain request.
+    """
+    if not backends:
+        return (*await _cached_call_async(cache, kind, provider, model, api_key, schema, query_type, on_token,
+                                          **prompt), None)
+    from .hedge import race
+    from .providers import get_provider
+    # SDK imports and client set-up happen now, before the race starts its
+    # clock, not inside the first backend's request where they hold back the hedge
+    with span("race.warm"):
+        for backend in backends:
+            await get_provider(*backend, api_key).warm()
+
+    async def call(provider, model):
+        return await _cached_call_async(cache, kind, provider, model, api_key, schema, query_type, **prompt)
+
+    result, info = await race(backends, call, hedge_after or 0.0)
+    return (*result, info)
+
+
+def _answer(*args, **kwargs):
+    from .providers import run
+    return run(_answer_async(*args, **kwargs))
+
+
+async def _convert_async(cache, provider, model, api_key, schema, query_type, nl_query, on_token=None, backends=None,
+                         hedge_after=None, validator=None, max_attempts=1, on_retry=None, first=None, rules=None):
+    """Convert, then EXPLAIN the answer locally and retry with the engine error
+    as the reason until it passes or `max_attempts` answers have been tried.
+
+    `first` is an answer already in hand, as _answer_async returns it, to
+    validate instead of asking for one. `rules` (see _local_rules) gets the
+    first go at the question; its answer is used when it validates. Returns
+    (text, prompt_tokens, completion_tokens, hit, race_info, check); check is
+    None without a validator, else a dict with status/error/attempts/seconds.
+    The rules, EXPLAIN and similar-question writes run on a worker thread.
+    """
+    import asyncio
+    from .validate import timed_check
+    if first is None and rules is not None:
+        local = await asyncio.to_thread(_local_answer, rules, schema, nl_query, validator)
+        if local is not None:
+            return local
+    text, i_tokens, o_tokens, hit, race_info = first or await _answer_async(
+        cache, "convert", provider, model, api_key, schema, query_type, on_token=on_token, backends=backends,
+        hedge_after=hedge_after, nl_query=nl_query)
+    if validator is None:
+        if not hit:
+            await asyncio.to_thread(_remember_similar, cache, schema, query_type, nl_query, text, i_tokens, o_tokens)
+        return text, i_tokens, o_tokens, hit, race_info, None
+    check = {"status": None, "error": None, "attempts": 1, "seconds": 0.0}
+    while True:
+        with span("validate"):
+            status, error, seconds = await asyncio.to_thread(timed_check, validator, text)
+        check.update(status=status, error=error, seconds=check["seconds"] + seconds)
+        if status != "error" or check["attempts"] >= max_attempts:
+            if status != "error" and not hit:
+                # answers served from the cache were remembered when first asked
+                await asyncio.to_thread(_remember_similar, cache, schema, query_type, nl_query, text, i_tokens,
+                                        o_tokens)
+            return text, i_tokens, o_tokens, hit, race_info, check
+        if on_retry:
+            on_retry(check["attempts"], error)
+        text, more_in, more_out, retry_hit, race_info = await _answer_async(
+            cache, "retry", provider, model, api_key, schema, query_type, backends=backends, hedge_after=hedge_after,
+            rec_q=nl_query, rec_o=text, reason=error)
+        i_tokens, o_tokens, hit = i_tokens + more_in, o_tokens + more_out, hit and retry_hit
+        check["attempts"] += 1
+
+
+def _local_rules(no_local, schema, query_type):
+    """The local fast path as a question -> SQL-or-None callable, or None when
+    it is off (--no-local, LOCAL_RULES=off) or the query type is not SQL.
+
+    Built on the full schema's catalog, not the pruned prompt schema."""
+    from .validate import is_sql
+    if no_local or not schema or not is_sql(query_type):
+        return None
+    if (get_config("LOCAL_RULES") or "").strip().lower() in ("off", "0", "false", "no"):
+        return None
+    from .catalog import load_catalog
+    from .rules import generate
+    catalog = load_catalog(schema)
+    return lambda question: generate(catalog, question, query_type)
+
+
+def _local_answer(rules, schema, nl_query, validator):
+    # the _convert_async result for a question the rules answer, None to ask the model
+    from .ledger import record
+    from .validate import timed_check
+    start = time.perf_counter()
+    with span("rules"):
+        text = rules(nl_query)
+    if text is None:
+        return None
+    check = None
+    if validator is not None:
+        with span("validate"):
+            status, error, seconds = timed_check(validator, text)
+        if status == "error":
+            return None  # the model gets the question
+        check = {"status": status, "error": error, "attempts": 1, "seconds": seconds}
+    elapsed = time.perf_counter() - start
+    _usage.get()["local"] = elapsed
+    record("convert", "local", None, schema, elapsed)
+    return text, 0, 0, False, None, check
+
+
+async def _candidates_async(cache, provider, model, api_key, schema, query_type, nl_query, n):
+    """`n` sampled conversions of `nl_query`, cached as one entry.
+
+    Returns ([text, ...], prompt_tokens, completion_tokens, hit).
+    """
+    import json
+    from .cache import make_key
+    from .ledger import record
+    from .providers import get_provider
+    key = make_key("candidates", provider, None if provider == 'free' else model, schema, query_type, nl_query, str(n))
+    start = time.perf_counter()
+    cached = cache.get(key) if cache is not None else None
+    if cached is not None:
+        record("convert", provider, model, schema, time.perf_counter() - start, cached[1], cached[2], hit=True)
+        return json.loads(cached[0]), cached[1], cached[2], True
+    llm = get_provider(provider, model, api_key)
+    try:
+        texts, i_tokens, o_tokens = await llm.complete_many("convert", schema, query_type, n, nl_query=nl_query)
+    except Exception as e:
+        record("convert", provider, model, schema, time.perf_counter() - start, ok=False, error=str(e))
+        raise
+    _usage.get()["cached_tokens"] += llm.cached_tokens
+    record("convert", provider, model, schema, time.perf_counter() - start, i_tokens, o_tokens,
+           cached_tokens=llm.cached_tokens)
+    if cache is not None:
+        cache.put(key, "candidates", json.dumps(texts), i_tokens, o_tokens)
+    return texts, i_tokens, o_tokens, False
+
+
+async def _best_candidate_async(cache, provider, model, api_key, schema, query_type, nl_query, n, validator=None,
+                                max_attempts=1, on_retry=None):
+    """Sample `n` conversions, rank them locally and repair the best if it still fails.
+
+    Returns (ranked, sampled, prompt_tokens, completion_tokens, hit, check);
+    ranked[0] is the answer to show.
+    """
+    from .candidates import rank
+    texts, i_tokens, o_tokens, hit = await _candidates_async(cache, provider, model, api_key, schema, query_type,
+                                                             nl_query, n)
+    start = time.perf_counter()
+    ranked = rank(texts, validator)
+    if not ranked:
+        raise RuntimeError("every candidate came back empty")
+    check = None
+    if validator is not None:
+        best = ranked[0]
+        check = {"status": best["status"], "error": best["error"], "attempts": 1,
+                 "seconds": time.perf_counter() - start}
+        if best["status"] == "error" and max_attempts > 1:
+            # nothing passed: fall back to repairing the best-ranked answer
+            query, more_in, more_out, retry_hit, _, repaired = await _convert_async(
+                cache, provider, model, api_key, schema, query_type, nl_query, validator=validator,
+                max_attempts=max_attempts, on_retry=on_retry, first=(best["query"], 0, 0, hit, None))
+            i_tokens, o_tokens, hit = i_tokens + more_in, o_tokens + more_out, retry_hit
+            repaired["seconds"] += check["seconds"]
+            check = repaired
+            ranked[0] = {"query": query, "votes": best["votes"], "status": check["status"], "error": check["error"],
+                         "plan": validator.plan_size(query) if check["status"] == "ok" else None}
+    return ranked, len(texts), i_tokens, o_tokens, hit, check
+
+
+def _print_candidates(ranked, sampled):
+    best = ranked[0]
+    if best["status"] == "ok":
+        detail = f"best passed EXPLAIN (plan {best['plan']} ops, {best['votes']} vote{'s' if best['votes'] != 1 else ''})"
+    else:
+        detail = f"best has {best['votes']} vote{'s' if best['votes'] != 1 else ''}"
+    more = f"; 'qcraft assist next' shows the other {len(ranked) - 1}" if len(ranked) > 1 else ""
+    console.print(f"[bold cyan]Candidates:[/bold cyan] {sampled} sampled, {len(ranked)} distinct; {detail}{more}")
+
+
+def _validator(no_validate, schema, query_type):
+    if no_validate:
+        return None
+    from .validate import load_validator
+    with span("validator.load"):
+        return load_validator(schema, query_type)
+
+
+def _max_attempts(max_attempts):
+    from .validate import DEFAULT_MAX_ATTEMPTS
+    if max_attempts:
+        return max_attempts
+    try:
+        return max(1, int(get_config("VALIDATE_ATTEMPTS") or DEFAULT_MAX_ATTEMPTS))
+    except ValueError:
+        return DEFAULT_MAX_ATTEMPTS
+
+
+def _print_check(check):
+    attempts = f"{check['attempts']} attempt{'s' if check['attempts'] != 1 else ''}"
+    ms = check["seconds"] * 1000
+    if check["status"] == "ok":
+        console.print(f"[bold cyan]Validation:[/bold cyan] passed EXPLAIN ({attempts}, {ms:.1f} ms validating)")
+    elif check["status"] == "unchecked":
+        console.print(f"[bold cyan]Validation:[/bold cyan] not checkable in SQLite ({check['error']}; "
+                      f"{attempts}, {ms:.1f} ms validating)")
+    else:
+        console.print(f"[bold red]Validation:[/bold red] still failing after {attempts}: {check['error']} "
+                      f"({ms:.1f} ms validating)")
+
+
+def _print_retry(attempt, error):
+    console.print(f"[yellow]Attempt {attempt} failed validation ({error}), retrying...[/yellow]")
+
+
+def _duration(ctx, param, value):
+    from .hedge import parse_duration
+    if value is None:
+        return None
+    try:
+        return parse_duration(value)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+
+
+def _deadline(deadline):
+    # --deadline, else DEADLINE in the config, else no limit
+    from .hedge import parse_duration
+    if deadline is not None:
+        return deadline
+    try:
+        return parse_duration(get_config("DEADLINE")) if get_config("DEADLINE") else None
+    except ValueError:
+        return None
+
+
+def _schema_format():
+    # SCHEMA_FORMAT in the config: ddl (the schema as given) or compact
+    return "compact" if (get_config("SCHEMA_FORMAT") or "").strip().lower() == "compact" else "ddl"
+
+
+def _select_schema(schema, text, full_schema=False, schema_budget=None, report=True):
+    # send only the tables relevant to `text` when the schema is over budget,
+    # in the compact notation when SCHEMA_FORMAT says so
+    from .prune import DEFAULT_SCHEMA_BUDGET, prune_schema
+    lines = None
+    if _schema_format() == "compact":
+        from .compact import compact_lines, render
+        with span("schema.compact"):
+            lines = compact_lines(schema)
+    if full_schema:
+        return (render(lines) if lines is not None else schema), None
+    if not schema_budget:
+        try:
+            schema_budget = int(get_config("SCHEMA_BUDGET") or DEFAULT_SCHEMA_BUDGET)
+        except ValueError:
+            schema_budget = DEFAULT_SCHEMA_BUDGET
+    with span("schema.prune"):
+        pruned, info = prune_schema(schema, text, schema_budget, lines=lines)
+    if report:
+        _report_pruning(info)
+    return pruned, info
+
+
+def _report_pruning(info):
+    if info["pruned"]:
+        saved = info["tokens_before"] - info["tokens_after"]
+        console.print(f"[bold cyan]Schema:[/bold cyan] {len(info['tables'])} of {info['total_tables']} tables, "
+                      f"~{info['tokens_after']} tokens (saved ~{saved} tokens, use --full-schema to send everything)")
+
+
+def _open_cache(no_cache):
+    if no_cache:
+        return None
+    from .cache import ResponseCache
+    with span("cache.open"):
+        return ResponseCache()
+
+
+def _announce(provider, model, purpose, backends=None):
+    if backends:
+        from .hedge import label
+        console.print(f"[bold blue]Racing {', '.join(label(b) for b in backends)} for {purpose}.[/bold blue]")
+    elif provider == 'free':
+        console.print(f"[bold blue]Using free model for {purpose}.(please make sure you have stable internet connection . . . )[/bold blue]")
+    else:
+        console.print(f"[bold blue]Using {provider} with model {model} for {purpose}.[/bold blue]")
+
+
+class _Streamer:
+    """Prints streamed tokens the moment they arrive, after `header`, and
+    remembers when the first one came so TTFT can be reported."""
+
+    def __init__(self, header):
+        self.header = header
+        self.started = time.time()
+        self.first_token_at = None
+        self.finished_at = None
+        self.chunks = 0
+
+    def __call__(self, delta):
+        if self.first_token_at is None:
+            self.first_token_at = time.time()
+            console.print(self.header)
+        self.chunks += 1
+        # raw write: SQL like arr[1] must not be read as rich markup
+        console.file.write(delta)
+        console.file.flush()
+
+    def show(self, text):
+        """Print the final text unless it was already streamed."""
+        self.finished_at = time.time()
+        if self.chunks:
+            console.file.write("\n")
+        else:
+            console.print(self.header)
+            console.print(text)
+
+
+def _streamer(header, stream, backends=None):
+    if not stream:
+        return None
+    if backends:
+        # several backends writing to one terminal would interleave
+        console.print("[dim]--stream is ignored when racing backends.[/dim]")
+        return None
+    return _Streamer(header)
+
+
+def _show(header, text, streamer=None):
+    with span("render"):
+        if streamer is not None:
+            streamer.show(text)
+        else:
+            console.print(header)
+            console.print(text)
+
+
+def _print_usage(elapsed_time, i_tokens, o_tokens, hit=False, cache=None, streamer=None, counters=None):
+    console.print(f"[bold cyan]Time taken:[/bold cyan] {elapsed_time:.2f} seconds")
+    local = _usage.get().get("local")
+    if local is not None:
+        console.print(f"[bold cyan]Answered by:[/bold cyan] local rules in {local * 1000:.1f} ms, no model call "
+                      "('assist retry' asks the model instead)")
+        return
+    if streamer is not None and streamer.chunks:
+        ttft = streamer.first_token_at - streamer.started
+        generating = max(streamer.finished_at - streamer.first_token_at, 1e-6)
+        # without usage from the server every streamed chunk counts as one token
+        rate = (o_tokens or streamer.chunks) / generating
+        console.print(f"[bold cyan]Time to first token:[/bold cyan] {ttft:.2f} seconds, {rate:.1f} tokens/sec")
+    note = " (from cache, not billed)" if hit else ""
+    cached = f" ({_usage.get()['cached_tokens']} cached by the provider)" if _usage.get()["cached_tokens"] and not hit else ""
+    console.print(f"[bold cyan]Tokens Used:[/bold cyan] Prompt: {i_tokens}{cached}, Completion: {o_tokens}, Total: {i_tokens+o_tokens}{note}")
+    similar = _usage.get().get("similar")
+    if hit and similar:
+        from rich.markup import escape
+        console.print(f"[bold cyan]Similar question:[/bold cyan] reused the answer to \"{escape(similar[0])}\" "
+                      f"({similar[1]:.0%} alike, 'assist retry' asks the model instead)")
+    if cache is not None:
+        counters = cache.counters()
+    if counters is not None:  # a daemon's cache reports its counters with the answer
+        # a near-duplicate answer is not an exact-key hit: that lookup was counted as a miss
+        outcome = ("similar" if similar else "hit") if hit else "miss"
+        console.print(f"[bold cyan]Cache:[/bold cyan] {outcome} (hits: {counters.get('hits', 0)}, "
+                      f"similar: {counters.get('similar_hits', 0)}, misses: {counters.get('misses', 0)})")
+
+
+def _print_race(info, primary, hit=False):
+    from .hedge import label, latency_saved, record_race
+    notes = [f"{name} started at +{offset:.2f}s" for name, offset in info["launched"].items() if offset > 0]
+    if len(info["launched"]) == 1:
+        notes.append("no hedge needed")
+    if info["failed"]:
+        notes.append("failed: " + ", ".join(info["failed"]))
+    if info["cancelled"]:
+        notes.append("cancelled: " + ", ".join(info["cancelled"]))
+    saved = latency_saved(info, primary)
+    if saved:
+        notes.append(f"~{saved:.2f}s saved over waiting on {label(primary)}")
+    console.print(f"[bold cyan]Race:[/bold cyan] {info['winner']} answered first in {info['elapsed']:.2f}s"
+                  + (f" ({'; '.join(notes)})" if notes else ""))
+    if not hit:
+        record_race(info)
+
+
+def _forward(kind, streamer, **job):
+    """Run a convert/retry/explain in `qcraft serve` when one is running.
+
+    Returns {"answer": ..., "counters": ...} with the answer tuple the
+    in-process call would give, or None to run in this process instead.
+    Progress (streamed tokens, schema pruning, validation retries) is shown
+    as it arrives.
+    """
+    from . import trace
+    if trace.enabled():
+        return None  # --profile measures this process
+    from .daemon import forward
+
+    def on_event(event):
+        if "token" in event and streamer is not None:
+            streamer(event["token"])
+        elif "pruned" in event:
+            _report_pruning(event["pruned"])
+        elif "retry" in event:
+            _print_retry(*event["retry"])
+
+    reply = forward(dict(job, kind=kind, stream=streamer is not None), on_event)
+    if reply is not None:
+        _usage.get().update(cached_tokens=reply["cached_tokens"], similar=reply.get("similar"), local=reply.get("local"))
+    return reply
+
+
+async def _daemon_job(job, emit, cache):
+    """One forwarded job inside `qcraft serve`: the in-process convert/assist
+    path with the schema, validator, cache and provider clients already warm.
+
+    Whatever blocks (building a validator or catalog for a new schema,
+    pruning, SQLite) runs on a worker thread, so one job never holds up the
+    other clients on the daemon's loop."""
+    import asyncio
+    from .resilience import within
+    _usage.set({"cached_tokens": 0, "similar": None, "local": None})
+    provider, model, api_key = job["provider"], job.get("model"), job.get("api_key", "")
+    schema, query_type, kind = get_config("SCHEMA"), job["query_type"], job["kind"]
+    if not schema:
+        raise RuntimeError("no schema set, run 'qcraft method' first")
+    backends = _backends(job.get("race"), job.get("hedge_after"), provider, model)
+    cache = None if job.get("no_cache") else cache
+    on_token = (lambda delta: emit({"token": delta})) if job.get("stream") and not backends else None
+    if kind == "convert":
+        validator = await asyncio.to_thread(_validator, job.get("no_validate"), schema, query_type)
+        rules = await asyncio.to_thread(_local_rules, job.get("no_local"), schema, query_type)
+        text = job["nl_query"]
+    else:
+        text = f"{job['rec_q']}\n{job['rec_o']}\n{job.get('reason') if kind == 'retry' else ''}"
+    schema, info = await asyncio.to_thread(_select_schema, schema, text, job.get("full_schema"),
+                                           job.get("schema_budget"), report=False)
+    if info and info["pruned"]:
+        emit({"pruned": info})
+    with within(job.get("deadline")):
+        if kind == "convert":
+            answer = await _convert_async(cache, provider, model, api_key, schema, query_type, job["nl_query"],
+                                          on_token=on_token, backends=backends, hedge_after=job.get("hedge_after"),
+                                          validator=validator, max_attempts=job.get("max_attempts") or 1,
+                                          on_retry=lambda attempt, error: emit({"retry": [attempt, error]}),
+                                          rules=rules)
+        elif kind in ("retry", "explain"):
+            prompt = {name: job[name] for name in ("rec_q", "rec_o", "reason") if job.get(name) is not None}
+            answer = await _answer_async(cache, kind, provider, model, api_key, schema, query_type, on_token=on_token,
+                                         backends=backends, hedge_after=job.get("hedge_after"), **prompt)
+        else:
+            raise RuntimeError(f"unknown job {kind!r}")
+    return {"answer": answer, "counters": await asyncio.to_thread(cache.counters) if cache is not None else None,
+            "cached_tokens": _usage.get()["cached_tokens"], "similar": _usage.get()["similar"],
+            "local": _usage.get()["local"]}
+
+
+def _convert_batch(batch_file, out_file, concurrency, schema, query_type, provider, model, api_key, cache=None,
+                   full_schema=False, schema_budget=None, backends=None, hedge_after=None, validator=None,
+                   max_attempts=1, rules=None, deadline=None):
+    from .batch import load_questions, load_done, run_batch_async, summarize
+    from .providers import concurrency_limit, run
+    from .resilience import within
+    out_file = out_file or str(Path(batch_file).with_suffix("")) + ".results.jsonl"
+    items = load_questions(batch_file)
+    done = load_done(out_file)
+    todo = [item for item in items if item not in done]
+    if done:
+        console.print(f"[bold blue]Resuming: {len(items) - len(todo)} of {len(items)} queries already converted in {out_file}.[/bold blue]")
+    if not todo:
+        console.print("[green]Nothing left to convert.[/green]")
+        return
+
+    saved_tokens = []
+
+    async def convert_one(nl_query):
+        item_schema, info = _select_schema(schema, nl_query, full_schema, schema_budget, report=False)
+        if info and info["pruned"]:
+            saved_tokens.append(info["tokens_before"] - info["tokens_after"])
+        local = _local_answer(rules, item_schema, nl_query, validator) if rules is not None else None
+        with within(deadline):  # per question, a batch can take as long as it needs
+            query, i_tokens, o_tokens, hit, race, check = local or await _convert_async(
+                cache, provider, model, api_key, item_schema, query_type, nl_query, backends=backends,
+                hedge_after=hedge_after, validator=validator, max_attempts=max_attempts)
+        extra = {}
+        if rules is not None:
+            extra["path"] = "local" if local else "model"
+        if race is not None:
+            extra["backend"] = race["winner"]
+        if check is not None:
+            extra.update(validation=check["status"], attempts=check["attempts"], validation_error=check["error"])
+        return query, (0 if hit else i_tokens), (0 if hit else o_tokens), extra
+
+    # all requests share one event loop, the provider limit caps how many hit the server at once
+    limit = concurrency_limit(provider)
+    capped = f", capped at {limit} by {provider.upper()}_CONCURRENCY" if limit < concurrency else ""
+    if backends:
+        from .hedge import label
+        provider, capped = " / ".join(label(b) for b in backends), ""
+    console.print(f"[bold blue]Converting {len(todo)} queries with {provider} ({concurrency} at a time{capped}) into {out_file}[/bold blue]")
+    from rich.progress import Progress
+    start_time = time.perf_counter()
+    records = []
+    try:
+        with Progress(console=console) as progress:
+            task = progress.add_task("Converting", total=len(todo))
+            records = run(run_batch_async(todo, convert_one, out_file, concurrency,
+                                          on_result=lambda record: progress.advance(task)))
+    except KeyboardInterrupt:
+        console.print(f"[yellow]Interrupted. Finished results are saved in {out_file}; run the same command again to resume.[/yellow]")
+        return
+    elapsed_time = time.perf_counter() - start_time
+
+    stats = summarize(records, elapsed_time)
+    console.print(f"[bold green]Converted:[/bold green] {stats['ok']} ok, {stats['failed']} failed -> {out_file}")
+    console.print(f"[bold cyan]Time taken:[/bold cyan] {elapsed_time:.2f} seconds ({stats['throughput']:.2f} queries/sec)")
+    console.print(f"[bold cyan]Latency:[/bold cyan] p50: {stats['p50']:.2f}s, p95: {stats['p95']:.2f}s, p99: {stats['p99']:.2f}s")
+    cached = f" ({_usage.get()['cached_tokens']} cached by the provider)" if _usage.get()["cached_tokens"] else ""
+    console.print(f"[bold cyan]Tokens Used:[/bold cyan] Prompt: {stats['prompt_tokens']}{cached}, Completion: {stats['completion_tokens']}, Total: {stats['total_tokens']}")
+    if saved_tokens:
+        console.print(f"[bold cyan]Schema pruning:[/bold cyan] {len(saved_tokens)} prompts trimmed, ~{sum(saved_tokens)} prompt tokens saved")
+    winners = {}
+    for record in records:
+        if record.get("backend"):
+            winners[record["backend"]] = winners.get(record["backend"], 0) + 1
+    if winners:
+        console.print("[bold cyan]Race winners:[/bold cyan] " + ", ".join(
+            f"{name}: {n}" for name, n in sorted(winners.items(), key=lambda kv: -kv[1])))
+    local = sum(r.get("path") == "local" for r in records)
+    if local:
+        console.print(f"[bold cyan]Local rules:[/bold cyan] {local} of {len(records)} answered without a model call")
+    checked = [r for r in records if r.get("validation")]
+    if checked:
+        counts = {status: sum(r["validation"] == status for r in checked) for status in ("ok", "unchecked", "error")}
+        retried = sum(r["attempts"] - 1 for r in checked)
+        console.print(f"[bold cyan]Validation:[/bold cyan] {counts['ok']} passed, {counts['unchecked']} not checkable, "
+                      f"{counts['error']} still failing; {retried} automatic retries")
+
+
+def _convert_candidates(cache, provider, model, api_key, schema, full, query_type, nl_query, n, full_schema,
+                        schema_budget, validator, max_attempts, ignored, deadline=None):
+    from .candidates import save
+    from .providers import run
+    from .resilience import within
+    if ignored:
+        console.print("[dim]--stream, --race and --hedge-after are ignored with --candidates.[/dim]")
+    _announce(provider, model, "conversion")
+    schema, _ = _select_schema(schema, nl_query, full_schema, schema_budget)
+    start_time = time.time()
+    try:
+        with within(deadline):
+            ranked, sampled, i_tokens, o_tokens, hit, check = run(_best_candidate_async(
+                cache, provider, model, api_key, schema, query_type, nl_query, n, validator, max_attempts,
+                on_retry=lambda attempt, error: console.print(
+                    f"[yellow]Best candidate attempt {attempt} failed validation ({error}), retrying...[/yellow]")))
+        elapsed_time = time.time() - start_time
+        query = ranked[0]["query"]
+        save(nl_query, full, ranked)
+        _show("[bold green]Generated Query:[/bold green]", query)
+        _copy(query)
+        set_config("REC_OUTPUT", query)
+        _print_usage(elapsed_time, i_tokens, o_tokens, hit, cache)
+        _print_candidates(ranked, sampled)
+        if check:
+            _print_check(check)
+    except Exception as e:
+        console.print(f"[bold red]Error:[/bold red] {e}")
+
+
 @cli.command()
-@click.argument("nl_query")
+@click.argument("nl_query", required=False)
 @click.option('--provider', type=click.Choice(['openai', 'lmstudio', 'ollama','free']), help='The LLM provider to use.')
 @click.option('--api-key', help='The API key for the LLM provider.')
 @click.option('--model', help='The model to use for conversion.')
-def convert(nl_query, provider, model, api_key):
+@click.option('--batch', 'batch_file', type=click.Path(exists=True, dir_okay=False), help='Convert every query in a JSONL/text file (one per line).')
+@click.option('--out', 'out_file', type=click.Path(dir_okay=False), help='Batch results file (JSONL), defaults to <batch>.results.jsonl.')
+@click.option('--concurrency', default=4, show_default=True, type=click.IntRange(min=1), help='Requests in flight at once in batch mode.')
+@click.option('--no-cache', is_flag=True, help='Always ask the provider, ignoring the response cache.')
+@click.option('--schema-budget', type=click.IntRange(min=1), help='Max schema tokens per prompt before irrelevant tables are dropped (default: SCHEMA_BUDGET config or 4000).')
+@click.option('--full-schema', is_flag=True, help='Always send the whole schema, no pruning.')
+@click.option('--stream', is_flag=True, help='Print the answer token by token as the model writes it (openai/lmstudio/ollama).')
+@click.option('--race', help='Ask several backends and keep the first answer, e.g. "free,ollama:llama3" (provider[:model], comma separated).')
+@click.option('--hedge-after', callback=_duration, help='Start the next --race backend (or a second request to --provider) only if nothing came back after this long, e.g. 2s or 500ms.')
+@click.option('--deadline', callback=_duration, help='Give up on the provider after this long in all, retries included, e.g. 15s (default: DEADLINE config, or no limit).')
+@click.option('--no-validate', is_flag=True, help='Skip the local EXPLAIN check of generated SQL.')
+@click.option('--max-attempts', type=click.IntRange(min=1), help='Answers to try before giving up on validation (default: VALIDATE_ATTEMPTS config or 3).')
+@click.option('--candidates', type=click.IntRange(min=1), help='Sample this many answers at once and keep the best by local EXPLAIN, plan size and agreement.')
+@click.option('--no-local', is_flag=True, help='Always ask the model, even for questions the local rules can answer.')
+@_profiled
+def convert(nl_query, provider, model, api_key, batch_file, out_file, concurrency, no_cache, schema_budget, full_schema, stream,
+            race, hedge_after, deadline, no_validate, max_attempts, candidates, no_local):
     """Converts a natural language query to SQL.
     exmaple :\n
     qcraft convert "fetech all the orders below 1000$" --provider free 
     \n
-    qcraft convert "find costomers who created account on 31 jan" --provider "openai" --api-key "<your key>" --model "gpt-4o-mini" """
+    qcraft convert "find costomers who created account on 31 jan" --provider "openai" --api-key "<your key>" --model "gpt-4o-mini" 
+    \n
+    qcraft convert --batch questions.jsonl --out results.jsonl --concurrency 8 --provider ollama --model gemma3 \n
+    (re-run the same command to resume an interrupted batch)
+    \n
+    qcraft convert "orders over 1000$" --race free,ollama:gemma3 --hedge-after 2s
+    \n
+    qcraft convert "orders over 1000$" --candidates 5 --provider ollama --model gemma3"""
     if get_config("TYPE"):
         schema = get_config("SCHEMA")
         query_type = get_config("TYPE")
@@ -197,63 +1137,87 @@ def convert(nl_query, provider, model, api_key):
         provider = provider or get_config("DEFAULT_PROVIDER", "openai")
         model = model or get_config("DEFAULT_MODEL", "gpt-3.5-turbo")
         api_key = api_key or get_config("API_KEY", "")
+        backends = _backends(race, hedge_after, provider, model)
+        max_attempts = _max_attempts(max_attempts)
+        deadline = _deadline(deadline)
+        if batch_file and candidates and candidates > 1:
+            raise click.UsageError("--candidates cannot be combined with --batch")
+        if batch_file:
+            _convert_batch(batch_file, out_file, concurrency, schema, query_type, provider, model, api_key,
+                           _open_cache(no_cache), full_schema, schema_budget, backends, hedge_after,
+                           _validator(no_validate, schema, query_type), max_attempts,
+                           _local_rules(no_local, schema, query_type), deadline)
+            return
+        if not nl_query:
+            console.print("[yellow]Please provide a query to convert, or a file with --batch.[/yellow]")
+            return
         set_config("REC_Q",nl_query)
-        base_url = None
+        full = schema
+        if candidates and candidates > 1:
+            _convert_candidates(_open_cache(no_cache), provider, model, api_key, schema, full, query_type, nl_query,
+                                candidates, full_schema, schema_budget, _validator(no_validate, schema, query_type),
+                                max_attempts, stream or backends, deadline)
+            return
+        from .candidates import discard
+        discard()
+        _announce(provider, model, "conversion", backends)
+        header = "[bold green]Generated Query:[/bold green]"
+        streamer = _streamer(header, stream, backends)
+        cache = counters = None
+        _usage.set({"cached_tokens": 0, "similar": None, "local": None})
         start_time = time.time()
-        if provider == 'free':
-            console.print(f"[bold blue]Using free model for conversion.(please make sure you have stable internet connection . . . )[/bold blue]")
-            try:
-                query, i_tokens, o_tokens = req_call(nl_query, schema, query_type)
-                console.print("[bold green]Generated Query:[/bold green]")
-                console.print(query)
-                pyperclip.copy(query)
-                set_config("REC_OUTPUT",query)
-                end_time = time.time()
-                elapsed_time = end_time - start_time
-                console.print(f"[bold cyan]Time taken:[/bold cyan] {elapsed_time:.2f} seconds")
-                console.print(f"[bold cyan]Tokens Used:[/bold cyan] Prompt: {i_tokens}, Completion: {o_tokens}, Total: {i_tokens+o_tokens}")
-            except Exception as e:
-                console.print(f"[bold red]Error:[/bold red] {e}")
-        else:
-            if provider == 'lmstudio':
-                base_url = "http://localhost:1234/v1"
-            elif provider == 'ollama':
-                base_url = "http://localhost:11434/v1"
-
-            llm = OpenAI(api_key=api_key, base_url=base_url, model=model)
-            console.print(f"[bold blue]Using {provider} with model {model} for conversion.[/bold blue]")
-
-            start_time = time.time()
-            try:
-                output, usage = llm.nl_to_query(nl_query, schema, query_type)
-                end_time = time.time()
-                elapsed_time = end_time - start_time
-
-                # Display the query without rich.Panel or rich.Syntax
-                console.print("[bold green]Generated Query:[/bold green]")
-                console.print(output)
-                pyperclip.copy(output)
-                set_config("REC_OUTPUT",output)
-                console.print(f"[bold cyan]Time taken:[/bold cyan] {elapsed_time:.2f} seconds")
-                if usage:
-                    prompt_tokens = usage.get('prompt_tokens', 'N/A')
-                    completion_tokens = usage.get('completion_tokens', 'N/A')
-                    total_tokens = usage.get('total_tokens', 'N/A')
-                    console.print(f"[bold cyan]Tokens Used:[/bold cyan] Prompt: {prompt_tokens}, Completion: {completion_tokens}, Total: {total_tokens}")
-
-            except Exception as e:
-                console.print(f"[bold red]An error occurred:[/bold red] {e}")
+        try:
+            remote = _forward("convert", streamer, provider=provider, model=model, api_key=api_key,
+                              query_type=query_type, nl_query=nl_query, no_cache=no_cache, full_schema=full_schema,
+                              schema_budget=schema_budget, race=race, hedge_after=hedge_after, deadline=deadline,
+                              no_validate=no_validate, max_attempts=max_attempts, no_local=no_local)
+            if remote:
+                (query, i_tokens, o_tokens, hit, race_info, check), counters = remote["answer"], remote["counters"]
+            else:
+                from .providers import run
+                from .resilience import within
+                cache = _open_cache(no_cache)
+                validator = _validator(no_validate, schema, query_type)
+                rules = _local_rules(no_local, schema, query_type)
+                schema, _ = _select_schema(schema, nl_query, full_schema, schema_budget)
+                with within(deadline):
+                    query, i_tokens, o_tokens, hit, race_info, check = run(_convert_async(
+                        cache, provider, model, api_key, schema, query_type, nl_query, on_token=streamer,
+                        backends=backends, hedge_after=hedge_after, validator=validator, max_attempts=max_attempts,
+                        on_retry=_print_retry, rules=rules))
+            elapsed_time = time.time() - start_time
+            if check and check["attempts"] > 1 and streamer is not None and streamer.chunks:
+                streamer = None  # what was streamed is the first, rejected answer
+            _show(header, query, streamer)
+            _copy(query)
+            set_config("REC_OUTPUT",query)
+            _print_usage(elapsed_time, i_tokens, o_tokens, hit, cache, streamer, counters)
+            if check:
+                _print_check(check)
+            if race_info:
+                _print_race(race_info, backends[0], hit)
+        except Exception as e:
+            console.print(f"[bold red]Error:[/bold red] {e}")
     else:
         console.print("[yellow]Please set the query type first using the 'query-type' command.[/yellow]")
 
 
 @cli.command()
-@click.argument("action", type=click.Choice(["retry", "explain"]))
+@click.argument("action", type=click.Choice(["retry", "explain", "next"]))
 @click.argument("reason", required=False) 
 @click.option('--provider', type=click.Choice(['openai', 'lmstudio', 'ollama','free']), help='The LLM provider to use.')
 @click.option('--api-key', help='The API key for the LLM provider.')
 @click.option('--model', help='The model to use for conversion.')
-def assist(action,reason, provider, model, api_key):
+@click.option('--no-cache', is_flag=True, help='Always ask the provider, ignoring the response cache.')
+@click.option('--schema-budget', type=click.IntRange(min=1), help='Max schema tokens per prompt before irrelevant tables are dropped (default: SCHEMA_BUDGET config or 4000).')
+@click.option('--full-schema', is_flag=True, help='Always send the whole schema, no pruning.')
+@click.option('--stream', is_flag=True, help='Print the answer token by token as the model writes it (openai/lmstudio/ollama).')
+@click.option('--race', help='Ask several backends and keep the first answer, e.g. "free,ollama:llama3" (provider[:model], comma separated).')
+@click.option('--hedge-after', callback=_duration, help='Start the next --race backend (or a second request to --provider) only if nothing came back after this long, e.g. 2s or 500ms.')
+@click.option('--deadline', callback=_duration, help='Give up on the provider after this long in all, retries included, e.g. 15s (default: DEADLINE config, or no limit).')
+@_profiled
+def assist(action,reason, provider, model, api_key, no_cache, schema_budget, full_schema, stream, race, hedge_after,
+           deadline):
     """
     use this method if you are not satisfied with your previous output 
     example-
@@ -261,8 +1225,26 @@ def assist(action,reason, provider, model, api_key):
     qcraft assist retry "incorrect fetching" --provider ollama --model gemma3
     \n
     qcraft assist explain --provider openai --model gpt-4o-mini 
+    \n
+    qcraft assist next   (the next candidate from convert --candidates, no LLM call)
     """
-    if get_config("REC_OUTPUT"):
+    if action == "next" and get_config("REC_OUTPUT"):
+        from .candidates import next_candidate
+        found = next_candidate(get_config("REC_Q"), get_config("SCHEMA"))
+        if found is None:
+            console.print("[yellow]No other candidates for the last query. Try 'convert --candidates N' "
+                          "or 'assist retry'.[/yellow]")
+            return
+        candidate, position, total = found
+        _show(f"[bold green]Candidate {position} of {total}:[/bold green]", candidate["query"])
+        _copy(candidate["query"])
+        set_config("REC_OUTPUT", candidate["query"])
+        if candidate["status"] == "ok":
+            console.print(f"[bold cyan]Validation:[/bold cyan] passed EXPLAIN (plan {candidate['plan']} ops, "
+                          f"{candidate['votes']} vote{'s' if candidate['votes'] != 1 else ''})")
+        elif candidate["status"]:
+            console.print(f"[bold cyan]Validation:[/bold cyan] {candidate['status']} ({candidate['error']})")
+    elif get_config("REC_OUTPUT"):
         rec_q=get_config("REC_Q")
         rec_o=get_config("REC_OUTPUT")
            
@@ -273,98 +1255,367 @@ def assist(action,reason, provider, model, api_key):
         provider = provider or get_config("DEFAULT_PROVIDER", "openai")
         model = model or get_config("DEFAULT_MODEL", "gpt-3.5-turbo")
         api_key = api_key or get_config("API_KEY", "")
-        base_url = None
+        backends = _backends(race, hedge_after, provider, model)
+        deadline = _deadline(deadline)
+        _announce(provider, model, "conversion" if action == "retry" else "reasoning", backends)
+        header = "[bold green]Generated Query:[/bold green]" if action == "retry" else "[bold green]Reasoning :[/bold green]"
+        streamer = _streamer(header, stream, backends)
+        prompt = dict(rec_q=rec_q, rec_o=rec_o, reason=reason or "unknown") if action == "retry" else \
+            dict(rec_q=rec_q, rec_o=rec_o)
+        cache = counters = None
+        _usage.set({"cached_tokens": 0, "similar": None, "local": None})
         start_time = time.time()
-        if  action == "retry":
-            if provider == 'free':
-                try:
-                    console.print(f"[bold blue]Using free model for conversion.(please make sure you have stable internet connection . . . )[/bold blue]")
-                    query, i_tokens, o_tokens = retry_req_call(rec_q, rec_o , schema, query_type , reason)
-                    console.print("[bold green]Generated Query:[/bold green]")
-                    console.print(query)
-                    pyperclip.copy(query)
-                    set_config("REC_OUTPUT",query)
-                    end_time = time.time()
-                    elapsed_time = end_time - start_time
-                    console.print(f"[bold cyan]Time taken:[/bold cyan] {elapsed_time:.2f} seconds")
-                    console.print(f"[bold cyan]Tokens Used:[/bold cyan] Prompt: {i_tokens}, Completion: {o_tokens}, Total: {i_tokens+o_tokens}")
-                except Exception as e:
-                    console.print(f"[bold red]Error:[/bold red] {e}")
+        try:
+            remote = _forward(action, streamer, provider=provider, model=model, api_key=api_key,
+                              query_type=query_type, no_cache=no_cache, full_schema=full_schema,
+                              schema_budget=schema_budget, race=race, hedge_after=hedge_after, deadline=deadline,
+                              **prompt)
+            if remote:
+                (output, i_tokens, o_tokens, hit, race_info), counters = remote["answer"], remote["counters"]
             else:
-                if provider == 'lmstudio':
-                    base_url = "http://localhost:1234/v1"
-                elif provider == 'ollama':
-                    base_url = "http://localhost:11434/v1"
+                from .resilience import within
+                cache = _open_cache(no_cache)
+                # the previous answer names the tables that matter as well as the question does
+                schema, _ = _select_schema(schema, f"{rec_q}\n{rec_o}\n{reason or ''}", full_schema, schema_budget)
+                with within(deadline):
+                    output, i_tokens, o_tokens, hit, race_info = _answer(
+                        cache, action, provider, model, api_key, schema, query_type, on_token=streamer,
+                        backends=backends, hedge_after=hedge_after, **prompt)
+            elapsed_time = time.time() - start_time
+            _show(header, output, streamer)
+            if action == "retry":
+                _copy(output)
+                set_config("REC_OUTPUT",output)
+            _print_usage(elapsed_time, i_tokens, o_tokens, hit, cache, streamer, counters)
+            if race_info:
+                _print_race(race_info, backends[0], hit)
+        except Exception as e:
+            console.print(f"[bold red]Error:[/bold red] {e}")
+    else:
+        console.print("[yellow]Please set the query type first using the 'query-type' command.[/yellow]")
 
-                llm = OpenAI(api_key=api_key, base_url=base_url, model=model)
-                console.print(f"[bold blue]Using {provider} with model {model} for conversion.[/bold blue]")
 
-                start_time = time.time()
-                try:
-                    output, usage = llm.retrying(schema, query_type,rec_q,rec_o,reason)
-                    end_time = time.time()
-                    elapsed_time = end_time - start_time
-
-                    # Display the query without rich.Panel or rich.Syntax
-                    console.print("[bold green]Generated Query:[/bold green]")
-                    console.print(output)
-                    pyperclip.copy(output)
-                    set_config("REC_OUTPUT",output)
-                    console.print(f"[bold cyan]Time taken:[/bold cyan] {elapsed_time:.2f} seconds")
-                    if usage:
-                        prompt_tokens = usage.get('prompt_tokens', 'N/A')
-                        completion_tokens = usage.get('completion_tokens', 'N/A')
-                        total_tokens = usage.get('total_tokens', 'N/A')
-                        console.print(f"[bold cyan]Tokens Used:[/bold cyan] Prompt: {prompt_tokens}, Completion: {completion_tokens}, Total: {total_tokens}")
-
-                except Exception as e:
-                    console.print(f"[bold red]An error occurred:[/bold red] {e}")
-        elif action =="explain":
-            if provider=="free":
-                try:
-                    console.print(f"[bold blue](please make sure you have stable internet connection . . . )[/bold blue]")
-                    query, i_tokens, o_tokens = req_explain(rec_q, rec_o , schema, query_type)
-                    console.print("[bold green]Explanation forGenerated Query:[/bold green]")
-                    console.print(query)
-                    end_time = time.time()
-                    elapsed_time = end_time - start_time
-                    console.print(f"[bold cyan]Time taken:[/bold cyan] {elapsed_time:.2f} seconds")
-                    console.print(f"[bold cyan]Tokens Used:[/bold cyan] Prompt: {i_tokens}, Completion: {o_tokens}, Total: {i_tokens+o_tokens}")
-                except Exception as e:
-                    console.print(f"[bold red]Error:[/bold red] {e}")
-            else:
-                if provider == 'lmstudio':
-                    base_url = "http://localhost:1234/v1"
-                elif provider == 'ollama':
-                    base_url = "http://localhost:11434/v1"
+class _Shell:
+    """What a `qcraft shell` session keeps warm between questions: config,
+    schema, catalog, validator, cache, provider client and its connections."""
 
-                llm = OpenAI(api_key=api_key, base_url=base_url, model=model)
-                console.print(f"[bold blue]Using {provider} with model {model} for reasoning.[/bold blue]")
+    HELP = ("Ask a question in plain language, or:\n"
+            "  :retry <reason>   ask again for the last question, saying what was wrong\n"
+            "  :explain          explain the last answer\n"
+            "  :type <dialect>   switch the query type for this session, e.g. :type postgres\n"
+            "  :history          questions and answers so far\n"
+            "  :help             this text\n"
+            "  :quit             leave (or Ctrl-D)")
 
-                start_time = time.time()
-                try:
-                    output, usage = llm.explaining(schema, query_type,rec_q,rec_o)
-                    end_time = time.time()
-                    elapsed_time = end_time - start_time
-
-                    # Display the query without rich.Panel or rich.Syntax
-                    console.print("[bold green]Reasoning :[/bold green]")
-                    console.print(output)
-                    console.print(f"[bold cyan]Time taken:[/bold cyan] {elapsed_time:.2f} seconds")
-                    if usage:
-                        prompt_tokens = usage.get('prompt_tokens', 'N/A')
-                        completion_tokens = usage.get('completion_tokens', 'N/A')
-                        total_tokens = usage.get('total_tokens', 'N/A')
-                        console.print(f"[bold cyan]Tokens Used:[/bold cyan] Prompt: {prompt_tokens}, Completion: {completion_tokens}, Total: {total_tokens}")
-
-                except Exception as e:
-                    console.print(f"[bold red]An error occurred:[/bold red] {e}")
-                
-        
-    else:
+    def __init__(self, schema, query_type, provider, model, api_key, cache, stream=False, no_validate=False,
+                 max_attempts=1, full_schema=False, schema_budget=None, no_local=False, deadline=None):
+        from .catalog import load_catalog
+        from .providers import get_provider, run
+        self.schema, self.query_type = schema, query_type
+        self.provider, self.model, self.api_key = provider, model, api_key
+        self.cache, self.stream, self.no_validate = cache, stream, no_validate
+        self.max_attempts, self.full_schema, self.schema_budget = max_attempts, full_schema, schema_budget
+        self.no_local, self.deadline = no_local, deadline
+        self.history = []  # (kind, input, output) in the order they happened
+        self.question = self.answer = None
+        load_catalog(schema)
+        self.validator = _validator(no_validate, schema, query_type)
+        self.rules = _local_rules(no_local, schema, query_type)
+        run(get_provider(provider, model, api_key).warm())
+
+    def set_type(self, dialect):
+        if not dialect:
+            console.print(f"[bold cyan]Query type:[/bold cyan] {self.query_type}")
+            return
+        self.query_type = dialect
+        self.validator = _validator(self.no_validate, self.schema, dialect)
+        self.rules = _local_rules(self.no_local, self.schema, dialect)
+        console.print(f"[green]Query type set to '{dialect}' for this session.[/green]")
+
+    def _call(self, header, call):
+        from .providers import run
+        from .resilience import within
+        _usage.set({"cached_tokens": 0, "similar": None, "local": None})
+        streamer = _streamer(header, self.stream)
+        start_time = time.time()
+        with within(self.deadline):  # per question
+            result = run(call(streamer))
+        return result, time.time() - start_time, streamer
+
+    def convert(self, question):
+        schema, _ = _select_schema(self.schema, question, self.full_schema, self.schema_budget)
+        header = "[bold green]Generated Query:[/bold green]"
+        (query, i_tokens, o_tokens, hit, _, check), elapsed, streamer = self._call(header, lambda streamer: _convert_async(
+            self.cache, self.provider, self.model, self.api_key, schema, self.query_type, question, on_token=streamer,
+            validator=self.validator, max_attempts=self.max_attempts,
+            on_retry=_print_retry, rules=self.rules))
+        if check and check["attempts"] > 1 and streamer is not None and streamer.chunks:
+            streamer = None
+        self._answered("convert", question, question, query, header, elapsed, i_tokens, o_tokens, hit, streamer)
+        if check:
+            _print_check(check)
+
+    def retry(self, reason):
+        if self.answer is None:
+            console.print("[yellow]Nothing to retry yet, ask a question first.[/yellow]")
+            return
+        schema, _ = _select_schema(self.schema, f"{self.question}\n{self.answer}\n{reason}", self.full_schema,
+                                   self.schema_budget)
+        header = "[bold green]Generated Query:[/bold green]"
+        (query, i_tokens, o_tokens, hit, _), elapsed, streamer = self._call(header, lambda streamer: _answer_async(
+            self.cache, "retry", self.provider, self.model, self.api_key, schema, self.query_type, on_token=streamer,
+            rec_q=self.question, rec_o=self.answer, reason=reason or "unknown"))
+        self._answered("retry", reason or "unknown", self.question, query, header, elapsed, i_tokens, o_tokens, hit,
+                       streamer)
+
+    def explain(self):
+        if self.answer is None:
+            console.print("[yellow]Nothing to explain yet, ask a question first.[/yellow]")
+            return
+        schema, _ = _select_schema(self.schema, f"{self.question}\n{self.answer}", self.full_schema, self.schema_budget)
+        header = "[bold green]Reasoning :[/bold green]"
+        (output, i_tokens, o_tokens, hit, _), elapsed, streamer = self._call(header, lambda streamer: _answer_async(
+            self.cache, "explain", self.provider, self.model, self.api_key, schema, self.query_type, on_token=streamer,
+            rec_q=self.question, rec_o=self.answer))
+        _show(header, output, streamer)
+        self.history.append(("explain", self.answer, output))
+        _print_usage(elapsed, i_tokens, o_tokens, hit, self.cache, streamer)
+
+    def _answered(self, kind, text, question, query, header, elapsed, i_tokens, o_tokens, hit, streamer):
+        _show(header, query, streamer)
+        _copy(query)
+        self.question, self.answer = question, query
+        self.history.append((kind, text, query))
+        _print_usage(elapsed, i_tokens, o_tokens, hit, self.cache, streamer)
+
+    def show_history(self):
+        if not self.history:
+            console.print("[dim]No history yet.[/dim]")
+        for n, (kind, text, output) in enumerate(self.history, 1):
+            console.print(f"[bold]{n}. {kind}[/bold] [cyan]{text}[/cyan]", highlight=False)
+            console.print(output, markup=False, highlight=False)
+
+    def handle(self, line):
+        """Run one line of input; returns False when the session should end."""
+        command, _, rest = line.partition(" ")
+        if not line.startswith(":"):
+            self.convert(line)
+        elif command in (":q", ":quit", ":exit"):
+            return False
+        elif command == ":retry":
+            self.retry(rest.strip())
+        elif command == ":explain":
+            self.explain()
+        elif command == ":type":
+            self.set_type(rest.strip())
+        elif command == ":history":
+            self.show_history()
+        elif command == ":help":
+            console.print(self.HELP, markup=False)
+        else:
+            console.print(f"[yellow]Unknown command {command}, :help lists them.[/yellow]")
+        return True
+
+
+@cli.command()
+@click.option('--provider', type=click.Choice(['openai', 'lmstudio', 'ollama','free']), help='The LLM provider to use.')
+@click.option('--api-key', help='The API key for the LLM provider.')
+@click.option('--model', help='The model to use for conversion.')
+@click.option('--no-cache', is_flag=True, help='Always ask the provider, ignoring the response cache.')
+@click.option('--schema-budget', type=click.IntRange(min=1), help='Max schema tokens per prompt before irrelevant tables are dropped (default: SCHEMA_BUDGET config or 4000).')
+@click.option('--full-schema', is_flag=True, help='Always send the whole schema, no pruning.')
+@click.option('--stream', is_flag=True, help='Print answers token by token as the model writes them (openai/lmstudio/ollama).')
+@click.option('--no-validate', is_flag=True, help='Skip the local EXPLAIN check of generated SQL.')
+@click.option('--max-attempts', type=click.IntRange(min=1), help='Answers to try before giving up on validation (default: VALIDATE_ATTEMPTS config or 3).')
+@click.option('--no-local', is_flag=True, help='Always ask the model, even for questions the local rules can answer.')
+@click.option('--deadline', callback=_duration, help='Give up on the provider after this long per question, retries included, e.g. 15s (default: DEADLINE config, or no limit).')
+def shell(provider, model, api_key, no_cache, schema_budget, full_schema, stream, no_validate, max_attempts, no_local,
+          deadline):
+    """Interactive session: ask question after question without restarting.
+
+    The schema, provider client and connections are loaded once, so every
+    question afterwards costs only the model call.
+    example :\n
+    qcraft shell --provider ollama --model gemma3 --stream
+    """
+    if not get_config("TYPE"):
         console.print("[yellow]Please set the query type first using the 'query-type' command.[/yellow]")
-    
+        return
+    provider = provider or get_config("DEFAULT_PROVIDER", "openai")
+    model = model or get_config("DEFAULT_MODEL", "gpt-3.5-turbo")
+    api_key = api_key or get_config("API_KEY", "")
+    _announce(provider, model, "this session")
+    try:
+        import readline  # noqa: F401  arrow keys and in-memory line history for input()
+    except ImportError:
+        pass
+    try:
+        session = _Shell(get_config("SCHEMA"), get_config("TYPE"), provider, model, api_key, _open_cache(no_cache),
+                         stream, no_validate, _max_attempts(max_attempts), full_schema, schema_budget, no_local,
+                         _deadline(deadline))
+    except Exception as e:
+        console.print(f"[bold red]Error:[/bold red] {e}")
+        return
+    console.print(f"[dim]Ready. Query type: {session.query_type}. :help lists the commands, Ctrl-D leaves.[/dim]")
+    while True:
+        try:
+            line = console.input("[bold green]qcraft>[/bold green] ").strip()
+        except EOFError:
+            console.print()
+            break
+        except KeyboardInterrupt:
+            console.print()
+            continue
+        if not line:
+            continue
+        try:
+            if not session.handle(line):
+                break
+        except KeyboardInterrupt:
+            console.print("[yellow]Cancelled.[/yellow]")
+        except Exception as e:
+            console.print(f"[bold red]Error:[/bold red] {e}")
+    if session.answer is not None:
+        # one write on the way out, so `assist` can pick up where the session stopped
+        update_config({"REC_Q": session.question, "REC_OUTPUT": session.answer})
+
+
+@cli.command()
+@click.option('--socket', 'socket_path', type=click.Path(dir_okay=False), help='Unix socket to listen on (default: ~/.qcraft/qcraft.sock).')
+@click.option('--http', 'http_port', type=click.IntRange(0, 65535), help='Also listen on 127.0.0.1:PORT, 0 picks a free port (the only transport where Unix sockets are missing).')
+def serve(socket_path, http_port):
+    """Keep a warm qcraft running for convert/assist calls from anywhere.
+
+    While it runs, `qcraft convert` and `qcraft assist retry|explain` hand
+    their request to it and skip loading the SDK, schema and connections;
+    with no daemon they run in-process as before. Ctrl-C stops it.
+    example :\n
+    qcraft serve &\n
+    qcraft convert "orders over 1000$"   (answered by the daemon)
+    """
+    import socket
+    from .daemon import running, serve as serve_jobs, socket_path as default_socket
+    from .providers import get_provider, run
+    pid = running()
+    if pid:
+        console.print(f"[yellow]qcraft serve is already running (pid {pid}).[/yellow]")
+        return
+    if not hasattr(socket, "AF_UNIX"):
+        socket_path, http_port = None, 0 if http_port is None else http_port
+    else:
+        socket_path = socket_path or default_socket()
+    schema, query_type = get_config("SCHEMA"), get_config("TYPE")
+    cache = _open_cache(False)
+    if schema:
+        from .catalog import load_catalog
+        load_catalog(schema)
+        if query_type:
+            _validator(False, schema, query_type)
+    provider = get_config("DEFAULT_PROVIDER", "openai")
+    try:
+        run(get_provider(provider, get_config("DEFAULT_MODEL", "gpt-3.5-turbo"), get_config("API_KEY", "")).warm())
+    except Exception as e:
+        console.print(f"[yellow]Could not warm up {provider} ({e}), it will connect on the first request.[/yellow]")
+
+    def ready(info):
+        where = " and ".join(f for f in (info["unix"] and f"unix:{info['unix']}",
+                                           info["http"] and f"http://{info['http']}") if f)
+        console.print(f"[bold green]qcraft serve listening on {where} (pid {info['pid']}).[/bold green] "
+                      "convert/assist now run here. Ctrl-C stops.")
+
+    try:
+        run(serve_jobs(lambda job, emit: _daemon_job(job, emit, cache), socket_path, http_port, ready))
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        console.print(f"[bold red]Error:[/bold red] {e}")
+        return
+    console.print("[dim]qcraft serve stopped.[/dim]")
+
+
+@cli.command()
+@click.option('--by', default="provider,model,day", show_default=True, help='Group by these, comma separated: provider, model, day, command.')
+@click.option('--days', type=click.IntRange(min=1), help='Only the last N days.')
+@click.option('--command', 'command_', type=click.Choice(["convert", "retry", "explain"]), help='Only calls of this kind.')
+@click.option('--format', 'fmt', type=click.Choice(["table", "csv", "json"]), default="table", show_default=True, help='Output format.')
+@click.option('--raw', is_flag=True, help='Export every recorded call instead of the grouped summary.')
+@click.option('--out', 'out_file', type=click.Path(dir_okay=False), help='Write csv/json here instead of stdout.')
+def stats(by, days, command_, fmt, raw, out_file):
+    """Latency, tokens and errors of past provider calls.
+    example :\n
+    qcraft stats --days 7
+    \n
+    qcraft stats --by model,command --format csv --out stats.csv
+    \n
+    qcraft stats --raw --format json"""
+    import sys
+    from .ledger import GROUP_KEYS, export, read, summarize
+    keys = tuple(k.strip() for k in by.split(",") if k.strip())
+    unknown = [k for k in keys if k not in GROUP_KEYS]
+    if unknown or not keys:
+        raise click.BadParameter(f"expected some of {', '.join(GROUP_KEYS)}", param_hint="--by")
+    entries = read(days, command_)
+    rows = entries if raw else summarize(entries, keys)
+    if fmt == "table" and not raw:
+        if not rows:
+            console.print("[yellow]No calls recorded yet.[/yellow]")
+            return
+        from rich import box
+        from rich.table import Table
+        table = Table(title="Provider calls (latency in seconds)", box=box.SIMPLE_HEAD,
+                      collapse_padding=True, pad_edge=False)
+        columns = list(keys) + ["calls", "err", "hits", "p50", "p95", "p99", "tok/s", "tokens"]
+        for column in columns:
+            table.add_column(column, justify="left" if column in keys else "right",
+                             min_width=10 if column == "day" else None)
+        for row in rows:
+            table.add_row(*[str(row[k] or "-") for k in keys], str(row["calls"]), str(row["errors"]),
+                          str(row["hits"]), f"{row['p50']:.2f}", f"{row['p95']:.2f}", f"{row['p99']:.2f}",
+                          f"{row['tokens_per_sec']:.1f}", str(row["prompt_tokens"] + row["completion_tokens"]))
+        console.print(table)
+        return
+    if fmt == "table":
+        fmt = "csv"  # raw calls have too many columns for a table
+    if out_file:
+        with open(out_file, "w", newline="", encoding="utf-8") as f:
+            export(rows, fmt, f)
+        console.print(f"[green]Wrote {len(rows)} rows to {out_file}.[/green]")
+    else:
+        export(rows, fmt, sys.stdout)
+
+
+@cli.group(name="cache")
+def cache_group():
+    """Inspect or clear the on-disk response cache.
+
+    qcraft cache stats \n
+    qcraft cache clear """
+    pass
+
+
+@cache_group.command(name="stats")
+def cache_stats():
+    """Show cache size and hit/miss counts."""
+    from .cache import ResponseCache
+    stats = ResponseCache().stats()
+    console.print("[bold underline]Response Cache:[/bold underline]")
+    console.print(f"  [magenta]path[/magenta]: {stats['path']}")
+    console.print(f"  [magenta]entries[/magenta]: {stats['entries']} " +
+                  ", ".join(f"{kind}: {n}" for kind, n in sorted(stats['by_kind'].items())))
+    console.print(f"  [magenta]size[/magenta]: {stats['bytes'] / 1024:.1f} KiB")
+    total = stats['hits'] + stats['misses']
+    rate = stats['hits'] / total * 100 if total else 0.0
+    console.print(f"  [magenta]hits[/magenta]: {stats['hits']}, [magenta]misses[/magenta]: {stats['misses']} ({rate:.1f}% hit rate)")
+    console.print(f"  [magenta]similar questions[/magenta]: {stats['similar']} indexed, "
+                  f"{stats['similar_hits']} of the misses answered from a near-duplicate")
+
 
+@cache_group.command(name="clear")
+def cache_clear():
+    """Delete every cached response."""
+    from .cache import ResponseCache
+    ResponseCache().clear()
+    console.print("[yellow]Response cache cleared.[/yellow]")
 
 
 @cli.group()
@@ -387,6 +1638,19 @@ def config_set(key, value):
     3) DEFAULT_PROVIDER 
     4) DEFAULT_MODEL
     5) API_KEY
+    6) CONNECT_TIMEOUT / READ_TIMEOUT (seconds, for every provider)
+    7) SCHEMA_BUDGET (max schema tokens per prompt before pruning)
+    8) OPENAI_CONCURRENCY / FREE_CONCURRENCY / OLLAMA_CONCURRENCY / LMSTUDIO_CONCURRENCY
+       (requests in flight at once per provider)
+    9) VALIDATE_ATTEMPTS (answers convert tries before giving up on local SQL validation)
+    10) OPENAI_BASE_URL / OLLAMA_BASE_URL / LMSTUDIO_BASE_URL / FREE_URL
+       (where each provider is reached, e.g. a remote ollama)
+    11) SIMILAR_THRESHOLD (0..1, how alike a question must be to reuse an earlier
+       answer, default 0.8; 0 or off asks the model every time)
+    12) LOCAL_RULES (off to send every convert to the model instead of answering
+       simple single-table / one-join questions locally)
+    13) SCHEMA_FORMAT (ddl sends the schema as given, compact a dense notation
+       such as orders(order_id pk, customer_id→customers, status∈{...}))
     \n
     SIMPLE EXAMPLE -> qcraft config set TYPE "mongo db"
     
@@ -414,10 +1678,14 @@ def config_get(key):
 def config_list():
     """List all configuration settings. \n
     qcraft config list """
-    all_config = load_config()
+    all_config = load_config(resolve=False)
     if all_config:
         console.print("[bold underline]Current Configuration:[/bold underline]")
         for key, value in all_config.items():
+            if key == "SCHEMA" and value:  # written before schemas had their own store
+                value = f"{len(value):,} characters (qcraft config get SCHEMA prints it)"
+            elif key == SCHEMA_REF and value:
+                value = f"{value} (stored schema, qcraft config get SCHEMA prints it)"
             console.print(f"  [magenta]{key}[/magenta]: {value}")
     else:
         console.print("[yellow]No configuration settings found.[/yellow]")
@@ -0,0 +1,141 @@
+"""The schema in a dense notation for prompts.
+
+    orders(order_id pk, customer_id→customers, order_date date, total_amount num, status∈{Pending,Shipped})
+
+Column types are shortened (int, num, date, ts, bool; text columns carry
+none), lengths, NOT NULL, UNIQUE and constraint boilerplate are dropped,
+and keys are folded into the columns. Built from the catalog once per
+schema hash and stored next to it, so later commands only read it. The DDL
+is sent as given when the notation would not be smaller (the legend costs
+more than it saves on a handful of tables) or would leave something out:
+views, types, functions, anything besides tables and indexes.
+"""
+import json
+import os
+import re
+
+from .catalog import load_catalog, schema_hash
+from .config import state_path
+
+LEGEND = "-- table(column type, ...): pk = primary key, →t = references t, ∈{...} = allowed values, no type = text"
+_VERSION = 2
+_TYPES = [(re.compile(p, re.IGNORECASE), short) for p, short in (
+    (r"^(?:tiny|small|medium|big)?int(?:eger)?\d*\b|^(?:small|big)?serial\b", "int"),
+    (r"^(?:decimal|numeric|number|real|float|double|money|smallmoney)\b", "num"),
+    (r"^(?:timestamp|datetime|smalldatetime)", "ts"),
+    (r"^date\b", "date"),
+    (r"^time\b", "time"),
+    (r"^(?:bool|boolean|bit)\b", "bool"),
+    (r"^(?:n?var)?char|^character|^n?text|^tinytext|^mediumtext|^longtext|^string|^clob|^enum\b|^set\b", ""),
+    (r"^jsonb?\b", "json"),
+    (r"^(?:blob|bytea|binary|varbinary|longblob)\b", "bytes"),
+)]
+# the catalog lowercases names: a schema that relies on "MixedCase" identifiers keeps its DDL
+_CASED = re.compile(r"\"[^\"]*[A-Z][^\"]*\"|`[^`]*[A-Z][^`]*`|\[[^\]]*[A-Z][^\]]*\]")
+_PLAIN_VALUE = re.compile(r"[^,{}'\s][^,{}']*")
+# what a schema creates; only tables reach the catalog, and indexes are not worth a prompt token
+_CREATE = re.compile(r"\bCREATE\s+(?:OR\s+REPLACE\s+)?(?:(?:GLOBAL|LOCAL)\s+)?(?:TEMP(?:ORARY)?\s+)?(?:UNIQUE\s+)?(\w+)",
+                     re.IGNORECASE)
+
+_loaded = {}
+
+
+def _type(ctype):
+    ctype = (ctype or "").strip()
+    if not ctype:
+        return ""
+    for pattern, short in _TYPES:
+        if pattern.search(ctype):
+            return short
+    return re.split(r"[\s(]", ctype, 1)[0].lower()
+
+
+def _value(value):
+    value = str(value)
+    return value if _PLAIN_VALUE.fullmatch(value) else "'" + value.replace("'", "''") + "'"
+
+
+def table_line(table, catalog):
+    """One table in the compact notation."""
+    single_fk = {fk.columns[0]: fk for fk in table.foreign_keys if len(fk.columns) == 1}
+    composite_pk = len(table.primary_key) > 1
+    items = []
+    for column in table.columns:
+        ctype = _type(column.type)
+        fk = single_fk.get(column.name)
+        parts = [column.name]
+        keyed = (column.primary_key and not composite_pk) or fk is not None
+        if ctype and not (keyed and ctype == "int"):
+            parts.append(" " + ctype)
+        if column.primary_key and not composite_pk:
+            parts.append(" pk")
+        if fk is not None:
+            parts.append("→" + _reference(fk, catalog))
+        if column.check_values:
+            parts.append(f"∈{{{','.join(_value(v) for v in column.check_values)}}}")
+        items.append("".join(parts))
+    if composite_pk:
+        items.append(f"pk({','.join(table.primary_key)})")
+    for fk in table.foreign_keys:
+        if len(fk.columns) > 1:
+            items.append(f"({','.join(fk.columns)})→{fk.ref_table}({','.join(fk.ref_columns)})")
+    return f"{table.name}({', '.join(items)})"
+
+
+def _reference(fk, catalog):
+    # "→customers" when it points at the key, "→customers.code" otherwise
+    ref = catalog.table(fk.ref_table)
+    ref_columns = fk.ref_columns or (ref.primary_key if ref else [])
+    if ref is None or not ref_columns or ref_columns == ref.primary_key:
+        return fk.ref_table
+    return f"{fk.ref_table}.{ref_columns[0]}"
+
+
+def _path(digest):
+    return state_path("catalogs") / f"{digest}.compact.json"
+
+
+def compact_lines(schema):
+    """{table: compact line} in schema order, or None when the schema is not
+    DDL the catalog can fully describe (no tables, case-sensitive names,
+    views or other objects) or the notation is not smaller than the DDL.
+
+    Computed once per schema hash: this process first, then the store.
+    """
+    digest = schema_hash(schema)
+    if digest in _loaded:
+        return _loaded[digest]
+    path = _path(digest)
+    lines, stored = None, False
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+        if data.get("version") == _VERSION:
+            lines, stored = data["lines"], True  # None too: the DDL it is
+    except (OSError, ValueError, KeyError, TypeError):
+        lines, stored = None, False
+    if not stored:
+        from .prune import estimate_tokens  # prune imports this module
+        catalog = load_catalog(schema)
+        if _describable(schema, catalog):
+            lines = {name: table_line(table, catalog) for name, table in catalog.tables.items()}
+            if estimate_tokens(render(lines)) >= estimate_tokens(schema):
+                lines = None
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps({"version": _VERSION, "lines": lines}, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, path)
+    _loaded[digest] = lines
+    return lines
+
+
+def _describable(schema, catalog):
+    if not len(catalog) or _CASED.search(schema or ""):
+        return False
+    created = [kind.upper() for kind in _CREATE.findall(schema or "")]
+    # a view or type would silently go missing, so would a table the catalog could not parse
+    return set(created) <= {"TABLE", "INDEX"} and created.count("TABLE") == len(catalog)
+
+
+def render(lines, tables=None):
+    """The compact schema text, only `tables` (in schema order) when given."""
+    keep = set(tables) if tables is not None else None
+    return "\n".join([LEGEND] + [line for name, line in lines.items() if keep is None or name in keep])
@@ -1,22 +1,116 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
 from pathlib import Path
 
+from .trace import span
+
 CONFIG_FILE = Path.home() / ".mycli_config"
+STATE_DIR = Path.home() / ".qcraft"  # caches and other derived data, safe to delete
 
-def save_config(data: dict):  # set multiple kvpair in dict format 
-    lines = []
-    for k, v in data.items():
-        safe_value = str(v).replace("\n", "\\n")
-        lines.append(f"{k}={safe_value}")
-    CONFIG_FILE.write_text("\n".join(lines))
+# the schema text lives in a content-addressed store next to the config file
+# and the config only holds SCHEMA_REF, its hash, so writing REC_OUTPUT after
+# every convert no longer rewrites a multi-MB schema
+SCHEMA_REF = "SCHEMA_REF"
+_KEEP_SCHEMAS = 8  # unnamed schemas kept besides the current one, for readers of an older config
 
+# what this process last read, reused until the file's stat signature changes
+_memo = {"path": None, "signature": None, "data": None}
+_schemas = {}  # hash -> schema text read by this process
+_thread_lock = threading.RLock()
 
-def load_config():   # fetching the entire dict 
-    if not CONFIG_FILE.exists():
-        print("file not found error")
+
+def state_path(name):  # path of a file inside the state dir, creating the dir
+    STATE_DIR.mkdir(parents=True, exist_ok=True)
+    return STATE_DIR / name
+
+
+def schema_store():  # directory of the stored schemas, <hash>.sql each
+    return CONFIG_FILE.with_name(".mycli_schemas")
+
+
+def _replace(path, text):
+    # temp file + rename, so readers see the old or the new file, never half of one
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def put_schema(schema):
+    """Store `schema` (once per distinct text) and return its hash."""
+    digest = hashlib.sha256(schema.encode("utf-8")).hexdigest()
+    path = schema_store() / f"{digest}.sql"
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        _replace(path, schema)
+    _schemas[digest] = schema
+    return digest
+
+
+def read_schema(digest):
+    """The stored schema with this hash, None when it is not in the store."""
+    schema = _schemas.get(digest)
+    if schema is None:
+        try:
+            schema = _schemas[digest] = (schema_store() / f"{digest}.sql").read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return None
+    return schema
+
+
+def schema_names():
+    """{name: {SCHEMA_REF, SCHEMA_SOURCE, ...}} of the named schemas."""
+    try:
+        return json.loads((schema_store() / "names.json").read_text(encoding="utf-8"))
+    except (OSError, ValueError):
         return {}
 
+
+def name_schema(name, settings):
+    # remember the schema settings under `name`, for `qcraft use`
+    with _locked():
+        names = schema_names()
+        names[name] = settings
+        schema_store().mkdir(parents=True, exist_ok=True)
+        _replace(schema_store() / "names.json", json.dumps(names, indent=1))
+
+
+def _prune_schemas(current):
+    # drop unnamed schemas no longer in use, all but the latest few, and what
+    # was derived from the dropped ones (catalogs/<hash>.*, sqlite/<hash>.*)
+    keep = {current} | {s.get(SCHEMA_REF) for s in schema_names().values()}
+    stored = sorted(schema_store().glob("*.sql"), key=lambda p: p.stat().st_mtime, reverse=True)
+    for path in [p for p in stored if p.stem not in keep][_KEEP_SCHEMAS:]:
+        path.unlink(missing_ok=True)
+        _schemas.pop(path.stem, None)
+    keep |= {p.stem for p in schema_store().glob("*.sql")}
+    for path in [*(STATE_DIR / "catalogs").glob("*"), *(STATE_DIR / "sqlite").glob("*")]:
+        if path.name.split(".", 1)[0] not in keep:
+            path.unlink(missing_ok=True)
+
+
+def _signature(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+
+def _parse(text):
     data = {}
-    for line in CONFIG_FILE.read_text().splitlines():
+    for line in text.splitlines():
         if "=" in line:
             k, v = line.split("=", 1)
             if v == "None":
@@ -26,19 +120,111 @@ def load_config():   # fetching the entire dict
     return data
 
 
+def _serialize(data):
+    lines = []
+    for k, v in data.items():
+        safe_value = str(v).replace("\n", "\\n")
+        lines.append(f"{k}={safe_value}")
+    return "\n".join(lines)
+
+
+@contextmanager
+def _locked(path=None):
+    """Exclusive lock shared by every qcraft process writing the config, or
+    the state file at `path`."""
+    path = path or CONFIG_FILE
+    lock_path = path.with_name(path.name + ".lock")
+    with _thread_lock, open(lock_path, "a+") as f:
+        if os.name == "nt":
+            import msvcrt
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _read(force=False):
+    # the parsed config, from memory unless the file changed on disk
+    signature = _signature(CONFIG_FILE)
+    if signature is None:
+        return None
+    if not force and _memo["path"] == CONFIG_FILE and _memo["signature"] == signature:
+        return _memo["data"]
+    with span("config.read"):
+        data = _parse(CONFIG_FILE.read_text())
+    _memo.update(path=CONFIG_FILE, signature=signature, data=data)
+    return data
+
+
+def _write(data):
+    # SCHEMA goes to the store, a config written before the store existed is
+    # moved there on its first write
+    if "SCHEMA" in data:
+        schema = data["SCHEMA"]
+        ref = put_schema(schema) if schema is not None else None
+        data = {SCHEMA_REF if k == "SCHEMA" else k: v for k, v in data.items()}
+        data[SCHEMA_REF] = ref
+    previous = (_memo["data"] or {}).get(SCHEMA_REF) if _memo["path"] == CONFIG_FILE else None
+    _replace(CONFIG_FILE, _serialize(data))
+    _memo.update(path=CONFIG_FILE, signature=_signature(CONFIG_FILE), data=dict(data))
+    if data.get(SCHEMA_REF) != previous and data.get(SCHEMA_REF):
+        _prune_schemas(data[SCHEMA_REF])
+
+
+def save_config(data: dict):  # set multiple kvpair in dict format
+    with _locked():
+        _write(data)
 
-def get_config(key, default=None): # fetch a value by its key 
-    return load_config().get(key, default)
+
+def load_config(resolve=True):   # fetching the entire dict, SCHEMA as text unless resolve=False
+    data = _read()
+    if data is None:
+        print("file not found error")
+        return {}
+    if resolve and SCHEMA_REF in data:
+        ref = data[SCHEMA_REF]
+        schema = read_schema(ref) if ref else None
+        return {"SCHEMA" if k == SCHEMA_REF else k: schema if k == SCHEMA_REF else v for k, v in data.items()}
+    return dict(data)
+
+
+
+def get_config(key, default=None): # fetch a value by its key
+    data = _read()
+    if data is None:
+        print("file not found error")
+        return default
+    if key == "SCHEMA" and SCHEMA_REF in data:
+        ref = data[SCHEMA_REF]
+        schema = read_schema(ref) if ref else None
+        return default if schema is None else schema
+    return data.get(key, default)
 
 
 def set_config(key, value):  # set a kv pair
-    data = load_config()
-    data[key] = value
-    save_config(data)
-    
+    update_config({key: value})
+
+
+def update_config(values: dict):  # set several kv pairs in one locked write
+    with span("config.write"), _locked():
+        data = dict(_read(force=True) or {})
+        data.update(values)
+        _write(data)
+
+
 def flush_config():
     save_config({})
-    
+
 if __name__=="__main__":
     print(load_config())
     flush_config()
@@ -0,0 +1,226 @@
+"""`qcraft serve`: one long-lived process answering convert/assist for the others.
+
+The daemon listens on a Unix socket and/or 127.0.0.1 HTTP and writes where
+to find it, with a random token, to ~/.qcraft/daemon.json (mode 0600). A job
+is one JSON object; the reply is newline-delimited JSON events ({"token"},
+{"pruned"}, {"retry"}) ending in {"result"} or {"error"}. Over HTTP the job
+is POSTed to /v1/jobs and the events come back as a chunked body.
+
+The client half only needs socket, json and http.client, so a forwarding
+`qcraft convert` never imports the provider SDKs.
+"""
+import json
+import os
+import secrets
+import socket
+
+from .config import state_path
+
+JOBS_PATH = "/v1/jobs"
+
+
+def info_path():
+    return state_path("daemon.json")
+
+
+def socket_path():
+    return state_path("qcraft.sock")
+
+
+def read_info():
+    """Where the running daemon listens, or None when none was started."""
+    try:
+        with open(info_path(), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _connect_unix(path, payload):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+        sock.sendall(payload)
+    except OSError:
+        sock.close()
+        return None
+    lines = sock.makefile("rb")
+    sock.close()  # the file keeps the connection open until it is closed
+    return lines
+
+
+def _connect_http(address, payload):
+    import http.client
+    host, port = address.rsplit(":", 1)
+    conn = http.client.HTTPConnection(host, int(port), timeout=None)
+    try:
+        conn.request("POST", JOBS_PATH, body=payload, headers={"Content-Type": "application/json"})
+        response = conn.getresponse()
+    except OSError:
+        conn.close()
+        return None
+    if response.status != 200:
+        message = response.read().decode("utf-8", "replace")
+        conn.close()
+        raise RuntimeError(f"qcraft serve answered HTTP {response.status}: {message}")
+    return response
+
+
+def forward(job, on_event=None):
+    """Run `job` in the running daemon, passing progress events to `on_event`.
+
+    Returns the job's result, or None when no daemon took the connection, in
+    which case the caller runs the job itself. Raises RuntimeError with the
+    daemon's message when the job failed there.
+    """
+    info = read_info()
+    if not info:
+        return None
+    payload = json.dumps(dict(job, token=info.get("token"))).encode("utf-8") + b"\n"
+    lines = None
+    if info.get("unix") and hasattr(socket, "AF_UNIX"):
+        lines = _connect_unix(info["unix"], payload)
+    if lines is None and info.get("http"):
+        lines = _connect_http(info["http"], payload)
+    if lines is None:
+        return None  # a daemon that is gone left its file behind
+    with lines:
+        for line in lines:
+            event = json.loads(line)
+            if "result" in event:
+                return event["result"]
+            if "error" in event:
+                raise RuntimeError(event["error"])
+            if on_event is not None:
+                on_event(event)
+    raise RuntimeError("qcraft serve closed the connection before answering")
+
+
+def running():
+    """pid of a daemon that answers, else None."""
+    try:
+        reply = forward({"kind": "ping"})
+    except (RuntimeError, ValueError):
+        return None
+    return reply and reply.get("pid")
+
+
+async def _run(job, reader, writer, handler, token, chunked):
+    import asyncio
+
+    def emit(event):
+        data = json.dumps(event).encode("utf-8") + b"\n"
+        writer.write(b"%x\r\n%s\r\n" % (len(data), data) if chunked else data)
+
+    if not secrets.compare_digest(str(job.get("token")), token):
+        emit({"error": "qcraft serve refused the job: wrong token (restart the client or the daemon)"})
+        return
+    if job.get("kind") == "ping":
+        emit({"result": {"pid": os.getpid()}})
+        return
+    task = asyncio.ensure_future(handler(job, emit))
+    gone = asyncio.ensure_future(reader.read(1))  # the client hanging up ends the read
+    await asyncio.wait({task, gone}, return_when=asyncio.FIRST_COMPLETED)
+    if not task.done():
+        task.cancel()  # nobody is waiting for the answer any more
+        await asyncio.gather(task, return_exceptions=True)
+        return
+    gone.cancel()
+    try:
+        emit({"result": task.result()})
+    except Exception as e:
+        emit({"error": str(e) or type(e).__name__})
+
+
+async def _close(writer):
+    try:
+        await writer.drain()
+        writer.close()
+        await writer.wait_closed()
+    except OSError:
+        pass
+
+
+async def serve(handler, unix_path=None, http_port=None, on_ready=None):
+    """Serve jobs until cancelled (Ctrl-C, SIGTERM).
+
+    `handler(job, emit)` is a coroutine returning the result dict; `emit`
+    sends a progress event. Every connection runs as its own task on this
+    loop, so jobs share the loop's pooled clients and provider limits.
+    """
+    import asyncio
+    import signal
+
+    token = secrets.token_hex(16)
+    info = {"pid": os.getpid(), "token": token, "unix": None, "http": None}
+
+    async def on_unix(reader, writer):
+        try:
+            line = await reader.readline()
+            if line:
+                await _run(json.loads(line), reader, writer, handler, token, chunked=False)
+        except ValueError:
+            pass
+        finally:
+            await _close(writer)
+
+    async def on_http(reader, writer):
+        try:
+            request = (await reader.readline()).decode("latin-1").split()
+            length = 0
+            while True:
+                header = await reader.readline()
+                if header in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = header.decode("latin-1").partition(":")
+                if name.strip().lower() == "content-length":
+                    length = int(value)
+            body = await reader.readexactly(length)
+            if request[:2] != ["POST", JOBS_PATH]:
+                writer.write(b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+                return
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\n"
+                         b"Transfer-Encoding: chunked\r\nConnection: close\r\n\r\n")
+            await _run(json.loads(body), reader, writer, handler, token, chunked=True)
+            writer.write(b"0\r\n\r\n")
+        except (ValueError, IndexError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            await _close(writer)
+
+    servers = []
+    try:
+        if unix_path:
+            unix_path = str(unix_path)
+            if os.path.exists(unix_path):
+                os.unlink(unix_path)  # left by a daemon that died without cleaning up
+            servers.append(await asyncio.start_unix_server(on_unix, path=unix_path))
+            os.chmod(unix_path, 0o600)
+            info["unix"] = unix_path
+        if http_port is not None:
+            server = await asyncio.start_server(on_http, "127.0.0.1", http_port)
+            servers.append(server)
+            info["http"] = "127.0.0.1:%d" % server.sockets[0].getsockname()[1]
+        tmp = info_path().with_suffix(".tmp")
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(info, f)
+        os.replace(tmp, info_path())
+        loop = asyncio.get_running_loop()
+        try:
+            loop.add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+        except (NotImplementedError, RuntimeError, ValueError):
+            pass  # Windows, or not the main thread: Ctrl-C / cancel only
+        if on_ready:
+            on_ready(info)
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            pass
+    finally:
+        for server in servers:
+            server.close()
+        if (read_info() or {}).get("token") == token:
+            os.unlink(info_path())
+        if info["unix"] and os.path.exists(info["unix"]):
+            os.unlink(info["unix"])
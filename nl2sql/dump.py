@@ -0,0 +1,193 @@
+"""Pull the DDL out of a database dump without loading the dump.
+
+pg_dump / mysqldump output is mostly data: COPY blocks and INSERT
+statements around a few hundred KB of CREATE TABLEs. The file is memory
+mapped and walked statement by statement; data statements are stepped over
+with one regex match or one `find` each, so their bytes are never copied
+into Python objects, and pages already walked are handed back to the OS,
+which keeps memory flat whatever the dump's size.
+
+Kept: CREATE TABLE / VIEW / INDEX and ALTER TABLE ... FOREIGN KEY or
+PRIMARY KEY (how pg_dump adds keys). Everything else (SET, functions,
+grants, comments) is dropped.
+"""
+import mmap
+import os
+import re
+
+# a dump bigger than this is filtered even when it holds no data statements
+PLAIN_LIMIT = 8 * 1024 * 1024
+_RELEASE_EVERY = 16 * 1024 * 1024
+
+_SPACE = re.compile(rb"(?:\s+|--[^\n]*(?:\n|\Z)|/\*(?!!).*?\*/)*", re.DOTALL)
+_HEAD = 512
+_INSERT = re.compile(rb"(?:INSERT|REPLACE)\b", re.IGNORECASE)
+_COPY_STDIN = re.compile(rb"COPY\b[^;]*?\bFROM\s+STDIN\b", re.IGNORECASE)
+_DELIMITER = re.compile(rb"DELIMITER[ \t]+(\S+)[^\n]*\n?", re.IGNORECASE)
+_CONFORMING = re.compile(rb"SET\s+standard_conforming_strings\s*=\s*'?(on|off)", re.IGNORECASE)
+_KEEP = re.compile(
+    rb"CREATE\s+(?:OR\s+REPLACE\s+)?(?:(?:GLOBAL|LOCAL)\s+)?(?:(?:TEMP|TEMPORARY|UNLOGGED)\s+)?TABLE\b"
+    rb"|CREATE\s+(?:OR\s+REPLACE\s+)?(?:ALGORITHM\s*=\s*\w+\s+)?(?:DEFINER\s*=\s*\S+\s+)?"
+    rb"(?:SQL\s+SECURITY\s+\w+\s+)?(?:MATERIALIZED\s+)?VIEW\b"
+    rb"|CREATE\s+(?:UNIQUE\s+)?(?:(?:CLUSTERED|NONCLUSTERED)\s+)?INDEX\b",
+    re.IGNORECASE)
+_ALTER_KEY = re.compile(rb"ALTER\s+TABLE\b.*\b(?:FOREIGN|PRIMARY)\s+KEY\b", re.IGNORECASE | re.DOTALL)
+# mysqldump wraps views in version comments: /*!50001 CREATE ... */
+_VERSIONED = re.compile(rb"/\*!\d*\s?|\s?\*/")
+
+# the two string rules: MySQL escapes with backslashes, PostgreSQL with
+# standard_conforming_strings on only doubles quotes ('' reads as two strings)
+_STRING = {True: rb"'[^'\\]*(?:\\.[^'\\]*)*'", False: rb"'[^']*'"}
+_INSERT_END = {b: re.compile(rb"[^;']*(?:" + s + rb"[^;']*)*;", re.DOTALL) for b, s in _STRING.items()}
+_STRING_END = {b: re.compile(s, re.DOTALL) for b, s in _STRING.items()}
+# pg_dump --inserts writes a row per statement: step over up to 1000 at a time
+_INSERT_RUN = {b: re.compile(rb"(?:\s*(?:INSERT|REPLACE)\b[^;']*(?:" + s + rb"[^;']*)*;){1,1000}",
+                             re.DOTALL | re.IGNORECASE) for b, s in _STRING.items()}
+_SHORT = 4096
+_QUOTED = {ord('"'): re.compile(rb'"[^"]*"'), ord("`"): re.compile(rb"`[^`]*`")}
+
+
+def _tokens(delimiter):
+    return re.compile(rb"['\"`]|--|/\*|\$\w*\$|" + re.escape(delimiter))
+
+
+def _statement_end(mm, pos, tokens, delimiter, backslash):
+    """Offset just past the delimiter ending the statement at `pos`, or the
+    end of the file; quotes, comments and $$ bodies are stepped over."""
+    size = len(mm)
+    while True:
+        m = tokens.search(mm, pos)
+        if m is None:
+            return size
+        token, start = m.group(), m.start()
+        if token == delimiter:
+            return m.end()
+        if token == b"'":
+            end = _STRING_END[backslash].match(mm, start)
+            pos = end.end() if end else size
+        elif token[0] in _QUOTED:
+            end = _QUOTED[token[0]].match(mm, start)
+            pos = end.end() if end else size
+        elif token == b"--":
+            end = mm.find(b"\n", start)
+            pos = size if end == -1 else end + 1
+        elif token == b"/*":
+            end = mm.find(b"*/", start + 2)
+            pos = size if end == -1 else end + 2
+        else:  # $tag$ ... $tag$
+            end = mm.find(token, m.end())
+            pos = size if end == -1 else end + len(token)
+
+
+def _insert_end(mm, pos, backslash):
+    # the next ";\n" outside a string ends the INSERT; whether a candidate is
+    # outside is told by quote parity, counted in C. Backslash escapes leave
+    # that ambiguous only around an escaped backslash, which goes to the regex
+    end = pos
+    while True:
+        end = mm.find(b";\n", end)
+        if end == -1:
+            break
+        segment = mm[pos:end]
+        quotes = segment.count(b"'")
+        if backslash and b"\\" in segment:
+            if b"\\\\" in segment:
+                break
+            quotes -= segment.count(b"\\'")
+        if quotes % 2 == 0:
+            return end + 1
+        end += 2
+    m = _INSERT_END[backslash].match(mm, pos)
+    return m.end() if m else len(mm)
+
+
+def _copy_end(mm, pos):
+    # COPY ... FROM stdin data runs to a line holding only \.
+    while True:
+        end = mm.find(b"\n\\.", pos - 1)
+        if end == -1:
+            return len(mm)
+        after = end + 3
+        if after >= len(mm) or mm[after:after + 1] in (b"\n", b"\r"):
+            return mm.find(b"\n", after) + 1 or len(mm)
+        pos = after
+
+
+def _release(mm, start, end):
+    # drop the pages behind the scan so resident memory stays flat
+    page = mmap.PAGESIZE
+    start, end = start // page * page, end // page * page
+    if end > start:
+        mm.madvise(mmap.MADV_DONTNEED, start, end - start)
+
+
+def _scan(mm):
+    statements, skipped = [], 0  # data bytes stepped over
+    delimiter, backslash = b";", True
+    tokens = _tokens(delimiter)
+    can_release = hasattr(mm, "madvise") and hasattr(mmap, "MADV_DONTNEED")
+    released = pos = 0
+    size = len(mm)
+    while True:
+        pos = _SPACE.match(mm, pos).end()
+        if pos >= size:
+            break
+        if can_release and pos - released > _RELEASE_EVERY:
+            _release(mm, released, pos)
+            released = pos // mmap.PAGESIZE * mmap.PAGESIZE
+        head = mm[pos:pos + _HEAD]
+        if _INSERT.match(head) and delimiter == b";":
+            start, pos = pos, _insert_end(mm, pos, backslash)
+            if pos - start < _SHORT:
+                run = _INSERT_RUN[backslash].match(mm, pos)
+                while run and pos - start < _RELEASE_EVERY:
+                    pos = run.end()
+                    run = _INSERT_RUN[backslash].match(mm, pos)
+            skipped += pos - start
+            continue
+        delimited = _DELIMITER.match(head)
+        if delimited:  # a mysql client command, not SQL: ends at the line
+            delimiter = delimited.group(1)
+            tokens = _tokens(delimiter)
+            pos += delimited.end()
+            continue
+        start, pos = pos, _statement_end(mm, pos, tokens, delimiter, backslash)
+        if _COPY_STDIN.match(head):
+            pos = _copy_end(mm, pos)
+            skipped += pos - start
+            continue
+        conforming = _CONFORMING.match(head)
+        if conforming:
+            backslash = conforming.group(1).lower() == b"off"
+            continue
+        plain = _VERSIONED.sub(b"", head).lstrip() if head.startswith(b"/*!") else head
+        if _KEEP.match(plain) or (plain[:5].upper() == b"ALTER" and _ALTER_KEY.match(mm[start:pos])):
+            text = mm[start:pos]
+            if head.startswith(b"/*!"):
+                text = _VERSIONED.sub(b"", text).strip()
+            text = text.rstrip()
+            if text.endswith(delimiter):
+                text = text[:-len(delimiter)].rstrip()
+            statements.append(text.decode("utf-8", "replace") + ";")
+    return statements, skipped
+
+
+def extract_ddl(path):
+    """(DDL text, info) of a SQL dump, info holding the statements kept and
+    the bytes of data (INSERTs, COPY blocks) skipped and of the whole dump."""
+    size = os.path.getsize(path)
+    if not size:
+        return "", {"statements": 0, "skipped": 0, "bytes": 0}
+    with open(path, "rb") as f:
+        if f.read(5) == b"PGDMP":
+            raise ValueError(f"{path} is a pg_dump archive, not SQL: "
+                             "run `pg_restore --schema-only -f schema.sql` on it first")
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        if hasattr(mm, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+            mm.madvise(mmap.MADV_SEQUENTIAL)
+        statements, skipped = _scan(mm)
+    finally:
+        mm.close()
+    return "\n\n".join(statements) + ("\n" if statements else ""), \
+        {"statements": len(statements), "skipped": skipped, "bytes": size}
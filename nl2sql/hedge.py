@@ -0,0 +1,149 @@
+import asyncio
+import json
+import re
+import time
+
+from .config import _locked, _replace, state_path
+
+_DURATION = re.compile(r"^\s*(\d+(?:\.\d*)?|\.\d+)\s*(ms|s|m)?\s*$")
+_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, None: 1.0}
+EWMA_WEIGHT = 0.3  # how much the newest answer moves a backend's typical latency
+
+
+def parse_duration(text):
+    """Seconds in "2s", "500ms", "1m" or a bare "1.5"."""
+    match = _DURATION.match(str(text))
+    if not match:
+        raise ValueError(f"invalid duration {text!r}, expected e.g. 2s, 500ms or 1.5")
+    return float(match.group(1)) * _UNITS[match.group(2)]
+
+
+def parse_backends(spec, model=None):
+    """Backends from "free,ollama:llama3,openai" as (provider, model) pairs.
+
+    A backend without ":model" uses `model`; the free endpoint has none.
+    """
+    from .providers import PROVIDERS
+    backends = []
+    for part in spec.split(","):
+        provider, _, name = part.strip().partition(":")
+        if not provider:
+            continue
+        if provider not in PROVIDERS:
+            raise ValueError(f"unknown provider {provider!r} in --race, expected one of {', '.join(PROVIDERS)}")
+        backends.append((provider, None if provider == "free" else (name or model)))
+    if not backends:
+        raise ValueError("--race needs at least one provider")
+    return backends
+
+
+def label(backend):
+    provider, model = backend
+    return f"{provider}:{model}" if model else provider
+
+
+def _valid(result):
+    return bool(result and result[0] and str(result[0]).strip())
+
+
+async def race(backends, call, hedge_after=0.0):
+    """First valid answer from `backends`, cancelling the rest.
+
+    `call(provider, model)` is a coroutine function returning a tuple whose
+    first item is the answer text. The first backend starts at once and each
+    next one `hedge_after` seconds later (0 starts them all together), or
+    right away when everything started so far has failed. Returns
+    (result, info): info has winner, elapsed, launched (label -> start
+    offset), cancelled and failed (label -> error text).
+    """
+    start = time.perf_counter()
+    queue = list(backends)
+    running = {}  # task -> label
+    info = {"winner": None, "elapsed": None, "launched": {}, "cancelled": [], "failed": {}}
+
+    def launch():
+        backend = queue.pop(0)
+        name = label(backend)
+        if name in info["launched"]:  # the same backend hedged against itself
+            name = f"{name}#{sum(n.split('#')[0] == name for n in info['launched']) + 1}"
+        now = time.perf_counter()
+        running[asyncio.ensure_future(call(*backend))] = name
+        info["launched"][name] = round(now - start, 4)
+        return now
+
+    last_launch = launch()
+    try:
+        while running or queue:
+            while queue and (not running or hedge_after <= 0):
+                last_launch = launch()
+            timeout = max(0.0, last_launch + hedge_after - time.perf_counter()) if queue else None
+            done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                last_launch = launch()  # the hedge deadline passed with nothing back
+                continue
+            for task in done:
+                name = running.pop(task)
+                try:
+                    result = task.result()
+                except Exception as e:
+                    info["failed"][name] = str(e) or type(e).__name__
+                    continue
+                if not _valid(result):
+                    info["failed"][name] = "empty answer"
+                    continue
+                info["winner"] = name
+                info["elapsed"] = round(time.perf_counter() - start, 4)
+                return result, info
+        failures = "; ".join(f"{name}: {error}" for name, error in info["failed"].items())
+        raise RuntimeError(f"every backend failed ({failures})")
+    finally:
+        for task, name in running.items():
+            task.cancel()
+            info["cancelled"].append(name)
+        if running:
+            await asyncio.gather(*running, return_exceptions=True)
+
+
+def _latency_file():
+    return state_path("latency.json")
+
+
+def typical_latencies():
+    try:
+        return json.loads(_latency_file().read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def record_race(info):
+    """Fold a race into each backend's moving average latency.
+
+    The winner's own request time counts as is. A cancelled backend had
+    been waiting that long at least, so it only ever pushes its average up.
+    """
+    path = _latency_file()
+    # read-modify-write under the lock every qcraft process takes, like breaker.json
+    with _locked(path):
+        data = typical_latencies()
+        for name, offset in info["launched"].items():
+            seconds = info["elapsed"] - offset
+            backend = name.split("#")[0]
+            old = data.get(backend)
+            if name == info["winner"] or (name in info["cancelled"] and (old is None or seconds > old)):
+                data[backend] = round(seconds if old is None else old + EWMA_WEIGHT * (seconds - old), 4)
+        _replace(path, json.dumps(data))
+
+
+def latency_saved(info, primary):
+    """Seconds the race saved over waiting on `primary`, or None if unknown.
+
+    A cancelled primary would have taken at least as long as the race did,
+    and usually about its typical latency, so the estimate is the larger.
+    """
+    primary = label(primary)
+    if info["winner"] == primary or primary not in info["cancelled"]:
+        return None
+    typical = typical_latencies().get(primary)
+    if typical is None:
+        return None
+    return max(typical, info["elapsed"]) - info["elapsed"]
@@ -0,0 +1,184 @@
+"""Read a schema straight from a live database instead of a DDL file.
+
+SQLite files are read through sqlite_master, which keeps every CREATE
+statement as written (CHECKs and REFERENCES included); tables without one,
+such as virtual tables, are described from PRAGMA table_info and
+foreign_key_list. Any other DB-API 2.0 connection is read through the
+standard information_schema views. Either way the result is DDL text, so
+the catalog, pruning and validation treat it like a pasted schema.
+
+A fingerprint says whether the database changed since it was last read:
+for SQLite that is PRAGMA schema_version, which SQLite bumps on every
+schema change, so an unchanged 10k-table database is confirmed without
+reading its catalog at all.
+"""
+import hashlib
+import importlib
+import os
+import sqlite3
+from pathlib import Path
+
+_SKIP_SCHEMAS = ("information_schema", "pg_catalog", "pg_toast", "sys", "mysql", "performance_schema")
+
+
+def _sqlite_connect(path):
+    path = Path(path).resolve()
+    if not path.is_file():
+        raise FileNotFoundError(f"no SQLite database at {path}")
+    return sqlite3.connect(path.as_uri() + "?mode=ro", uri=True)
+
+
+def sqlite_fingerprint(path):
+    """Cheap change marker of a SQLite file: its schema version, no catalog reads."""
+    conn = _sqlite_connect(path)
+    try:
+        version = conn.execute("PRAGMA schema_version").fetchone()[0]
+    finally:
+        conn.close()
+    return f"sqlite:{Path(path).resolve()}:{version}"
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _from_pragmas(conn, name):
+    # CREATE TABLE for a table sqlite_master holds no usable statement for
+    columns = conn.execute(f"PRAGMA table_info({_quote(name)})").fetchall()
+    items = []
+    pk = [c[1] for c in sorted(columns, key=lambda c: c[5]) if c[5]]
+    for _, column, ctype, notnull, _, _ in columns:
+        items.append(f"    {_quote(column)} {ctype or ''}".rstrip() + (" NOT NULL" if notnull else ""))
+    if pk:
+        items.append(f"    PRIMARY KEY ({', '.join(map(_quote, pk))})")
+    fks = {}
+    for fk_id, seq, ref, column, ref_column, *_ in conn.execute(f"PRAGMA foreign_key_list({_quote(name)})"):
+        fks.setdefault(fk_id, (ref, []))[1].append((seq, column, ref_column))
+    for ref, pairs in fks.values():
+        pairs.sort()
+        ref_columns = ", ".join(_quote(r) for _, _, r in pairs if r)
+        items.append(f"    FOREIGN KEY ({', '.join(_quote(c) for _, c, _ in pairs)}) REFERENCES {_quote(ref)}"
+                     + (f" ({ref_columns})" if ref_columns else ""))
+    return f"CREATE TABLE {_quote(name)} (\n" + ",\n".join(items) + "\n);"
+
+
+def _shadow_tables(conn, rows):
+    # the storage tables behind virtual tables (an fts5 "notes" keeps notes_data,
+    # notes_idx, ...): internals, not something a question is about
+    try:
+        return {name for _, name, kind, *_ in conn.execute("PRAGMA table_list") if kind == "shadow"}
+    except sqlite3.DatabaseError:  # SQLite before 3.37: they are named <virtual table>_<suffix>
+        virtual = tuple(name + "_" for _, name, sql in rows if (sql or "").lstrip().upper().startswith("CREATE VIRTUAL"))
+        return {name for _, name, _ in rows if virtual and name.startswith(virtual)}
+
+
+def read_sqlite(path):
+    """(DDL text of the tables and views in a SQLite file, fingerprint)."""
+    conn = _sqlite_connect(path)
+    try:
+        # one transaction: the statements and the version come from the same schema
+        conn.execute("BEGIN")
+        version = conn.execute("PRAGMA schema_version").fetchone()[0]
+        rows = conn.execute("SELECT type, name, sql FROM sqlite_master WHERE type IN ('table', 'view') "
+                            "AND name NOT LIKE 'sqlite\\_%' ESCAPE '\\' ORDER BY rowid").fetchall()
+        shadow = _shadow_tables(conn, rows)
+        statements = []
+        for kind, name, sql in rows:
+            if name in shadow:
+                continue
+            if kind == "table" and (not sql or not sql.lstrip().upper().startswith("CREATE TABLE")):
+                sql = _from_pragmas(conn, name)
+            if sql:
+                statements.append(sql.strip().rstrip(";") + ";")
+    finally:
+        conn.close()
+    return "\n\n".join(statements) + "\n", f"sqlite:{Path(path).resolve()}:{version}"
+
+
+def _rows(conn, sql):
+    cur = conn.cursor()
+    try:
+        cur.execute(sql)
+        return cur.fetchall()
+    finally:
+        cur.close()
+
+
+def ddl_from_information_schema(columns, keys, references):
+    """CREATE TABLE text from information_schema rows.
+
+    columns: (schema, table, column, data_type, is_nullable) in ordinal order;
+    keys: (schema, table, constraint, type, column) with type PRIMARY KEY or
+    FOREIGN KEY, in key order; references: (schema, constraint, ref_table,
+    ref_column) in key order.
+    """
+    tables = {}
+    for schema, table, column, data_type, nullable in columns:
+        if str(schema).lower() in _SKIP_SCHEMAS:
+            continue
+        null = "" if str(nullable).upper() == "YES" else " NOT NULL"
+        tables.setdefault((schema, table), []).append(f"    {column} {data_type}{null}")
+    constraints = {}
+    for schema, table, name, kind, column in keys:
+        constraints.setdefault((schema, table, name, kind), []).append(column)
+    targets = {}
+    for schema, name, ref_table, ref_column in references:
+        target = targets.setdefault((schema, name), [ref_table, []])
+        target[1].append(ref_column)
+    for (schema, table, name, kind), cols in constraints.items():
+        items = tables.get((schema, table))
+        if items is None:
+            continue
+        if kind == "PRIMARY KEY":
+            items.append(f"    PRIMARY KEY ({', '.join(cols)})")
+        elif (schema, name) in targets:
+            ref_table, ref_columns = targets[(schema, name)]
+            items.append(f"    FOREIGN KEY ({', '.join(cols)}) REFERENCES {ref_table}({', '.join(ref_columns)})")
+    return "\n\n".join(f"CREATE TABLE {table} (\n" + ",\n".join(items) + "\n);"
+                       for (_, table), items in tables.items()) + "\n"
+
+
+def read_dbapi(conn):
+    """(DDL text, fingerprint) of any DB-API 2.0 connection.
+
+    sqlite3 connections go through sqlite_master; everything else through
+    information_schema (PostgreSQL, MySQL, SQL Server, ...). Foreign keys are
+    matched to the key they reference by constraint name, which MySQL reuses
+    (every primary key is PRIMARY), so there they may come out wrong. The
+    fingerprint is a hash of the DDL, as there is no portable schema version.
+    """
+    if isinstance(conn, sqlite3.Connection):
+        path = _rows(conn, "PRAGMA database_list")[0][2]
+        if path:
+            return read_sqlite(path)
+    columns = _rows(conn, "SELECT table_schema, table_name, column_name, data_type, is_nullable "
+                          "FROM information_schema.columns ORDER BY table_schema, table_name, ordinal_position")
+    keys = _rows(conn, "SELECT tc.table_schema, tc.table_name, tc.constraint_name, tc.constraint_type, kcu.column_name "
+                       "FROM information_schema.table_constraints tc "
+                       "JOIN information_schema.key_column_usage kcu ON kcu.constraint_schema = tc.constraint_schema "
+                       "AND kcu.constraint_name = tc.constraint_name AND kcu.table_name = tc.table_name "
+                       "WHERE tc.constraint_type IN ('PRIMARY KEY', 'FOREIGN KEY') "
+                       "ORDER BY tc.table_schema, tc.table_name, tc.constraint_name, kcu.ordinal_position")
+    references = _rows(conn, "SELECT rc.constraint_schema, rc.constraint_name, kcu.table_name, kcu.column_name "
+                             "FROM information_schema.referential_constraints rc "
+                             "JOIN information_schema.key_column_usage kcu "
+                             "ON kcu.constraint_schema = rc.unique_constraint_schema "
+                             "AND kcu.constraint_name = rc.unique_constraint_name "
+                             "ORDER BY rc.constraint_schema, rc.constraint_name, kcu.ordinal_position")
+    ddl = ddl_from_information_schema(columns, keys, references)
+    return ddl, "dbapi:" + hashlib.sha256(ddl.encode("utf-8")).hexdigest()
+
+
+def connect(factory, dsn):
+    """A DB-API connection from "module:callable" (e.g. psycopg2:connect) and a DSN."""
+    module, _, attr = factory.partition(":")
+    try:
+        func = getattr(importlib.import_module(module), attr or "connect")
+    except (ImportError, AttributeError) as e:
+        raise RuntimeError(f"cannot load {factory!r}: {e}") from e
+    return func(dsn) if dsn is not None else func()
+
+
+def source_of(path):
+    # what SCHEMA_SOURCE records for a SQLite file
+    return "sqlite:" + os.path.abspath(path)
@@ -0,0 +1,107 @@
+import csv
+import datetime
+import json
+import os
+import time
+
+from .batch import percentile
+from .catalog import schema_hash
+from .config import state_path
+from .trace import span
+
+# one JSON array per line, in this order; readers skip lines they cannot parse
+FIELDS = ("ts", "command", "provider", "model", "schema", "latency", "prompt_tokens", "completion_tokens", "ok",
+          "hit", "error", "cached_tokens")
+GROUP_KEYS = ("provider", "model", "day", "command")
+
+
+def _path():
+    return state_path("ledger.jsonl")
+
+
+def record(command, provider, model, schema, latency, prompt_tokens=0, completion_tokens=0, ok=True, hit=False,
+           error=None, cached_tokens=0):
+    """Append one provider call to the ledger.
+
+    A single O_APPEND write per call: no read, no lock, and lines from
+    concurrent processes never interleave. Failing to write is ignored,
+    the ledger must never break a command.
+    """
+    row = [round(time.time(), 3), command, provider, model or None, schema_hash(schema)[:12], round(latency, 4),
+           prompt_tokens or 0, completion_tokens or 0, int(bool(ok)), int(bool(hit)), (error or None) and error[:200],
+           cached_tokens or 0]
+    line = json.dumps(row, separators=(",", ":")) + "\n"
+    try:
+        with span("ledger.write"):
+            fd = os.open(_path(), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+            try:
+                os.write(fd, line.encode("utf-8"))
+            finally:
+                os.close(fd)
+    except OSError:
+        pass
+
+
+def read(days=None, command=None):
+    """Recorded calls as dicts, oldest first, optionally only the last `days`
+    days and one command."""
+    since = time.time() - days * 86400 if days else None
+    try:
+        f = open(_path(), encoding="utf-8")
+    except FileNotFoundError:
+        return []
+    entries = []
+    with f:
+        for line in f:
+            try:
+                values = json.loads(line)
+            except ValueError:
+                continue  # a line cut short by a crash
+            # lines written before a field was added lack it
+            entry = dict(zip(FIELDS, values + [0] * (len(FIELDS) - len(values))))
+            if (since and entry["ts"] < since) or (command and entry["command"] != command):
+                continue
+            entry["day"] = datetime.date.fromtimestamp(entry["ts"]).isoformat()
+            entries.append(entry)
+    return entries
+
+
+def summarize(entries, by=("provider", "model", "day")):
+    """One row per group: call/error/hit counts, token totals, latency
+    percentiles and tokens/sec. Cache hits count as calls but not towards
+    latency or speed, they never reached the provider."""
+    groups = {}
+    for entry in entries:
+        groups.setdefault(tuple(entry[key] for key in by), []).append(entry)
+    rows = []
+    for key, group in sorted(groups.items(), key=lambda kv: tuple(str(k) for k in kv[0])):
+        served = [e for e in group if e["ok"] and not e["hit"]]
+        latencies = [e["latency"] for e in served]
+        generating = sum(latencies)
+        row = dict(zip(by, key))
+        row.update(
+            calls=len(group),
+            errors=sum(not e["ok"] for e in group),
+            hits=sum(bool(e["hit"]) for e in group),
+            prompt_tokens=sum(e["prompt_tokens"] for e in group),
+            completion_tokens=sum(e["completion_tokens"] for e in group),
+            cached_tokens=sum(e["cached_tokens"] for e in group),
+            p50=round(percentile(latencies, 50), 3),
+            p95=round(percentile(latencies, 95), 3),
+            p99=round(percentile(latencies, 99), 3),
+            tokens_per_sec=round(sum(e["completion_tokens"] for e in served) / generating, 1) if generating else 0.0,
+        )
+        rows.append(row)
+    return rows
+
+
+def export(rows, fmt, out):
+    """Write `rows` (dicts with the same keys) to the file object `out` as csv or json."""
+    if fmt == "json":
+        json.dump(rows, out, indent=2)
+        out.write("\n")
+        return
+    fields = list(rows[0]) if rows else list(FIELDS)
+    writer = csv.DictWriter(out, fieldnames=fields, extrasaction="ignore")
+    writer.writeheader()
+    writer.writerows(rows)
@@ -1,181 +1,152 @@
-import openai
-import requests
-
-def req_call(nl_query: str, schema: str, query_type: str):
-    prompt = f"""
-    Convert this NL statement into a {query_type} query:
-    NL: {nl_query}.
-    Schema:
-    {schema}.
-    RULES:
-    ONLY return the raw query/code.
-    Do NOT include markdown formatting (no ```sql, ```python, or backticks).
-    Do NOT include explanations, comments, or extra text.
-    Output must start directly
-    Format the query/statement with proper next line
-    """
-    
-
-    url = "https://apifreellm.com/api/chat"   
-    
-    payload = {
-        "message": prompt
-    }
-    headers = {
-        "Content-Type": "application/json"
-    }
-
-    response = requests.post(url, json=payload, headers=headers)
-    
-    return response.json()["response"],  response.json()["usage"]["input_tokens"],response.json()["usage"]["output_tokens"]
-
-def retry_req_call(rec_q: str, rec_o,  schema: str, query_type: str, reason="unknown"):
-    prompt=f"""
-    The given schea is : {schema}
-    and you converted a NL command {rec_q} to database comand of query type {query_type} 
-    your answer {rec_o}
-    which is incorrect as {reason}
-    now debug this and give a perfect answer now : 
-    
-    
-    RULES:
-    ONLY return the raw query/code.
-    Do NOT include markdown formatting (no ```sql, ```python, or backticks).
-    Do NOT include explanations, comments, or extra text.
-    Output must start directly
-    Format the query/statement with proper next line
-    
-    """
-    
-
-    url = "https://apifreellm.com/api/chat"   
-    
-    payload = {
-        "message": prompt
-    }
-    headers = {
-        "Content-Type": "application/json"
-    }
-
-    response = requests.post(url, json=payload, headers=headers)
-    
-    return response.json()["response"],  response.json()["usage"]["input_tokens"],response.json()["usage"]["output_tokens"]
-
-def req_explain(rec_q,rec_o,schema,query_type):
-    prompt=f"""
-    The schema of the databse is {schema} of the type {query_type}
-    explain in few lines how query line {rec_o} does {rec_q} and how it works
-    
-    rules:
-        Do NOT include markdown formatting (no ```sql, ```python, or backticks).
-        Output must start directly
-        give only explnation, thats it nothing else.
-    
+import time
+
+from .config import get_config
+from . import trace
+from .transport import get_transport
+
+FREE_URL = "https://apifreellm.com/api/chat"
+
+
+def free_url():
+    # FREE_URL in the config points the free provider elsewhere (a mirror, a local stub)
+    return get_config("FREE_URL") or FREE_URL
+
+
+SYSTEM = "You are a helpful assistant that converts natural language queries to SQL or any other database query type, and explains them."
+
+
+def prompt_prefix(schema, query_type):
+    """What every convert/retry/explain prompt starts with, byte for byte.
+
+    Only the task after it changes between calls, so providers that cache
+    prompt prefixes (OpenAI prompt caching, llama.cpp/Ollama KV reuse) skip
+    re-reading the schema on every question about the same database.
     """
-    url = "https://apifreellm.com/api/chat"   
-    
-    payload = {
-        "message": prompt
-    }
-    headers = {
-        "Content-Type": "application/json"
-    }
-    response = requests.post(url, json=payload, headers=headers)
-    
-    return response.json()["response"],  response.json()["usage"]["input_tokens"],response.json()["usage"]["output_tokens"]
-
-
-class OpenAI:
-    def __init__(self, api_key="", base_url=None, model="gpt-3.5-turbo"):
-        self.client = openai.OpenAI(
-            api_key=api_key,
-            base_url=base_url,
-        )
+    return f"""{SYSTEM}
+
+Database type: {query_type}
+Schema:
+{schema}
+
+RULES when asked for a query:
+ONLY return the raw query/code.
+Do NOT include markdown formatting (no ```sql, ```python, or backticks).
+Do NOT include explanations, comments, or extra text.
+Output must start directly
+Format the query/statement with proper next line
+
+RULES when asked for an explanation:
+Do NOT include markdown formatting (no ```sql, ```python, or backticks).
+Output must start directly
+give only explanation, thats it nothing else."""
+
+
+def prompt_task(kind, query_type, nl_query=None, rec_q=None, rec_o=None, reason="unknown"):
+    # the per-call part, always last
+    if kind == "convert":
+        return f"""Convert this NL statement into a {query_type} query:
+NL: {nl_query}"""
+    if kind == "retry":
+        return f"""You converted this NL command into a {query_type} query:
+NL: {rec_q}
+Your answer:
+{rec_o}
+which is incorrect as {reason}
+now debug this and give a perfect answer now, following the query rules"""
+    return f"""explain in few lines how this query does the NL command and how it works
+NL: {rec_q}
+Query:
+{rec_o}"""
+
+
+def free_prompt(kind, schema, query_type, **parts):
+    # the free endpoint takes a single message: the shared prefix, then the task
+    return prompt_prefix(schema, query_type) + "\n\n" + prompt_task(kind, query_type, **parts)
+
+
+async def free_chat_async(prompt):
+    data = await get_transport().post_json_async(free_url(), {"message": prompt})
+    return data["response"], data["usage"]["input_tokens"], data["usage"]["output_tokens"]
+
+
+def _messages(system, prompt):
+    return [
+        {"role": "system", "content": system},
+        {"role": "user", "content": prompt},
+    ]
+
+
+def _consume(chunk, parts, on_token):
+    # one streamed chunk: collect and forward its text, return its usage if it carries one
+    if chunk.choices:
+        delta = chunk.choices[0].delta.content
+        if delta:
+            parts.append(delta)
+            on_token(delta)
+    usage = getattr(chunk, "usage", None)
+    return usage.model_dump() if usage else None
+
+
+class AsyncOpenAI:
+    """OpenAI chat client with coroutine methods, so many requests can share one event loop."""
+
+    @staticmethod
+    def prompt(kind, schema, query_type, **parts):
+        """(system, user) prompt pair for convert/retry/explain: the shared
+        prefix as the system message, the task as the user message."""
+        with trace.span("prompt.build"):
+            return prompt_prefix(schema, query_type), prompt_task(kind, query_type, **parts)
+
+    def __init__(self, api_key="", base_url=None, model="gpt-3.5-turbo", client=None):
+        # clients are pooled per event loop and base_url/api_key by the shared transport
+        self.client = client or get_transport().async_openai_client(api_key=api_key, base_url=base_url)
         self.model = model
 
-    def nl_to_query(self, nl_query: str, schema: str, query_type: str) -> tuple[str, dict]:
-        prompt = f"""
-        Convert this NL statement into a {query_type} query:
-        NL: {nl_query}.
-        Schema:
-        {schema}.
-        RULES:
-        ONLY return the raw query/code.
-        Do NOT include markdown formatting (no ```sql, ```python, or backticks).
-        Do NOT include explanations, comments, or extra text.
-        Output must start directly
-        Format the query/statement with proper next line
-        """
-
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a helpful assistant that converts natural language queries to SQL or anyother databse type queries which ever asked"
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ]
-        )
-        return response.choices[0].message.content.strip(), response.usage.model_dump()
-    
-    def retrying(self,schema,query_type ,rec_q,rec_o, reason="unknown"):
-        prompt=f"""
-        The given schea is : {schema}
-        and you converted a NL command {rec_q} to database comand of query type {query_type} 
-        your answer {rec_o}
-        generate another as {reason}
-        now debug this and give a perfect answer now : 
-        
-        
-        RULES:
-        ONLY return the raw query/code.
-        Do NOT include markdown formatting (no ```sql, ```python, or backticks).
-        Do NOT include explanations, comments, or extra text.
-        Output must start directly
-        Format the query/statement with proper next line
-        
-        """
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a helpful assistant that converts natural language queries to SQL or any other database query type ."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ]
-        )
-        return response.choices[0].message.content.strip(), response.usage.model_dump()
-    
-    def explaining(self,schema,query_type, rec_q , rec_o):
-        prompt=f"""
-        The schema of the databse is {schema} of the type {query_type}
-        explain in few lines how query line {rec_o} does {rec_q} and how it works
-        
-        rules:
-            Do NOT include markdown formatting (no ```sql, ```python, or backticks).
-            Output must start directly
-            give only explnation, thats it nothing else.
-        
-        """
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a helpful assistant that converts natural language queries to SQL or any other database query type ."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ]
-        )
-        return response.choices[0].message.content.strip(), response.usage.model_dump()
\ No newline at end of file
+    async def _chat(self, system, prompt, on_token=None):
+        messages = _messages(system, prompt)
+        if on_token is None:
+            if trace.enabled():
+                # raw response first, so waiting on the model and decoding its JSON time separately
+                with trace.span("llm.wait", model=self.model):
+                    raw = await self.client.chat.completions.with_raw_response.create(model=self.model,
+                                                                                      messages=messages)
+                with trace.span("llm.decode"):
+                    response = raw.parse()
+            else:
+                response = await self.client.chat.completions.create(model=self.model, messages=messages)
+            return response.choices[0].message.content.strip(), response.usage.model_dump()
+
+        start = time.perf_counter()
+        try:
+            stream = await self.client.chat.completions.create(
+                model=self.model, messages=messages, stream=True, stream_options={"include_usage": True})
+        except Exception as e:
+            if getattr(e, "status_code", None) != 400:
+                raise
+            stream = await self.client.chat.completions.create(model=self.model, messages=messages, stream=True)
+        parts, usage, first = [], {}, None
+        async with stream:
+            async for chunk in stream:
+                if first is None:
+                    first = time.perf_counter()
+                usage = _consume(chunk, parts, on_token) or usage
+        if trace.enabled() and first is not None:
+            trace.record("llm.first_token", start, first, model=self.model)
+            trace.record("llm.stream", first, time.perf_counter(), chunks=len(parts))
+        return "".join(parts).strip(), usage
+
+    async def choices(self, system, prompt, n):
+        """`n` sampled answers from one request, as ([text, ...], usage)."""
+        response = await self.client.chat.completions.create(model=self.model, messages=_messages(system, prompt), n=n)
+        texts = [c.message.content.strip() for c in response.choices if c.message.content]
+        return texts, response.usage.model_dump() if response.usage else {}
+
+    async def nl_to_query(self, nl_query, schema, query_type, on_token=None):
+        return await self._chat(*self.prompt("convert", schema, query_type, nl_query=nl_query), on_token)
+
+    async def retrying(self, schema, query_type, rec_q, rec_o, reason="unknown", on_token=None):
+        return await self._chat(*self.prompt("retry", schema, query_type, rec_q=rec_q, rec_o=rec_o, reason=reason),
+                                on_token)
+
+    async def explaining(self, schema, query_type, rec_q, rec_o, on_token=None):
+        return await self._chat(*self.prompt("explain", schema, query_type, rec_q=rec_q, rec_o=rec_o), on_token)
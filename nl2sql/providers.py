@@ -0,0 +1,217 @@
+import asyncio
+import atexit
+import threading
+import weakref
+
+from .config import get_config
+from .trace import span
+
+PROVIDERS = ("openai", "lmstudio", "ollama", "free")
+BASE_URLS = {
+    "lmstudio": "http://localhost:1234/v1",
+    "ollama": "http://localhost:11434/v1",
+}
+# requests one process keeps in flight per provider, <PROVIDER>_CONCURRENCY in the config overrides
+DEFAULT_LIMITS = {"openai": 16, "lmstudio": 4, "ollama": 4, "free": 8}
+
+_semaphores = weakref.WeakKeyDictionary()  # loop -> {(provider, limit): asyncio.Semaphore}
+_local = threading.local()
+
+
+def base_url(provider):
+    # <PROVIDER>_BASE_URL in the config overrides the default, e.g. a remote ollama
+    return get_config(f"{provider.upper()}_BASE_URL") or BASE_URLS.get(provider)
+
+
+def cached_tokens(usage):
+    # prompt tokens the backend served from its prefix cache (OpenAI, llama.cpp); others report none
+    return ((usage or {}).get("prompt_tokens_details") or {}).get("cached_tokens") or 0
+
+
+def concurrency_limit(provider):
+    try:
+        return max(1, int(get_config(f"{provider.upper()}_CONCURRENCY") or DEFAULT_LIMITS.get(provider, 4)))
+    except ValueError:
+        return DEFAULT_LIMITS.get(provider, 4)
+
+
+class Provider:
+    """One LLM backend behind a common coroutine API.
+
+    `complete(kind, schema, query_type, **prompt)` answers a convert, retry
+    or explain prompt and returns (text, prompt_tokens, completion_tokens),
+    retrying transient failures within the command's deadline (see
+    resilience.call); the semaphore is not held while backing off.
+    Every instance of a provider shares one semaphore per event loop, so no
+    more than `concurrency_limit(name)` of its requests run at once however
+    many coroutines are waiting on it. `cached_tokens` adds up the prompt
+    tokens the backend reported as served from its prompt cache.
+    """
+
+    name = None
+
+    def __init__(self, model=None, api_key=""):
+        self.model = model
+        self.api_key = api_key
+        self.cached_tokens = 0
+
+    def _semaphore(self):
+        # keyed by the limit too, so a config change applies to a long-lived loop
+        per_loop = _semaphores.setdefault(asyncio.get_running_loop(), {})
+        key = (self.name, concurrency_limit(self.name))
+        semaphore = per_loop.get(key)
+        if semaphore is None:
+            semaphore = per_loop[key] = asyncio.Semaphore(key[1])
+        return semaphore
+
+    async def complete(self, kind, schema, query_type, on_token=None, **prompt):
+        from .resilience import call
+        streamed = []
+
+        def forward(delta):
+            streamed.append(delta)
+            on_token(delta)
+
+        async def attempt():
+            with span("provider.queue", provider=self.name):
+                semaphore = self._semaphore()
+                await semaphore.acquire()
+            try:
+                with span("provider.request", provider=self.name, kind=kind):
+                    return await self._complete(kind, schema, query_type, on_token and forward, **prompt)
+            finally:
+                semaphore.release()
+
+        # a retry would repeat what the user already saw streamed
+        return await call(self.name, attempt, may_retry=lambda: not streamed)
+
+    async def _complete(self, kind, schema, query_type, on_token, **prompt):
+        raise NotImplementedError
+
+    async def warm(self):
+        """Import the SDK and open the pooled client now rather than on the first request."""
+
+    async def complete_many(self, kind, schema, query_type, n, **prompt):
+        """`n` independent answers to one prompt, requested concurrently.
+
+        Returns ([text, ...], prompt_tokens, completion_tokens) over the
+        answers that arrived; raises only when every request failed.
+        """
+        results = await asyncio.gather(*[self.complete(kind, schema, query_type, **prompt) for _ in range(n)],
+                                       return_exceptions=True)
+        answers = [r for r in results if not isinstance(r, BaseException)]
+        if not answers:
+            raise results[0]
+        return [r[0] for r in answers], sum(r[1] for r in answers), sum(r[2] for r in answers)
+
+
+class FreeProvider(Provider):
+    name = "free"
+
+    async def warm(self):
+        from .llm import free_url
+        from .transport import get_transport
+        get_transport().async_openai_client(api_key="none", base_url=free_url().rsplit("/", 1)[0])
+
+    async def _complete(self, kind, schema, query_type, on_token, **prompt):
+        # no streaming API here, on_token is never called
+        from .llm import free_chat_async, free_prompt
+        with span("prompt.build"):
+            message = free_prompt(kind, schema, query_type, **prompt)
+        return await free_chat_async(message)
+
+
+class OpenAICompatible(Provider):
+    """openai, or a local lmstudio/ollama server speaking the same API."""
+
+    def __init__(self, name, model=None, api_key=""):
+        super().__init__(model, api_key)
+        self.name = name
+        self.base_url = base_url(name)
+
+    def _client(self):
+        from .llm import AsyncOpenAI
+        # local servers ignore the key, but the SDK refuses to start without one
+        api_key = self.api_key or ("local" if self.base_url else self.api_key)
+        return AsyncOpenAI(api_key=api_key, base_url=self.base_url, model=self.model)
+
+    async def warm(self):
+        self._client()
+
+    async def _complete(self, kind, schema, query_type, on_token, **prompt):
+        with span("client.init"):  # the first call in a process also imports the SDK
+            llm = self._client()
+        rec_q, rec_o = prompt.get("rec_q"), prompt.get("rec_o")
+        if kind == "convert":
+            output, usage = await llm.nl_to_query(prompt["nl_query"], schema, query_type, on_token=on_token)
+        elif kind == "retry":
+            output, usage = await llm.retrying(schema, query_type, rec_q, rec_o, prompt.get("reason", "unknown"),
+                                               on_token=on_token)
+        else:
+            output, usage = await llm.explaining(schema, query_type, rec_q, rec_o, on_token=on_token)
+        usage = usage or {}
+        self.cached_tokens += cached_tokens(usage)
+        return output, usage.get("prompt_tokens") or 0, usage.get("completion_tokens") or 0
+
+    async def complete_many(self, kind, schema, query_type, n, **prompt):
+        # one request with the API's `n` where the server honours it, the
+        # shortfall (servers that return a single choice) as separate requests
+        from .resilience import call
+        llm = self._client()
+
+        async def attempt():
+            async with self._semaphore():
+                return await llm.choices(*llm.prompt(kind, schema, query_type, **prompt), n)
+
+        try:
+            texts, usage = await call(self.name, attempt)
+            self.cached_tokens += cached_tokens(usage)
+        except Exception as e:
+            if getattr(e, "status_code", None) != 400:
+                raise
+            texts, usage = [], {}  # `n` rejected, sample one request at a time
+        i_tokens, o_tokens = (usage or {}).get("prompt_tokens") or 0, (usage or {}).get("completion_tokens") or 0
+        if len(texts) < n:
+            more, more_in, more_out = await super().complete_many(kind, schema, query_type, n - len(texts), **prompt)
+            texts, i_tokens, o_tokens = texts + more, i_tokens + more_in, o_tokens + more_out
+        return texts, i_tokens, o_tokens
+
+
+def get_provider(name, model=None, api_key=""):
+    if name == "free":
+        return FreeProvider(model, api_key)
+    if name in PROVIDERS:
+        return OpenAICompatible(name, model, api_key)
+    raise ValueError(f"unknown provider {name!r}, expected one of {', '.join(PROVIDERS)}")
+
+
+def run(coro):
+    """Run `coro` to completion from synchronous code.
+
+    Each thread keeps one event loop for its lifetime instead of a fresh one
+    per call, so the async clients pooled on it stay warm between calls.
+    """
+    loop = getattr(_local, "loop", None)
+    if loop is None or loop.is_closed():
+        loop = _local.loop = asyncio.new_event_loop()
+        atexit.register(_shutdown, loop)
+    task = loop.create_task(coro)
+    try:
+        return loop.run_until_complete(task)
+    except KeyboardInterrupt:
+        # let the coroutine's finally blocks run before giving up
+        task.cancel()
+        loop.run_until_complete(asyncio.gather(task, return_exceptions=True))
+        raise
+
+
+def _shutdown(loop):
+    # finalize what the SDK left suspended (streams), quietly, before the loop goes away
+    if not loop.is_closed() and not loop.is_running():
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
+
+
+def complete(provider, model, api_key, kind, schema, query_type, on_token=None, **prompt):
+    """Blocking `Provider.complete`, for the one-shot commands."""
+    return run(get_provider(provider, model, api_key).complete(kind, schema, query_type, on_token, **prompt))
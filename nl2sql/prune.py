@@ -0,0 +1,160 @@
+import math
+import re
+from collections import Counter
+
+from .catalog import build_catalog, load_catalog
+from .compact import render
+
+DEFAULT_SCHEMA_BUDGET = 4000  # prompt tokens the schema may take before pruning kicks in
+_WORD = re.compile(r"[A-Za-z][a-z]*|[A-Z]+(?![a-z])|\d+")
+_STOP = {
+    "a", "an", "the", "of", "in", "on", "for", "to", "by", "with", "and", "or", "all", "each", "every",
+    "me", "show", "get", "list", "find", "fetch", "give", "return", "select", "which", "what", "who",
+    "that", "their", "there", "is", "are", "was", "were", "be", "from", "than", "more", "less", "per",
+    "how", "many", "much", "count", "number", "total", "top", "where", "has", "have", "had", "not", "query",
+}
+
+
+def estimate_tokens(text):
+    # close enough to BPE token counts for SQL-ish text, and free to compute
+    return math.ceil(len(text or "") / 4)
+
+
+def _stem(word):
+    for suffix in ("ies", "es", "s"):
+        if word.endswith(suffix) and len(word) > len(suffix) + 2:
+            return word[: -len(suffix)] + ("y" if suffix == "ies" else "")
+    return word
+
+
+def tokenize(text):
+    """Split identifiers and prose into comparable terms.
+
+    order_items / orderItems / "Order Items" all become ["order", "item"].
+    """
+    terms = []
+    for chunk in re.split(r"[^A-Za-z0-9]+", text or ""):
+        for word in _WORD.findall(chunk):
+            word = word.lower()
+            if word not in _STOP and len(word) > 1:
+                terms.append(_stem(word))
+    return terms
+
+
+class SchemaIndex:
+    """TF-IDF index over the tables of a catalog.
+
+    Each table is a document made of its name (weighted up) and its column
+    names. `select` scores tables against a question, then adds FK
+    neighbours so joins stay possible.
+    """
+
+    TABLE_NAME_WEIGHT = 3
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self.tables = tables = catalog.tables
+        self.order = list(tables)
+
+        docs = {}
+        for name, table in tables.items():
+            terms = tokenize(name) * self.TABLE_NAME_WEIGHT
+            for column in table.columns:
+                terms += tokenize(column.name)
+            docs[name] = Counter(terms)
+        df = Counter(term for counts in docs.values() for term in counts)
+        n = len(docs)
+        self.idf = {term: math.log((1 + n) / (1 + freq)) + 1 for term, freq in df.items()}
+        self.weights = {}
+        for name, counts in docs.items():
+            vec = {term: (1 + math.log(tf)) * self.idf[term] for term, tf in counts.items()}
+            norm = math.sqrt(sum(w * w for w in vec.values())) or 1.0
+            self.weights[name] = {term: w / norm for term, w in vec.items()}
+        self.postings = {}
+        for name, vec in self.weights.items():
+            for term, w in vec.items():
+                self.postings.setdefault(term, []).append((name, w))
+
+    @classmethod
+    def from_schema(cls, schema):
+        return cls(build_catalog(schema))
+
+    def score(self, text):
+        scores = Counter()
+        for term, qtf in Counter(tokenize(text)).items():
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for name, w in self.postings[term]:
+                scores[name] += w * idf * qtf
+        return scores
+
+    def select(self, text, budget, size=None):
+        """Names of the tables to send, most relevant first, within `budget` tokens.
+
+        `size` gives a table's prompt text when it is not sent as its DDL.
+        """
+        scores = self.score(text)
+        ranked = [name for name, s in scores.most_common() if s > 0]
+        chosen, used = [], 0
+
+        def take(name):
+            nonlocal used
+            cost = estimate_tokens(size(name) if size else self.tables[name].ddl)
+            if name in chosen or (chosen and used + cost > budget):
+                return False
+            chosen.append(name)
+            used += cost
+            return True
+
+        # direct hits first, then their FK neighbours by their own relevance
+        for name in ranked:
+            take(name)
+        for name in list(chosen):
+            for ref in sorted(self.catalog.neighbours(name), key=lambda r: (-scores.get(r, 0), r)):
+                take(ref)
+        return chosen
+
+
+_indexes = {}
+
+
+def index_for(catalog):
+    # one index per schema per process, batch runs prune every question
+    index = _indexes.get(catalog.schema_hash)
+    if index is None or index.catalog is not catalog:
+        index = _indexes[catalog.schema_hash] = SchemaIndex(catalog)
+    return index
+
+
+def prune_schema(schema, text, budget=None, catalog=None, lines=None):
+    """Cut `schema` down to the tables relevant to `text`.
+
+    Returns (schema_text, info). The full schema is returned untouched when it
+    already fits in `budget`, when it does not parse as DDL, or when nothing in
+    `text` matches a table, so pruning can only ever shrink a prompt that was
+    too big anyway. info has tables/total_tables/tokens_before/tokens_after.
+    The catalog is only loaded when the schema is over budget. With `lines`
+    (see compact.compact_lines) tables are measured and sent in the compact
+    notation instead of as DDL.
+    """
+    budget = budget or DEFAULT_SCHEMA_BUDGET
+    full = render(lines) if lines is not None else schema
+    before = estimate_tokens(full)
+    info = {"pruned": False, "tables": None, "total_tables": None, "tokens_before": before, "tokens_after": before}
+    if before <= budget:
+        return full, info
+    index = index_for(catalog or load_catalog(schema))
+    info["total_tables"] = len(index.tables)
+    if not index.tables:
+        return full, info
+    chosen = index.select(text, budget, lines.get if lines is not None else None)
+    if not chosen:
+        return full, info
+    keep = set(chosen)
+    if lines is not None:
+        pruned = render(lines, keep)
+    else:
+        pruned = "\n\n".join(index.tables[name].ddl for name in index.order if name in keep)
+    info.update(pruned=True, tables=chosen, tokens_after=estimate_tokens(pruned))
+    return pruned, info
@@ -0,0 +1,204 @@
+import asyncio
+import contextlib
+import contextvars
+import email.utils
+import json
+import random
+import sys
+import time
+
+from .config import _locked, _replace, get_config, state_path
+from .trace import span
+
+DEFAULT_ATTEMPTS = 4       # tries per request, RETRY_ATTEMPTS in the config overrides
+BACKOFF_BASE = 0.5         # seconds the first retry waits at most, doubling after each
+BACKOFF_CAP = 8.0
+MAX_RETRY_AFTER = 60.0     # a server asking for a longer pause than this is given up on
+BREAKER_THRESHOLD = 5      # failed tries in a row that open a provider's circuit, BREAKER_THRESHOLD overrides
+BREAKER_COOLDOWN = 30.0    # seconds an open circuit fails fast before one trial request, BREAKER_COOLDOWN overrides
+RETRY_STATUS = {408, 409, 425, 429, 500, 502, 503, 504}
+
+_deadline = contextvars.ContextVar("qcraft_deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+class CircuitOpen(RuntimeError):
+    pass
+
+
+@contextlib.contextmanager
+def within(seconds):
+    """Provider calls inside have to finish within `seconds` from now, retries
+    and backoff included; None leaves the limit (if any) as it was."""
+    end = _deadline.get()
+    if seconds is not None:
+        end = min(end, time.monotonic() + seconds) if end is not None else time.monotonic() + seconds
+    token = _deadline.set(end)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining():
+    """Seconds left before the deadline, or None without one."""
+    end = _deadline.get()
+    return None if end is None else end - time.monotonic()
+
+
+def _setting(key, default, kind=float):
+    try:
+        return kind(get_config(key) or default)
+    except ValueError:
+        return default
+
+
+def status_of(error):
+    # openai.APIStatusError has status_code, other errors carrying an HTTP response have it there
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status
+
+
+def transient(error):
+    """Whether a failed request is worth sending again: throttling, a 5xx, a
+    dropped connection or a timeout, not a rejected key or prompt."""
+    status = status_of(error)
+    if status is not None:
+        return status in RETRY_STATUS
+    if isinstance(error, (OSError, asyncio.TimeoutError)):  # a socket error, or wait_for's timeout
+        return True
+    # the SDK wraps httpx's connect/read errors and timeouts in APIConnectionError
+    openai = sys.modules.get("openai")  # only ever raised once the SDK is loaded
+    return openai is not None and isinstance(error, openai.APIConnectionError)
+
+
+def retry_after(error):
+    """Seconds the server asked to wait (Retry-After / retry-after-ms), or None."""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return max(0.0, float(headers["retry-after-ms"]) / 1000)
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff(attempt):
+    """Full-jitter exponential backoff before retry number `attempt` (from 0)."""
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+
+def _breaker_file():
+    return state_path("breaker.json")
+
+
+def circuits():
+    """Per-provider breaker state, shared by every qcraft process:
+    {key: {"failures": n, "opened": epoch seconds}}."""
+    try:
+        return json.loads(_breaker_file().read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+@contextlib.contextmanager
+def _updating():
+    # read-modify-write under the lock every qcraft process takes, so
+    # failures counted at the same time in two processes both count
+    path = _breaker_file()
+    with _locked(path):
+        data = circuits()
+        before = json.dumps(data)
+        yield data
+        if json.dumps(data) != before:
+            _replace(path, json.dumps(data))
+
+
+def check_circuit(key):
+    """Raise CircuitOpen while `key` is cooling down after failing again and again.
+
+    Once the cooldown is over one request goes through as a trial, and the
+    next cooldown starts right away so the others keep failing fast until
+    the trial has succeeded.
+    """
+    threshold = _setting("BREAKER_THRESHOLD", BREAKER_THRESHOLD, int)
+    state = circuits().get(key)
+    if not state or state["failures"] < threshold:
+        return  # the usual case, decided without taking the lock
+    cooldown = _setting("BREAKER_COOLDOWN", BREAKER_COOLDOWN)
+    with _updating() as data:
+        state = data.get(key)
+        if not state or state["failures"] < threshold:
+            return
+        wait = state["opened"] + cooldown - time.time()
+        if wait > 0:
+            raise CircuitOpen(f"{key} failed {state['failures']} times in a row, not trying it again for {wait:.0f}s "
+                              f"(use another provider meanwhile)")
+        state["opened"] = time.time()
+
+
+def record_failure(key):
+    threshold = _setting("BREAKER_THRESHOLD", BREAKER_THRESHOLD, int)
+    with _updating() as data:
+        state = data.setdefault(key, {"failures": 0, "opened": 0.0})
+        state["failures"] += 1
+        if state["failures"] >= threshold:
+            state["opened"] = time.time()
+
+
+def record_success(key):
+    if key in circuits():
+        with _updating() as data:
+            data.pop(key, None)
+
+
+async def call(key, attempt, may_retry=None):
+    """`await attempt()` for provider `key`, within the deadline, with retries.
+
+    Transient failures are retried up to RETRY_ATTEMPTS tries in all, after
+    the server's Retry-After or a jittered exponential backoff, as long as
+    the wait still fits before the deadline; every one counts towards
+    opening the provider's circuit. `may_retry()` can veto a retry, e.g.
+    once part of a streamed answer was shown. The last error is raised as is.
+    """
+    attempts = max(1, _setting("RETRY_ATTEMPTS", DEFAULT_ATTEMPTS, int))
+    for n in range(attempts):
+        check_circuit(key)
+        left = remaining()
+        if left is not None and left <= 0:
+            raise DeadlineExceeded(f"no answer from {key} before the deadline")
+        try:
+            result = await (attempt() if left is None else asyncio.wait_for(attempt(), left))
+        except Exception as e:
+            if isinstance(e, asyncio.TimeoutError) and left is not None and remaining() <= 0:
+                raise DeadlineExceeded(f"no answer from {key} before the deadline") from None
+            if not transient(e):
+                raise
+            record_failure(key)
+            if n + 1 >= attempts or (may_retry is not None and not may_retry()):
+                raise
+            delay = retry_after(e)
+            if delay is not None and delay > MAX_RETRY_AFTER:
+                raise
+            delay = backoff(n) if delay is None else delay
+            left = remaining()
+            if left is not None and delay >= left:
+                raise DeadlineExceeded(f"{key} failed ({e}) and the next try would start past the deadline") from e
+            with span("provider.backoff", provider=key, seconds=round(delay, 3)):
+                await asyncio.sleep(delay)
+        else:
+            record_success(key)
+            return result
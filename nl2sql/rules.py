@@ -0,0 +1,408 @@
+"""Answer simple questions locally, without a model.
+
+Covers one table, optionally joined to a table it references (one foreign
+key hop): projections, filters on columns and CHECK values, comparisons,
+COUNT/SUM/AVG/MIN/MAX with GROUP BY, ORDER BY and top-N. Every word of the
+question has to be accounted for by a table, a column, a value or a known
+keyword, and every other character by a quote, number or operator; a single
+word or symbol left over means the question is not as simple as it looks,
+and `generate` returns None so the model answers it instead. So does a
+second value for the same column ("CA or NY", "Shipped and Pending"): the
+rules only AND filters together and never write IN or OR.
+"""
+import re
+
+from .validate import is_sql
+
+_TOKEN = re.compile(r"'[^']*'|\"[^\"]*\"|\d{4}-\d{2}-\d{2}(?:[ T]\d{2}:\d{2}(?::\d{2})?)?|\d+(?:\.\d+)?"
+                    r"|[<>]=?|!=|=|[A-Za-z_][A-Za-z0-9_]*(?:'[A-Za-z]+)*")
+_THOUSANDS = re.compile(r"(?<=\d),(?=\d{3}\b)")
+_IDENTIFIER = re.compile(r"[a-z_][a-z0-9_]*")
+_NUMERIC_TYPE = re.compile(r"INT|DEC|NUM|REAL|FLOAT|DOUBLE|MONEY|SERIAL", re.IGNORECASE)
+_DATE_TYPE = re.compile(r"DATE|TIME", re.IGNORECASE)
+_TOP_DIALECT = re.compile(r"sql\s*server|mssql|t-sql|tsql|azure|sybase", re.IGNORECASE)
+_FETCH_DIALECT = re.compile(r"oracle|db2", re.IGNORECASE)
+# words that would need quoting as identifiers somewhere; such schemas go to the model
+_RESERVED = frozenset("all and as asc by case check column count date default desc distinct from group having in "
+                      "index key like limit not null or order select table to top user values when where".split())
+
+# SQL these rules never write; a question using them is not asking for a plain
+# value, and "CA or NY" would otherwise be read as the one value 'CA or NY'
+_UNSUPPORTED = frozenset("null nulls like ilike between or".split())
+_FILLER = frozenset("show me list all the every get find fetch display give return select a an of with which that "
+                    "whose where who have has having in from for and what please records rows entries details "
+                    "their there i want need to can you do we our data info information everything any on "
+                    "each".split())
+_KEYWORDS = {
+    ("less", "than"): ("op", "<"), ("fewer", "than"): ("op", "<"), ("lower", "than"): ("op", "<"),
+    ("cheaper", "than"): ("op", "<"), ("under",): ("op", "<"), ("below",): ("op", "<"), ("before",): ("op", "<"),
+    ("more", "than"): ("op", ">"), ("greater", "than"): ("op", ">"), ("higher", "than"): ("op", ">"),
+    ("over",): ("op", ">"), ("above",): ("op", ">"), ("after",): ("op", ">"), ("exceeding",): ("op", ">"),
+    ("at", "least"): ("op", ">="), ("no", "less", "than"): ("op", ">="), ("since",): ("op", ">="),
+    ("at", "most"): ("op", "<="), ("no", "more", "than"): ("op", "<="), ("up", "to"): ("op", "<="),
+    ("equal", "to"): ("op", "="), ("equals",): ("op", "="), ("=",): ("op", "="), ("<",): ("op", "<"),
+    (">",): ("op", ">"), ("<=",): ("op", "<="), (">=",): ("op", ">="), ("!=",): ("op", "!="),
+    ("is",): ("is", "="), ("are",): ("is", "="), ("was",): ("is", "="), ("were",): ("is", "="),
+    ("not",): ("not", "!="), ("isn't",): ("not", "!="), ("aren't",): ("not", "!="),
+    ("other", "than"): ("not", "!="),
+    ("count",): ("agg", "COUNT"), ("number",): ("agg", "COUNT"), ("how", "many"): ("agg", "COUNT"),
+    ("average",): ("agg", "AVG"), ("avg",): ("agg", "AVG"), ("mean",): ("agg", "AVG"),
+    ("total",): ("agg", "SUM"), ("sum",): ("agg", "SUM"),
+    ("minimum",): ("agg", "MIN"), ("min",): ("agg", "MIN"),
+    ("maximum",): ("agg", "MAX"), ("max",): ("agg", "MAX"),
+    ("by",): ("group", None), ("per",): ("group", None), ("for", "each"): ("group", None),
+    ("grouped", "by"): ("group", None), ("group", "by"): ("group", None), ("for", "every"): ("group", None),
+    ("sorted", "by"): ("sort", None), ("ordered", "by"): ("sort", None), ("order", "by"): ("sort", None),
+    ("sort", "by"): ("sort", None),
+    ("asc",): ("dir", "ASC"), ("ascending",): ("dir", "ASC"), ("desc",): ("dir", "DESC"),
+    ("descending",): ("dir", "DESC"),
+    ("top",): ("top", None), ("first",): ("top", None), ("limit",): ("top", None),
+}
+_MAX_PHRASE = 4
+
+
+def _stem(word):
+    if word.endswith("ies") and len(word) > 4:
+        return word[:-3] + "y"
+    if word.endswith(("sses", "uses", "xes", "ches", "shes")):
+        return word[:-2]
+    if word.endswith("s") and not word.endswith(("ss", "us")) and len(word) > 3:
+        return word[:-1]
+    return word
+
+
+def _words(identifier):
+    return tuple(_stem(w) for w in identifier.lower().split("_") if w)
+
+
+def _lex_tokens(question):
+    """(kind, raw, lowercase word) per token, or None when something in the
+    question is not a token (an address, a % pattern, a list with commas) or
+    asks for NULL/LIKE/BETWEEN/OR: dropping it would change what is asked."""
+    text = _THOUSANDS.sub("", question).strip().rstrip("?.")
+    tokens, end = [], 0
+    for match in _TOKEN.finditer(text):
+        if text[end:match.start()].strip():
+            return None
+        end = match.end()
+        raw = match.group()
+        if raw[0] in "'\"":
+            tokens.append(("quoted", raw[1:-1], None))
+        elif raw[0].isdigit():
+            # a number can also be part of a name: "customer order 5" is customer_order_5
+            tokens.append(("date", raw, None) if "-" in raw else ("number", raw, raw))
+        else:
+            lower = raw.lower()
+            if lower in _UNSUPPORTED:
+                return None
+            tokens.append(("word", raw, lower))
+    return None if text[end:].strip() else tokens
+
+
+class _Schema:
+    """The tables a question on `main` may use: itself and those it references."""
+
+    def __init__(self, catalog, main):
+        self.catalog = catalog
+        self.main = catalog.table(main)
+        self.joins = {}  # referenced table -> (main columns, their columns)
+        for fk in self.main.foreign_keys:
+            ref = catalog.table(fk.ref_table)
+            if ref is None or ref.name == self.main.name:
+                continue
+            ref_columns = fk.ref_columns or ref.primary_key
+            if fk.ref_table in self.joins or len(ref_columns) != len(fk.columns):
+                self.joins[fk.ref_table] = None  # two ways to join: ambiguous
+            else:
+                self.joins[fk.ref_table] = (fk.columns, ref_columns)
+
+    def vocabulary(self, mentioned):
+        """(identifier phrases by stem tuple, CHECK values by lowercase word tuple)."""
+        phrases, values = {}, {}
+        tables = [self.main] + [self.catalog.table(t) for t, on in self.joins.items() if on]
+        for table in tables:
+            phrases[_words(table.name)] = ("table", table.name)
+        for table in tables:
+            own = table is self.main
+            for column in table.columns:
+                prefixed = _words(table.name) + _words(column.name)
+                phrases.setdefault(prefixed, ("column", table.name, column.name))
+                if own or (table.name in mentioned and _words(column.name) not in phrases):
+                    phrases.setdefault(_words(column.name), ("column", table.name, column.name))
+                for value in column.check_values or ():
+                    key = tuple(str(value).lower().split())
+                    found = ("value", table.name, column.name, str(value))
+                    # a value two columns allow says nothing about which one is meant
+                    values[key] = found if values.get(key, found) == found else ("ambiguous",)
+        return phrases, values
+
+
+def _lex(tokens, phrases, values):
+    items, i = [], 0
+    while i < len(tokens):
+        kind, raw, lower = tokens[i]
+        if lower is None:
+            items.append((kind, raw))
+            i += 1
+            continue
+        for size in range(min(_MAX_PHRASE, len(tokens) - i), 0, -1):
+            window = tokens[i:i + size]
+            if any(t[2] is None for t in window):
+                continue
+            lowers = tuple(t[2] for t in window)
+            found = phrases.get(tuple(_stem(w) for w in lowers)) or values.get(lowers) or _KEYWORDS.get(lowers)
+            if found:
+                items.append(found + (" ".join(t[1] for t in window),))
+                i += size
+                break
+        else:
+            # filler stays as a gap: "Home and Garden" is not the value "Home Garden"
+            items.append(("filler" if lower in _FILLER else kind, raw))
+            i += 1
+    return items
+
+
+class _Query:
+    def __init__(self, schema):
+        self.schema = schema
+        self.columns, self.aggregates, self.where, self.group, self.order = [], [], [], [], []
+        self.limit = None
+        self.tables = {schema.main.name}
+        self.mentioned = set()  # other tables named on their own
+
+    def use(self, table):
+        if table != self.schema.main.name:
+            self.tables.add(table)
+
+    def filter(self, table, column, op, value):
+        if op == "=" and any(w[:3] == (table, column, "=") for w in self.where):
+            # "status Shipped and Pending" means either one, never both
+            return False
+        col = self.schema.catalog.column(table, column)
+        kind, text = value
+        if col.check_values:
+            allowed = {str(v).lower(): str(v) for v in col.check_values}
+            if kind == "number" or text.lower() not in allowed or op not in ("=", "!="):
+                return False
+            literal = _string(allowed[text.lower()])
+        elif _NUMERIC_TYPE.search(col.type or ""):
+            if kind != "number":
+                return False
+            literal = text
+        elif _DATE_TYPE.search(col.type or ""):
+            if kind not in ("date", "quoted"):
+                return False
+            literal = _string(text)
+        else:
+            if op not in ("=", "!="):
+                return False
+            literal = _string(text)
+        self.use(table)
+        self.where.append((table, column, op, literal))
+        return True
+
+
+def _string(text):
+    return "'" + text.replace("'", "''") + "'"
+
+
+def _value(items, i):
+    """(kind, text) of the value starting at items[i] and the index after it."""
+    if i >= len(items):
+        return None, i
+    kind = items[i][0]
+    if kind in ("number", "date", "quoted"):
+        return (kind, items[i][1]), i + 1
+    if kind == "word":
+        words = []
+        while i < len(items) and items[i][0] == "word":
+            words.append(items[i][1])
+            i += 1
+        return ("word", " ".join(words)), i
+    return None, i
+
+
+def _parse(items, schema):
+    q = _Query(schema)
+    agg = None  # an aggregate waiting for its column or table
+    mode = None  # "group" or "sort" right after `by`
+    i = 0
+    while i < len(items):
+        item = items[i]
+        kind = item[0]
+        if kind == "filler":
+            i += 1
+        elif kind == "table":
+            if agg == "COUNT" and item[1] == schema.main.name:
+                q.aggregates.append(("COUNT", None, None))
+                agg = None
+            elif agg or mode:
+                return None
+            q.mentioned.add(item[1])
+            i += 1
+        elif kind == "agg":
+            if agg or mode:
+                return None
+            agg = item[1]
+            i += 1
+        elif kind in ("group", "sort"):
+            if agg or mode:
+                return None
+            mode = kind
+            i += 1
+        elif kind == "column":
+            table, column = item[1], item[2]
+            i += 1
+            if agg:
+                q.aggregates.append((agg, table, column))
+                q.use(table)
+                agg = None
+            elif mode == "group":
+                q.group.append((table, column))
+                q.use(table)
+                mode = None
+            elif mode == "sort":
+                q.order.append([table, column, "ASC"])
+                q.use(table)
+                mode = None
+            else:
+                op = "="
+                if i < len(items) and items[i][0] in ("op", "is", "not"):
+                    op = items[i][1]
+                    i += 1
+                    if op == "=" and i < len(items) and items[i][0] == "not":
+                        op = "!="
+                        i += 1
+                if i < len(items) and items[i][0] == "value":
+                    if items[i][1:3] != (table, column):
+                        return None
+                    value, i = ("word", items[i][3]), i + 1
+                else:
+                    value, i = _value(items, i)
+                if value is None:
+                    if op != "=" or (i > 0 and items[i - 1][0] in ("op", "is", "not")):
+                        return None
+                    q.columns.append((table, column))
+                    q.use(table)
+                elif not q.filter(table, column, op, value):
+                    return None
+        elif kind == "value":
+            if mode:  # "count shipped orders" is fine, "by shipped" is not
+                return None
+            if not q.filter(item[1], item[2], "=", ("word", item[3])):
+                return None
+            i += 1
+        elif kind == "not" and i + 1 < len(items) and items[i + 1][0] == "value" and not mode:
+            if not q.filter(items[i + 1][1], items[i + 1][2], "!=", ("word", items[i + 1][3])):
+                return None
+            i += 2
+        elif kind == "is":
+            i += 1  # "orders that are shipped": only means = right after a column
+        elif kind == "dir":
+            if not q.order:
+                return None
+            q.order[-1][2] = item[1]
+            i += 1
+        elif kind == "top":
+            if q.limit is not None or i + 1 >= len(items) or items[i + 1][0] != "number" or "." in items[i + 1][1]:
+                return None
+            q.limit = int(items[i + 1][1])
+            i += 2
+        else:  # a stray value, operator or unknown word
+            return None
+    if agg or mode:
+        return None
+    if q.limit is not None and q.group and not q.aggregates:
+        # "top 5 products by price": the highest first, not a grouping
+        q.order = [[t, c, "DESC"] for t, c in q.group]
+        q.group = []
+    if q.group and (not q.aggregates or q.columns):
+        return None
+    if q.aggregates and q.columns:
+        return None
+    # "customers with orders" is not a list of orders joined to customers, but
+    # "orders of customers with customer id 7" only needs the foreign key
+    touched = {(t, c) for t, c, *_ in q.where + q.columns + q.group + q.order}
+    touched |= {(t, c) for _, t, c in q.aggregates}
+    keyed = {ref for ref, on in schema.joins.items() if on and all((schema.main.name, c) in touched for c in on[0])}
+    if q.mentioned - q.tables - keyed - {schema.main.name}:
+        return None
+    return q
+
+
+def _render(q, query_type):
+    schema = q.schema
+    main = schema.main.name
+    joined = sorted(q.tables - {main})
+    qualify = bool(joined)
+
+    def ref(table, column):
+        return f"{table}.{column}" if qualify else column
+
+    select = [ref(t, c) for t, c in q.group]
+    for func, table, column in q.aggregates:
+        if column is None:
+            select.append("COUNT(*) AS count")
+        else:
+            select.append(f"{func}({ref(table, column)}) AS {func.lower()}_{column}")
+    select += [ref(t, c) for t, c in q.columns]
+    if not select:
+        select = [f"{main}.*" if qualify else "*"]
+    top = q.limit is not None and _TOP_DIALECT.search(query_type or "")
+    lines = [f"SELECT {'TOP ' + str(q.limit) + ' ' if top else ''}{', '.join(select)}", f"FROM {main}"]
+    for table in joined:
+        main_cols, ref_cols = schema.joins[table]
+        on = " AND ".join(f"{main}.{a} = {table}.{b}" for a, b in zip(main_cols, ref_cols))
+        lines.append(f"JOIN {table} ON {on}")
+    if q.where:
+        lines.append("WHERE " + " AND ".join(f"{ref(t, c)} {op} {v}" for t, c, op, v in q.where))
+    if q.group:
+        lines.append("GROUP BY " + ", ".join(ref(t, c) for t, c in q.group))
+    if q.order:
+        lines.append("ORDER BY " + ", ".join(f"{ref(t, c)} {d}" for t, c, d in q.order))
+    if q.limit is not None and not top:
+        if _FETCH_DIALECT.search(query_type or ""):
+            lines.append(f"FETCH FIRST {q.limit} ROWS ONLY")
+        else:
+            lines.append(f"LIMIT {q.limit}")
+    return "\n".join(lines) + ";"
+
+
+def _plain(names):
+    return all(_IDENTIFIER.fullmatch(n) and n not in _RESERVED for n in names)
+
+
+def generate(catalog, question, query_type):
+    """SQL answering `question` from the catalog alone, or None when the
+    question is not one of the simple shapes handled here."""
+    if not is_sql(query_type) or not question or len(catalog) == 0:
+        return None
+    tokens = _lex_tokens(question)
+    if tokens is None:
+        return None
+    stems = [t[2] and _stem(t[2]) for t in tokens]
+    # every table named in the question, in order, is tried as the one being asked about
+    candidates = []
+    for i in range(len(tokens)):
+        for size in range(min(_MAX_PHRASE, len(tokens) - i), 0, -1):
+            name = "_".join(s or "" for s in stems[i:i + size])
+            if all(stems[i:i + size]) and name not in candidates:
+                table = catalog.table(name) or catalog.table(name + "s")
+                if table is not None:
+                    candidates.append(table.name)
+                    break
+    for main in candidates:
+        schema = _Schema(catalog, main)
+        mentioned = set(candidates)
+        phrases, values = schema.vocabulary(mentioned)
+        items = _lex(tokens, phrases, values)
+        if any(item[0] == "ambiguous" for item in items):
+            continue
+        q = _parse(items, schema)
+        if q is None:
+            continue
+        names = [main, *q.tables] + [c.name for t in q.tables for c in catalog.table(t).columns]
+        if not _plain(names):
+            return None
+        return _render(q, query_type)
+    return None
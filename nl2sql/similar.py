@@ -0,0 +1,146 @@
+"""Near-duplicate detection for NL questions: normalized token sets, MinHash
+signatures and LSH bands.
+
+A question becomes a set of tokens with the wording that does not change the
+query folded away ("show me all", plural s, "below"/"under"/"less than" ->
+"<", "1,000$" -> "1000"). Two questions are near-duplicates when the Jaccard
+similarity of their sets reaches the threshold and their guard tokens
+(numbers, quoted values, comparison operators, negations, aggregates, sort
+directions and, given the schema's vocabulary, every word that is neither
+a table or column name nor filler, CHECK values included) are identical,
+so "orders under 1000" never answers "orders under 2000", "orders over
+1000" or "orders in Texas" "orders in California". The MinHash bands only
+pick candidates; every match is verified on the exact sets.
+"""
+import functools
+import hashlib
+import re
+
+DEFAULT_THRESHOLD = 0.8
+NUM_HASHES = 32
+BANDS = 8  # 8 bands of 4 rows: pairs at Jaccard 0.8 share a band ~99% of the time, at 0.4 ~20%
+
+_PRIME = (1 << 61) - 1
+_MASK = (1 << 63) - 1  # band keys fit a signed SQLite INTEGER
+# fixed (a, b) pairs so signatures are stable across processes and versions
+_COEFFS = [(int.from_bytes(hashlib.blake2b(b"a%d" % i, digest_size=8).digest(), "big") % (_PRIME - 1) + 1,
+            int.from_bytes(hashlib.blake2b(b"b%d" % i, digest_size=8).digest(), "big") % _PRIME)
+           for i in range(NUM_HASHES)]
+
+_TOKEN = re.compile(r"'[^']*'|\"[^\"]*\"|\d+(?:\.\d+)?|[a-z_][a-z0-9_]*|[<>]=?|!=|=")
+_THOUSANDS = re.compile(r"(?<=\d),(?=\d{3}\b)")
+_PHRASES = [(re.compile(p), r) for p, r in (
+    (r"\b(?:less|fewer|lower|smaller|cheaper) than\b|\bbelow\b|\bunder\b|\bbeneath\b", " < "),
+    (r"\b(?:more|greater|higher|larger|bigger|costlier) than\b|\babove\b|\bover\b|\bexceeding\b", " > "),
+    (r"\bat least\b|\bor more\b|\bno less than\b", " >= "),
+    (r"\bat most\b|\bor less\b|\bno more than\b|\bup to\b", " <= "),
+    (r"\bequal to\b|\bequals\b", " = "),
+)]
+_STOP = frozenset("a an the all every any show me list get give fetch find display return retrieve please "
+                  "what which are is was were of for i want need to can you".split())
+_NEGATIONS = frozenset("not no without never except excluding exclude none".split())
+# words that pick another query however similar the rest is, synonyms folded first
+_FOLD = {"avg": "average", "mean": "average", "max": "maximum", "min": "minimum", "sum": "total",
+         "asc": "ascending", "desc": "descending", "many": "count", "number": "count", "highest": "maximum",
+         "lowest": "minimum", "largest": "maximum", "smallest": "minimum", "unique": "distinct"}
+_GUARDED = frozenset("count average maximum minimum total ascending descending top first last latest newest "
+                     "oldest earliest most least distinct reverse".split())
+_LITERALS = re.compile(r"'(?:[^']|'')*'|∈\{[^}]*\}")
+_NAME = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+
+
+def _stem(word):
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+# wording that is neither a name nor a value
+_FILLER = frozenset(_stem(w) for w in "by in with where whose who that sorted ordered order sort group grouped per "
+                    "each how from have has having on and or than named called their its them it they along into "
+                    "within do does did be been same as there this these those also both just only".split())
+
+
+@functools.lru_cache(maxsize=8)
+def vocabulary(schema):
+    """Stemmed words of the names in `schema` (DDL or the compact notation).
+
+    Literals, CHECK values among them, are left out: in a question they are
+    values, and a question naming another one wants another query.
+    """
+    words = set()
+    for name in set(_NAME.findall(_LITERALS.sub(" ", schema or "").lower())):
+        words.add(_stem(name))
+        words.update(_stem(part) for part in name.split("_") if part)
+    return frozenset(words)
+
+
+def features(question, vocabulary=None):
+    """The normalized token set of a question; with the schema's `vocabulary`
+    the words that are values are marked as such (prefixed with ~)."""
+    text = _THOUSANDS.sub("", str(question or "").lower())
+    for pattern, replacement in _PHRASES:
+        text = pattern.sub(replacement, text)
+    tokens = set()
+    for token in _TOKEN.findall(text):
+        if token in _STOP:
+            continue
+        if token[0] in "'\"":
+            token = "'" + token.strip("'\"").strip()
+        elif token[0].isalpha() or token[0] == "_":
+            token = _stem(token)
+            token = _FOLD.get(token, token)
+            if vocabulary is not None and token not in vocabulary and token not in _FILLER \
+                    and token not in _GUARDED and token not in _NEGATIONS:
+                token = "~" + token
+        tokens.add(token)
+    return frozenset(tokens)
+
+
+def _guard(tokens):
+    # values, operators and what is computed: a question differing in any of them wants another query
+    return {t for t in tokens if t[0] in "'<>=!~" or t[0].isdigit() or t in _NEGATIONS or t in _GUARDED}
+
+
+def similarity(a, b):
+    """Jaccard similarity of two token sets, 0 when their guard tokens differ."""
+    if _guard(a) != _guard(b):
+        return 0.0
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def _token_hash(token):
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def signature(tokens):
+    """MinHash signature of a token set, NUM_HASHES values."""
+    hashes = [_token_hash(t) for t in tokens] or [0]
+    return [min((a * h + b) % _PRIME for h in hashes) for a, b in _COEFFS]
+
+
+def band_keys(tokens, scope):
+    """One LSH bucket per band; questions sharing any bucket are candidates.
+
+    `scope` (schema hash and query type) and the guard tokens are part of
+    every key: questions that could never match are never in one bucket, so
+    thousands of "orders over N" stay out of each other's way.
+    """
+    sig = signature(tokens)
+    rows = NUM_HASHES // BANDS
+    prefix = f"{scope}\x1f" + encode(_guard(tokens))
+    keys = []
+    for band in range(BANDS):
+        data = f"{prefix}\x1f{band}\x1f" + ",".join(map(str, sig[band * rows:(band + 1) * rows]))
+        keys.append(int.from_bytes(hashlib.blake2b(data.encode(), digest_size=8).digest(), "big") & _MASK)
+    return keys
+
+
+def encode(tokens):
+    return "\x1f".join(sorted(tokens))
+
+
+def decode(text):
+    return frozenset(text.split("\x1f")) if text else frozenset()
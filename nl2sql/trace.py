@@ -0,0 +1,109 @@
+import contextlib
+import contextvars
+import os
+import threading
+import time
+
+_NOOP = contextlib.nullcontext()
+_tracer = None
+_parents = contextvars.ContextVar("qcraft_span_parents", default=())
+
+
+def span(name, **args):
+    """Context manager timing one phase. Free when tracing is off: a global
+    check and a shared null context, nothing is allocated or recorded."""
+    if _tracer is None:
+        return _NOOP
+    return _tracer.span(name, args)
+
+
+def enabled():
+    return _tracer is not None
+
+
+def record(name, start, end, **args):
+    """Add a span timed by hand (perf_counter values), e.g. up to a first streamed token."""
+    if _tracer is not None:
+        _tracer.add(name, start, end, _parents.get(), args)
+
+
+class Tracer:
+    """Collects spans as (name, start, end, parents, track, args).
+
+    A track is a thread, or an asyncio task inside one, so requests running
+    concurrently on one loop land on separate rows of the trace.
+    """
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.spans = []
+        self.tracks = {}
+        self._lock = threading.Lock()
+
+    def _track(self):
+        import asyncio
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        key = (threading.get_ident(), id(task) if task else None)
+        with self._lock:
+            if key not in self.tracks:
+                self.tracks[key] = (len(self.tracks) + 1, task.get_name() if task else threading.current_thread().name)
+            return self.tracks[key][0]
+
+    def add(self, name, start, end, parents, args):
+        self.spans.append((name, start, end, parents, self._track(), args))
+
+    @contextlib.contextmanager
+    def span(self, name, args):
+        parents = _parents.get()
+        token = _parents.set(parents + (name,))
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            _parents.reset(token)
+            self.add(name, start, end, parents, args)
+
+    def breakdown(self):
+        """(depth, name, total seconds, count) per phase, each phase right
+        after its parent and siblings in the order they first started."""
+        totals, children = {}, {}
+        for name, start, end, parents, _, _ in sorted(self.spans, key=lambda s: s[1]):
+            path = parents + (name,)
+            if path not in totals:
+                totals[path] = [0.0, 0]
+                children.setdefault(parents, []).append(path)
+            totals[path][0] += end - start
+            totals[path][1] += 1
+        rows, pending = [], list(reversed(children.get((), [])))
+        while pending:
+            path = pending.pop()
+            rows.append((len(path) - 1, path[-1], *totals[path]))
+            pending += reversed(children.get(path, []))
+        return rows
+
+    def chrome_trace(self):
+        """The spans as Chrome trace events (chrome://tracing, ui.perfetto.dev)."""
+        pid = os.getpid()
+        events = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": label}}
+                  for tid, label in self.tracks.values()]
+        for name, start, end, _, tid, args in self.spans:
+            events.append({"name": name, "cat": "qcraft", "ph": "X", "pid": pid, "tid": tid,
+                           "ts": round((start - self.origin) * 1e6, 1), "dur": round((end - start) * 1e6, 1),
+                           "args": {k: str(v) for k, v in args.items()}})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def start():
+    global _tracer
+    _tracer = Tracer()
+    return _tracer
+
+
+def stop():
+    global _tracer
+    tracer, _tracer = _tracer, None
+    return tracer
@@ -0,0 +1,114 @@
+import asyncio
+import threading
+import weakref
+
+from .config import get_config
+from .trace import span
+
+DEFAULT_CONNECT_TIMEOUT = 5.0   # seconds to establish TCP/TLS
+DEFAULT_READ_TIMEOUT = 120.0    # seconds to wait for the model between bytes
+
+
+class Transport:
+    """HTTP plumbing shared by every provider.
+
+    One `openai.AsyncOpenAI` client per event loop and (base_url, api_key)
+    serves openai/lmstudio/ollama and the free endpoint, so repeated calls
+    in a process (batch mode, retries, the shell) reuse warm connections
+    instead of a new TCP+TLS handshake each. All of them use the same
+    connect/read timeouts, and the SDK is only imported when the first
+    request is made. The clients leave retrying to resilience.call, which
+    keeps to the command's deadline and the provider's circuit breaker.
+    Connections are sized by the SDK's own pool (100 kept alive), above any
+    <PROVIDER>_CONCURRENCY cap, which is what bounds a batch run.
+    """
+
+    def __init__(self, connect_timeout=DEFAULT_CONNECT_TIMEOUT, read_timeout=DEFAULT_READ_TIMEOUT):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self._async_clients = weakref.WeakKeyDictionary()  # loop -> {(base_url, api_key): client}
+        self._lock = threading.Lock()
+
+    def async_openai_client(self, api_key="", base_url=None):
+        # async connection pools belong to the loop that opened them
+        loop = asyncio.get_running_loop()
+        clients = self._async_clients.setdefault(loop, {})
+        key = (base_url, api_key)
+        client = clients.get(key)
+        if client is None:
+            import openai
+            client = clients[key] = openai.AsyncOpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                timeout=openai.Timeout(self.read_timeout, connect=self.connect_timeout),
+                max_retries=0,
+            )
+        return client
+
+    async def post_json_async(self, url, payload):
+        """POST `payload` as JSON from a coroutine and return the decoded JSON body.
+
+        No Authorization header is sent: this is for endpoints that take no key.
+        """
+        # the openai SDK's async HTTP client does plain JSON posts just as well,
+        # once the bearer header it would build from the placeholder key is left out
+        import openai
+        base_url, path = url.rsplit("/", 1)
+        with span("client.init"):
+            client = self.async_openai_client(api_key="none", base_url=base_url)
+        with span("http.post", url=url):
+            return await client.post(path, body=payload, cast_to=object,
+                                     options={"headers": {"Authorization": openai.Omit()}})
+
+    def close(self):
+        with self._lock:
+            for loop, clients in list(self._async_clients.items()):
+                for client in clients.values():
+                    _close_async(loop, client)
+            self._async_clients.clear()
+
+
+def _close_async(loop, client):
+    # on the loop its connections belong to: left to the garbage collector, the
+    # SDK closes it on whatever loop runs at that moment, tearing down
+    # descriptors that may belong to that loop's new connections by then
+    if loop.is_closed():
+        return
+    if loop.is_running():
+        asyncio.run_coroutine_threadsafe(client.close(), loop)
+    else:
+        loop.run_until_complete(client.close())
+
+
+_transport = None
+_transport_lock = threading.Lock()
+
+
+def _float_config(key, default):
+    try:
+        return float(get_config(key) or default)
+    except ValueError:
+        return default
+
+
+def get_transport():
+    """The process-wide transport, timeouts come from CONNECT_TIMEOUT / READ_TIMEOUT."""
+    global _transport
+    if _transport is None:
+        with _transport_lock:
+            if _transport is None:
+                _transport = Transport(
+                    connect_timeout=_float_config("CONNECT_TIMEOUT", DEFAULT_CONNECT_TIMEOUT),
+                    read_timeout=_float_config("READ_TIMEOUT", DEFAULT_READ_TIMEOUT),
+                )
+    return _transport
+
+
+def set_transport(transport):
+    # swap the shared transport, e.g. for one with other timeouts or fresh clients
+    global _transport
+    with _transport_lock:
+        old, _transport = _transport, transport
+    if old is not None and old is not transport:
+        old.close()
+    return transport
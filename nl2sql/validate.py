@@ -0,0 +1,199 @@
+import os
+import re
+import sqlite3
+import time
+
+from .catalog import load_catalog, schema_hash
+from .config import state_path
+
+DEFAULT_MAX_ATTEMPTS = 3  # the first answer plus two automatic retries
+SCRIPT_VERSION = 1
+
+# TYPE values that mean SQL; anything else (mongo, cypher, ...) is not validated
+_SQL_TYPES = re.compile(r"sql|sqlite|postgres|mariadb|oracle|duckdb|snowflake|redshift|bigquery|db2|"
+                        r"hive|presto|trino|spark|teradata|sybase|informix|cockroach|h2|derby|firebird",
+                        re.IGNORECASE)
+_NOT_SQL_TYPES = re.compile(r"nosql|mongo|cypher|graphql|gremlin|sparql", re.IGNORECASE)
+_SQLITE_TYPE = re.compile(r"sqlite", re.IGNORECASE)
+_SAFE_TYPE = re.compile(r"^[A-Za-z][\w ]*(\(\s*\d+\s*(,\s*\d+\s*)?\))?$")
+_QUALIFIER = re.compile(r"CREATE\s+(?:[\w\s]*?)TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?[\"`\[]?(\w+)[\"`\]]?\.",
+                        re.IGNORECASE)
+_VIEW = re.compile(r"CREATE\s+(?:OR\s+REPLACE\s+)?(?:MATERIALIZED\s+)?VIEW\s+(?:IF\s+NOT\s+EXISTS\s+)?"
+                   r"(?P<name>[\w\"`\[\]\.]+)", re.IGNORECASE)
+_FENCE = re.compile(r"^\s*```[\w-]*\s*\n?|\n?\s*```\s*$")
+# what SQLite can check in any dialect: names, not syntax or functions
+_NAME_ERRORS = ("no such table", "no such column", "ambiguous column name", "cannot join using column")
+
+
+def is_sql(query_type):
+    return bool(query_type and _SQL_TYPES.search(query_type) and not _NOT_SQL_TYPES.search(query_type))
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _columns(catalog):
+    # {table: column list} in the form the CREATE TABLEs below use
+    return {name: ", ".join(_quote(c.name) + (" " + c.type if _SAFE_TYPE.match(c.type or "") else "")
+                            for c in table.columns) or '"_"'
+            for name, table in catalog.tables.items()}
+
+
+def sqlite_script(schema, catalog=None):
+    """The schema as CREATE TABLE statements SQLite accepts. Vendor types,
+    defaults and constraints are dropped; EXPLAIN only needs the names."""
+    catalog = catalog or load_catalog(schema)
+    return "\n".join(f"CREATE TABLE IF NOT EXISTS {_quote(name)} ({columns});"
+                     for name, columns in _columns(catalog).items())
+
+
+def _db_path(schema):
+    return state_path("sqlite") / f"{schema_hash(schema)}.v{SCRIPT_VERSION}.db"
+
+
+def _patch(conn, base, catalog):
+    """Turn a copy of `base` (the database of an earlier schema) into the one
+    for `catalog` by dropping and creating only the tables that differ.
+    False when too much changed for that to beat a fresh build."""
+    source = sqlite3.connect(base)
+    try:
+        source.backup(conn)
+    finally:
+        source.close()
+    # SQLite keeps the statement as given, minus IF NOT EXISTS
+    have = dict(conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'table'"))
+    want = {name: f"CREATE TABLE {_quote(name)} ({columns})" for name, columns in _columns(catalog).items()}
+    stale = [name for name, sql in have.items() if want.get(name) != sql]
+    missing = [sql for name, sql in want.items() if have.get(name) != sql]
+    if len(stale) + len(missing) > len(want) // 2:
+        return False
+    conn.executescript("BEGIN;\n" + "".join(f"DROP TABLE {_quote(name)};\n" for name in stale)
+                       + "".join(sql + ";\n" for sql in missing) + "COMMIT;")
+    return True
+
+
+def build_database(schema, previous=None):
+    """Create the empty copy of `schema` and store it, returns its path or
+    None when no table parses. Thousands of CREATE TABLEs take seconds in
+    SQLite (each one scans the schema table), so this happens once per schema
+    and later runs copy the file; with the `previous` schema's copy at hand
+    only the tables that changed are dropped and recreated."""
+    catalog = load_catalog(schema)
+    if not len(catalog):
+        return None
+    path = _db_path(schema)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(":memory:")
+    base = _db_path(previous) if previous else None
+    if base is None or not base.exists() or not _patch(conn, base, catalog):
+        conn.close()
+        conn = sqlite3.connect(":memory:")
+        conn.executescript("BEGIN;\n" + sqlite_script(schema, catalog) + "\nCOMMIT;")
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    disk = sqlite3.connect(tmp)
+    try:
+        conn.backup(disk)
+    finally:
+        disk.close()
+        conn.close()
+    os.replace(tmp, path)
+    return path
+
+
+def split_statements(sql):
+    """Top-level statements in `sql`, semicolons inside strings respected."""
+    statements, start = [], 0
+    for m in re.finditer(";", sql):
+        if sqlite3.complete_statement(sql[start:m.end()]):
+            statements.append(sql[start:m.end()].strip())
+            start = m.end()
+    statements.append(sql[start:].strip())
+    return [s for s in statements if s.strip(" ;\n\t")]
+
+
+class Validator:
+    """EXPLAINs generated SQL against an empty in-memory copy of the schema.
+
+    Nothing is executed. With a sqlite TYPE every engine error counts; for
+    other dialects only unknown/ambiguous table and column names do, since
+    their functions and syntax are not SQLite's. `check` returns
+    (status, message) with status "ok", "error" or "unchecked".
+    """
+
+    def __init__(self, path, strict=False, views=(), qualifiers=()):
+        self.strict = strict
+        self.views = set(views)
+        self.conn = sqlite3.connect(":memory:", uri=True, check_same_thread=False)
+        disk = sqlite3.connect(f"{path.as_uri()}?mode=ro", uri=True)
+        try:
+            disk.backup(self.conn)
+        finally:
+            disk.close()
+        # public.orders / dbo.orders resolve against the same tables
+        for qualifier in qualifiers:
+            self.conn.execute(f"ATTACH DATABASE ? AS {_quote(qualifier)}", (f"{path.as_uri()}?mode=ro",))
+        self.conn.execute("PRAGMA query_only = ON")
+
+    def check(self, sql):
+        sql = _FENCE.sub("", sql or "").strip()
+        statements = split_statements(sql)
+        if not statements:
+            return "error", "empty query"
+        unchecked = None
+        for statement in statements:
+            try:
+                self.conn.execute("EXPLAIN " + statement).fetchall()
+            except sqlite3.Error as e:
+                message = str(e)
+                if message.startswith("no such table: ") and self._unknown_object(message[15:]):
+                    unchecked = unchecked or message
+                elif self.strict or message.startswith(_NAME_ERRORS):
+                    return "error", message
+                else:
+                    unchecked = unchecked or message
+        return ("unchecked", unchecked) if unchecked else ("ok", None)
+
+    def plan_size(self, sql):
+        """VDBE instructions EXPLAIN compiles `sql` to, or None if it does not compile."""
+        size = 0
+        try:
+            for statement in split_statements(_FENCE.sub("", sql or "").strip()):
+                size += len(self.conn.execute("EXPLAIN " + statement).fetchall())
+        except sqlite3.Error:
+            return None
+        return size or None
+
+    def _unknown_object(self, name):
+        # a view (no columns we know of), or a table under a qualifier the DDL never used
+        qualifier, _, bare = name.rpartition(".")
+        if bare.lower() in self.views:
+            return True
+        return bool(qualifier) and self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (bare.lower(),)).fetchone() is not None
+
+
+_validators = {}
+
+
+def load_validator(schema, query_type):
+    """Validator for `schema`, or None when TYPE is not SQL or no table parses."""
+    if not schema or not is_sql(query_type):
+        return None
+    strict = bool(_SQLITE_TYPE.search(query_type))
+    key = (schema_hash(schema), strict)
+    validator = _validators.get(key)
+    if validator is None:
+        path = _db_path(schema)
+        if not path.exists() and build_database(schema) is None:
+            return None
+        views = [m.group("name").split(".")[-1].strip("\"`[]").lower() for m in _VIEW.finditer(schema)]
+        qualifiers = sorted({q.lower() for q in _QUALIFIER.findall(schema)} - {"main", "temp"})
+        validator = _validators[key] = Validator(path, strict, views, qualifiers)
+    return validator
+
+
+def timed_check(validator, sql):
+    start = time.perf_counter()
+    status, message = validator.check(sql)
+    return status, message, time.perf_counter() - start
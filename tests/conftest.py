@@ -0,0 +1,37 @@
+import sys
+
+import pytest
+
+from nl2sql import config
+
+STUB_SCHEMA = "CREATE TABLE orders (id INT, total REAL)"
+
+
+@pytest.fixture(autouse=True)
+def isolated_home(tmp_path, monkeypatch):
+    # never touch the real ~/.mycli_config or ~/.qcraft from the tests
+    monkeypatch.setattr(config, "CONFIG_FILE", tmp_path / ".mycli_config")
+    monkeypatch.setattr(config, "STATE_DIR", tmp_path / ".qcraft")
+    # nor reuse what an earlier test loaded from its own state dir
+    for module, memo in (("nl2sql.catalog", "_loaded"), ("nl2sql.validate", "_validators"), ("nl2sql.compact", "_loaded")):
+        if module in sys.modules:
+            monkeypatch.setattr(sys.modules[module], memo, {})
+    return tmp_path
+
+
+@pytest.fixture
+def stub():
+    """The stub LLM server answering at once, with ollama and the free
+    provider pointed at it and a small schema set; files with their own
+    schema override this by requesting it and setting SCHEMA."""
+    from benchmarks.stub_llm import StubConfig, StubServer
+    from nl2sql.transport import Transport, set_transport
+    server = StubServer(StubConfig(latency=0, tokens_per_sec=10000, completion_tokens=4)).start()
+    config.set_config("SCHEMA", STUB_SCHEMA)
+    config.set_config("TYPE", "sqlite")
+    config.set_config("OLLAMA_BASE_URL", server.base + "/v1")
+    config.set_config("FREE_URL", server.base + "/api/chat")
+    set_transport(Transport())
+    yield server
+    set_transport(Transport())
+    server.stop()
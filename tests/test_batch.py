@@ -0,0 +1,99 @@
+import asyncio
+import json
+
+from nl2sql.batch import load_done, load_questions, percentile, run_batch_async, summarize
+
+
+def test_load_questions_accepts_json_and_plain_lines(tmp_path):
+    path = tmp_path / "q.jsonl"
+    path.write_text('{"id": "a", "nl_query": "all orders"}\n"all customers"\n\nall products\n')
+    assert load_questions(path) == [("a", "all orders"), ("2", "all customers"), ("4", "all products")]
+
+
+def test_run_batch_bounds_concurrency_and_resumes(tmp_path):
+    out = tmp_path / "out.jsonl"
+    items = [(str(i), f"question {i}") for i in range(30)]
+    active, peak = 0, 0
+
+    async def convert_one(nl_query):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.005)
+        active -= 1
+        if nl_query == "question 7":
+            raise RuntimeError("bad gateway")
+        return "SELECT 1", 10, 2
+
+    records = asyncio.run(run_batch_async(items, convert_one, out, concurrency=4))
+    assert len(records) == 30
+    assert peak == 4
+    assert len(out.read_text().splitlines()) == 30
+
+    done = load_done(out)
+    assert ("7", "question 7") not in done and len(done) == 29
+    stats = summarize(records, 1.0)
+    assert stats["ok"] == 29 and stats["failed"] == 1
+    assert stats["prompt_tokens"] == 290
+
+    # a torn line from a killed run is ignored, not fatal
+    with open(out, "a") as f:
+        f.write('{"id": "9", "query"')
+    assert load_done(out) == done
+    assert json.loads(out.read_text().splitlines()[0])["query"] == "SELECT 1"
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([], 95) == 0.0
+
+
+def test_run_batch_async_bounds_tasks_in_flight(tmp_path):
+    out = tmp_path / "out.jsonl"
+    items = [(str(i), f"question {i}") for i in range(20)]
+    active, peak = 0, 0
+
+    async def convert_one(nl_query):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.005)
+        active -= 1
+        if nl_query == "question 3":
+            raise RuntimeError("timeout")
+        return "SELECT 1", 5, 1
+
+    records = asyncio.run(run_batch_async(items, convert_one, out, concurrency=5))
+    assert len(records) == 20 and peak == 5
+    assert load_done(out) == set(items) - {("3", "question 3")}
+
+
+def test_resume_after_a_torn_line_starts_on_a_fresh_line(tmp_path):
+    out = tmp_path / "out.jsonl"
+    out.write_text('{"id": "1", "nl_query": "q1", "query": "SELECT 1", "error": null}\n{"id": "2", "que')
+    items = [(str(i), f"q{i}") for i in range(1, 4)]
+
+    async def convert_one(nl_query):
+        return "SELECT 2", 1, 1
+
+    todo = [item for item in items if item not in load_done(out)]
+    asyncio.run(run_batch_async(todo, convert_one, out))
+    lines = out.read_text().splitlines()
+    assert sorted(json.loads(line)["id"] for line in lines) == ["1", "2", "3"]
+    assert load_done(out) == set(items)
+
+
+def test_resume_reruns_questions_whose_line_changed(tmp_path):
+    questions, out = tmp_path / "q.txt", tmp_path / "out.jsonl"
+    questions.write_text("all orders\nall customers\ntop 3 products by price\n")
+
+    async def convert_one(nl_query):
+        return f"-- {nl_query}", 1, 1
+
+    asyncio.run(run_batch_async(load_questions(questions), convert_one, out))
+    # a question inserted in the middle moves the others to new line numbers
+    questions.write_text("all orders\nall customers\nproducts never ordered\ntop 3 products by price\n")
+    todo = [item for item in load_questions(questions) if item not in load_done(out)]
+    assert todo == [("3", "products never ordered"), ("4", "top 3 products by price")]
@@ -0,0 +1,68 @@
+import multiprocessing
+
+from click.testing import CliRunner
+
+from nl2sql.cache import ResponseCache, make_key
+from nl2sql.cli import cli
+from nl2sql.config import get_config
+
+
+def test_key_ignores_case_and_whitespace_but_not_schema():
+    a = make_key("convert", "free", None, "CREATE TABLE t (a INT)", "sqlite", "All  orders")
+    b = make_key("convert", "free", None, "CREATE TABLE t (a INT)", "SQLite", " all orders ")
+    c = make_key("convert", "free", None, "CREATE TABLE t (b INT)", "sqlite", "all orders")
+    d = make_key("explain", "free", None, "CREATE TABLE t (a INT)", "sqlite", "all orders")
+    assert a == b
+    assert len({a, c, d}) == 3
+
+
+def test_lru_eviction_by_entries_and_age(tmp_path):
+    cache = ResponseCache(tmp_path / "c.db", max_entries=3)
+    for i in range(3):
+        cache.put(f"k{i}", "convert", f"SELECT {i}", 10, 1)
+    assert cache.get("k0") == ("SELECT 0", 10, 1)  # k0 is now most recently used
+    cache.put("k3", "convert", "SELECT 3")
+    assert cache.get("k1") is None
+    assert cache.get("k0") is not None
+    assert cache.stats()["entries"] == 3
+
+    cache.max_age = -1
+    assert cache.get("k0") is None
+    cache.put("k4", "convert", "SELECT 4")
+    assert cache.stats()["entries"] == 0
+
+
+def _writer(path, worker):
+    cache = ResponseCache(path)
+    for i in range(25):
+        cache.put(f"{worker}-{i}", "convert", "SELECT 1")
+        cache.get(f"{worker}-{i}")
+
+
+def test_concurrent_processes_share_the_cache(tmp_path):
+    path = tmp_path / "c.db"
+    ResponseCache(path).stats()
+    procs = [multiprocessing.Process(target=_writer, args=(path, w)) for w in range(4)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    assert all(p.exitcode == 0 for p in procs)
+    stats = ResponseCache(path).stats()
+    assert stats["entries"] == 100
+    assert stats["hits"] == 100
+
+
+def test_convert_answers_a_repeat_from_the_cache(stub):
+    args = ["convert", "all orders", "--provider", "ollama", "--model", "m", "--no-local", "--no-validate"]
+    result = CliRunner().invoke(cli, args)
+    assert result.exit_code == 0, result.output
+    assert "Cache: miss (hits: 0, similar: 0, misses: 1)" in result.output
+    assert len(stub.take_records()) == 1
+    answer = get_config("REC_OUTPUT")
+    result = CliRunner().invoke(cli, args)
+    assert result.exit_code == 0, result.output
+    assert "Cache: hit (hits: 1, similar: 0, misses: 1)" in result.output and "from cache, not billed" in result.output
+    assert stub.take_records() == [] and get_config("REC_OUTPUT") == answer
+    CliRunner().invoke(cli, [*args, "--no-cache"])
+    assert len(stub.take_records()) == 1
@@ -0,0 +1,35 @@
+from pathlib import Path
+
+from nl2sql import candidates
+from nl2sql.validate import load_validator
+
+SCHEMA = (Path(__file__).resolve().parent.parent / "schema.txt").read_text()
+
+
+def test_dedupe_counts_votes_across_formatting():
+    texts = ["SELECT * FROM orders;", "```sql\nselect *  from orders\n```", "SELECT 1", "  "]
+    assert candidates.dedupe(texts) == [("SELECT * FROM orders;", 2), ("SELECT 1", 1)]
+
+
+def test_rank_prefers_valid_then_smaller_plan_then_votes():
+    v = load_validator(SCHEMA, "postgres")
+    texts = ["SELECT order_state FROM orders",
+             "SELECT o.order_id FROM orders o JOIN customers c ON c.customer_id = o.customer_id",
+             "SELECT order_id FROM orders", "SELECT order_id FROM orders;"]
+    ranked = candidates.rank(texts, v)
+    assert [c["status"] for c in ranked] == ["ok", "ok", "error"]
+    assert ranked[0]["query"] == "SELECT order_id FROM orders" and ranked[0]["votes"] == 2
+    assert ranked[0]["plan"] < ranked[1]["plan"]
+    assert ranked[2]["error"] == "no such column: order_state"
+
+
+def test_next_candidate_walks_the_saved_set():
+    ranked = candidates.rank(["SELECT 1", "SELECT 2", "SELECT 3"])
+    candidates.save("q", SCHEMA, ranked)
+    assert candidates.next_candidate("other question", SCHEMA) is None
+    assert candidates.next_candidate("q", SCHEMA)[1:] == (2, 3)
+    candidate, position, total = candidates.next_candidate("q", SCHEMA)
+    assert (candidate["query"], position, total) == ("SELECT 3", 3, 3)
+    assert candidates.next_candidate("q", SCHEMA) is None
+    candidates.discard()
+    assert candidates.next_candidate("q", SCHEMA) is None
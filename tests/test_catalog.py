@@ -0,0 +1,43 @@
+from pathlib import Path
+
+from nl2sql import catalog as catalog_mod
+from nl2sql.catalog import Catalog, build_catalog, load_catalog
+
+SCHEMA = (Path(__file__).parent.parent / "schema.txt").read_text()
+
+
+def test_parses_schema_txt():
+    catalog = build_catalog(SCHEMA)
+    assert catalog.names == ["customers", "products", "orders", "order_items"]
+    orders = catalog.table("orders")
+    assert orders.primary_key == ["order_id"]
+    assert orders.column("status").check_values == ["Pending", "Shipped", "Delivered", "Cancelled"]
+    assert orders.column("order_date").type == "DATE" and not orders.column("order_date").nullable
+    assert catalog.table("customers").column("email").unique
+    assert catalog.table("order_items").referenced_tables() == {"orders", "products"}
+    assert catalog.neighbours("orders") == {"customers", "order_items"}
+    assert catalog.stats() == {"tables": 4, "columns": 24, "foreign_keys": 3, "checks": 1}
+
+
+def test_table_level_constraints_and_alter_foreign_keys():
+    catalog = build_catalog(
+        'CREATE TABLE IF NOT EXISTS "public"."line" (a INT, b VARCHAR(10) NOT NULL, checked_at DATE,\n'
+        "  CONSTRAINT pk PRIMARY KEY (a, b), CONSTRAINT ck CHECK (b IN ('x', 'y')));\n"
+        "CREATE TABLE head (id INT);\n"
+        "ALTER TABLE ONLY public.line ADD CONSTRAINT fk FOREIGN KEY (a) REFERENCES public.head(id);\n")
+    line = catalog.table("line")
+    assert line.primary_key == ["a", "b"] and line.column("b").primary_key
+    assert line.column("b").check_values == ["x", "y"]
+    assert line.column("checked_at").check_values is None
+    assert line.referenced_tables() == {"head"}
+
+
+def test_round_trip_and_parse_once(monkeypatch):
+    catalog = build_catalog(SCHEMA)
+    again = Catalog.from_dict(catalog.to_dict())
+    assert again.tables == catalog.tables
+
+    first = load_catalog(SCHEMA)
+    catalog_mod._loaded.clear()
+    monkeypatch.setattr(catalog_mod, "parse_schema", lambda text: (_ for _ in ()).throw(AssertionError("re-parsed")))
+    assert load_catalog(SCHEMA).tables == first.tables
@@ -0,0 +1,77 @@
+from pathlib import Path
+
+from click.testing import CliRunner
+
+from nl2sql import compact
+from nl2sql.catalog import build_catalog, load_catalog
+from nl2sql.cli import cli
+from nl2sql.compact import LEGEND, compact_lines, render, table_line
+from nl2sql.config import set_config
+from nl2sql.prune import estimate_tokens, prune_schema
+
+SCHEMA = (Path(__file__).parent.parent / "schema.txt").read_text()
+
+
+def test_table_line():
+    catalog = build_catalog(SCHEMA + """
+CREATE TABLE shipments (
+    order_id INT, line_no INT, carrier_code CHAR(3) REFERENCES carriers(code), weight REAL,
+    note VARCHAR(20) CHECK (note IN ('in transit', 'plain')), shipped_at TIMESTAMP NOT NULL,
+    priority SMALLINT CHECK (priority IN (1, 2, 3)), region_id INT REFERENCES regions(id) CHECK (region_id IN (1, 2)),
+    PRIMARY KEY (order_id, line_no),
+    FOREIGN KEY (order_id, line_no) REFERENCES order_lines(order_id, line_no)
+);
+CREATE TABLE carriers (id INT PRIMARY KEY, code CHAR(3) UNIQUE);""")
+    assert table_line(catalog.table("orders"), catalog) == (
+        "orders(order_id pk, customer_id→customers, order_date date, total_amount num, "
+        "status∈{Pending,Shipped,Delivered,Cancelled})")
+    assert table_line(catalog.table("shipments"), catalog) == (
+        "shipments(order_id int, line_no int, carrier_code→carriers.code, weight num, note∈{in transit,plain}, "
+        "shipped_at ts, priority int∈{1,2,3}, region_id→regions∈{1,2}, pk(order_id,line_no), "
+        "(order_id,line_no)→order_lines(order_id,line_no))")
+
+
+def test_compact_lines_are_built_once_and_stored(monkeypatch):
+    lines = compact_lines(SCHEMA)
+    assert list(lines) == ["customers", "products", "orders", "order_items"]
+    assert estimate_tokens(render(lines)) < estimate_tokens(SCHEMA) / 2
+    monkeypatch.setattr(compact, "_loaded", {})
+    monkeypatch.setattr(compact, "load_catalog", None)  # a later process only reads the store
+    assert compact_lines(SCHEMA) == lines
+    # no DDL, or names the catalog would lowercase: the schema goes out as given
+    monkeypatch.setattr(compact, "load_catalog", load_catalog)
+    assert compact_lines("db.users: {name, email}") is None
+    assert compact_lines('CREATE TABLE "Orders" ("OrderId" INT);') is None
+
+
+def test_ddl_is_kept_when_the_notation_would_lose_or_cost_something():
+    # a view or type the catalog does not parse would go missing
+    assert compact_lines(SCHEMA + "\nCREATE VIEW big_orders AS SELECT * FROM orders WHERE total_amount > 100;") is None
+    assert compact_lines(SCHEMA + "\nCREATE TYPE mood AS ENUM ('sad', 'ok');") is None
+    assert compact_lines(SCHEMA + "\nCREATE UNIQUE INDEX idx_email ON customers (email);") is not None
+    # on a single small table the legend outweighs what the notation saves
+    assert compact_lines("CREATE TABLE t (id INT PRIMARY KEY, name TEXT);") is None
+
+
+def test_prune_measures_and_sends_compact_lines():
+    filler = "\n".join(
+        f"CREATE TABLE audit_log_{i} (id INT PRIMARY KEY, payload TEXT, created_at DATE);" for i in range(200))
+    schema = SCHEMA + "\n" + filler
+    text, info = prune_schema(schema, "quantity of each product in order items", budget=200,
+                              lines=compact_lines(schema))
+    assert info["pruned"] and text.startswith(LEGEND)
+    assert "order_items(order_item_id pk, order_id→orders" in text and "audit_log" not in text
+    text, info = prune_schema(SCHEMA, "all products", budget=10_000, lines=compact_lines(SCHEMA))
+    assert text == render(compact_lines(SCHEMA)) and not info["pruned"]
+
+
+def test_convert_sends_the_compact_schema(stub):
+    set_config("SCHEMA", SCHEMA)
+    args = ["convert", "customers that bought twice", "--provider", "ollama", "--model", "m", "--no-cache"]
+    assert CliRunner().invoke(cli, args).exit_code == 0
+    set_config("SCHEMA_FORMAT", "compact")
+    result = CliRunner().invoke(cli, args)
+    assert result.exit_code == 0, result.output
+    assert "SELECT * FROM customers" in result.output  # the stub found the first table
+    ddl, dense = stub.take_records()
+    assert dense["prompt_bytes"] < ddl["prompt_bytes"] - len(SCHEMA) // 2
@@ -0,0 +1,115 @@
+import multiprocessing
+
+from nl2sql import config
+
+SCHEMA = "CREATE TABLE orders (\n    order_id INT PRIMARY KEY,\n    status VARCHAR(20)\n);" * 200
+
+
+def _writer(path, worker, rounds):
+    config.CONFIG_FILE = path
+    for i in range(rounds):
+        config.set_config(f"W{worker}", i)
+        config.set_config("REC_OUTPUT", f"SELECT {worker}, {i}")
+        assert config.get_config("SCHEMA") == SCHEMA
+
+
+def test_get_config_reads_the_file_once(monkeypatch):
+    config.save_config({"TYPE": "sqlite", "SCHEMA": SCHEMA})
+    reads = []
+    original = config._parse
+    monkeypatch.setattr(config, "_parse", lambda text: reads.append(1) or original(text))
+    for _ in range(6):
+        assert config.get_config("TYPE") == "sqlite"
+    assert reads == []  # still memoized from the write above
+
+    config.CONFIG_FILE.write_text("TYPE=mysql")  # another process edits the file
+    assert config.get_config("TYPE") == "mysql"
+    assert config.get_config("TYPE") == "mysql"
+    assert len(reads) == 1
+
+
+def test_set_config_keeps_other_keys():
+    config.save_config({"SCHEMA": SCHEMA, "TYPE": "sqlite", "API_KEY": None})
+    config.set_config("TYPE", "postgres")
+    assert config.load_config() == {"SCHEMA": SCHEMA, "TYPE": "postgres", "API_KEY": None}
+
+
+def test_concurrent_writers_lose_nothing():
+    config.save_config({"SCHEMA": SCHEMA})
+    workers, rounds = 8, 25
+    ctx = multiprocessing.get_context("spawn")
+    procs = [ctx.Process(target=_writer, args=(config.CONFIG_FILE, w, rounds)) for w in range(workers)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(60)
+    assert [p.exitcode for p in procs] == [0] * workers
+
+    data = config.load_config()
+    assert data["SCHEMA"] == SCHEMA
+    assert {data[f"W{w}"] for w in range(workers)} == {str(rounds - 1)}
+    assert not list(config.CONFIG_FILE.parent.glob("*.tmp"))
+
+
+def test_schema_lives_in_the_store():
+    config.save_config({"TYPE": "sqlite", "SCHEMA": SCHEMA})
+    text = config.CONFIG_FILE.read_text()
+    assert "CREATE TABLE" not in text and len(text) < 200
+    ref = config.load_config(resolve=False)[config.SCHEMA_REF]
+    assert (config.schema_store() / f"{ref}.sql").read_text() == SCHEMA
+    config.set_config("REC_OUTPUT", "SELECT 1")  # a small write stays small
+    assert len(config.CONFIG_FILE.read_text()) < 250
+    config._schemas.clear()
+    assert config.get_config("SCHEMA") == SCHEMA and config.load_config()["SCHEMA"] == SCHEMA
+    config.set_config("SCHEMA", None)
+    assert config.get_config("SCHEMA") is None
+
+
+def test_inline_schema_moves_to_the_store_on_the_next_write():
+    config.CONFIG_FILE.write_text("SCHEMA=" + SCHEMA.replace("\n", "\\n") + "\nTYPE=sqlite")
+    assert config.get_config("SCHEMA") == SCHEMA
+    config.set_config("TYPE", "postgres")
+    assert "CREATE TABLE" not in config.CONFIG_FILE.read_text()
+    assert list(config.load_config()) == ["SCHEMA", "TYPE"] and config.get_config("SCHEMA") == SCHEMA
+
+
+def test_named_schemas_switch_without_reading_them_again(tmp_path, monkeypatch):
+    from click.testing import CliRunner
+
+    from nl2sql import cli as cli_module
+    runner = CliRunner()
+    (tmp_path / "app.sql").write_text("CREATE TABLE users (id INT);")
+    (tmp_path / "wh.sql").write_text("CREATE TABLE facts (id INT, amount REAL);")
+    config.set_config("API_KEY", "k")
+    runner.invoke(cli_module.cli, ["method", "--name", "app", "--extract", str(tmp_path / "app.sql")])
+    runner.invoke(cli_module.cli, ["method", "--name", "warehouse", "--extract", str(tmp_path / "wh.sql")])
+    assert "* warehouse" in runner.invoke(cli_module.cli, ["use"]).output
+
+    monkeypatch.setattr(cli_module, "_build_catalog", None)  # switching parses nothing
+    result = runner.invoke(cli_module.cli, ["use", "app"])
+    assert result.exit_code == 0 and "Using schema 'app'" in result.output, result.output
+    assert config.get_config("SCHEMA") == "CREATE TABLE users (id INT);"
+    assert config.get_config("SCHEMA_NAME") == "app" and config.get_config("API_KEY") == "k"
+    assert "no saved schema 'nope'" in runner.invoke(cli_module.cli, ["use", "nope"]).output
+    runner.invoke(cli_module.cli, ["use", "warehouse"])
+    assert "facts" in config.get_config("SCHEMA")
+
+
+def test_pruned_schemas_take_their_catalogs_and_sqlite_copies_along():
+    from nl2sql.catalog import load_catalog
+    from nl2sql.compact import compact_lines
+    from nl2sql.validate import build_database
+    config.save_config({"SCHEMA": "CREATE TABLE named (id INT);"})
+    config.name_schema("named", config.load_config(resolve=False))
+    schemas = [f"CREATE TABLE t{i} (id INT PRIMARY KEY, name TEXT);" for i in range(config._KEEP_SCHEMAS + 4)]
+    for schema in ["CREATE TABLE named (id INT);", *schemas]:
+        config.set_config("SCHEMA", schema)
+        load_catalog(schema)
+        compact_lines(schema)
+        build_database(schema)
+
+    stored = {p.stem for p in config.schema_store().glob("*.sql")}
+    assert len(stored) == config._KEEP_SCHEMAS + 2  # the current, the named one and the latest few
+    derived = [*(config.STATE_DIR / "catalogs").glob("*"), *(config.STATE_DIR / "sqlite").glob("*")]
+    assert {p.name.split(".", 1)[0] for p in derived} == stored
+    assert len(derived) == 3 * len(stored)
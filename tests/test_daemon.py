@@ -0,0 +1,106 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+from click.testing import CliRunner
+
+from nl2sql import cli as cli_module, daemon
+from nl2sql.cli import cli
+from nl2sql.config import get_config, set_config
+from nl2sql.transport import get_transport
+
+
+@pytest.fixture
+def stub(stub):
+    set_config("DEFAULT_PROVIDER", "ollama")
+    return stub
+
+
+@pytest.fixture(params=["unix", "http"])
+def served(request, stub, tmp_path):
+    jobs = []
+
+    async def handler(job, emit):
+        jobs.append(job)
+        return await cli_module._daemon_job(job, emit, None)
+
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+    unix, port = (str(tmp_path / "d.sock"), None) if request.param == "unix" else (None, 0)
+    task = loop.create_task(daemon.serve(handler, unix, port, lambda info: ready.set()))
+
+    def run():
+        loop.run_until_complete(task)
+        # close the connections the jobs opened on this loop before dropping it
+        for client in get_transport()._async_clients.get(loop, {}).values():
+            loop.run_until_complete(client.close())
+        loop.close()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    assert ready.wait(5)
+    yield jobs
+    loop.call_soon_threadsafe(task.cancel)
+    thread.join(5)
+
+
+def test_convert_and_assist_forward_to_the_daemon(served, stub):
+    assert daemon.running()
+    result = CliRunner().invoke(cli, ["convert", "all orders", "--model", "m", "--no-cache", "--stream", "--no-local"])
+    assert result.exit_code == 0, result.output
+    assert "SELECT * FROM orders" in result.output
+    assert "Validation: passed EXPLAIN" in result.output
+    assert [job["kind"] for job in served] == ["convert"]
+    assert get_config("REC_OUTPUT").startswith("SELECT * FROM orders")
+    result = CliRunner().invoke(cli, ["assist", "explain", "--model", "m", "--no-cache"])
+    assert result.exit_code == 0, result.output
+    assert "This query reads the table" in result.output
+    assert [job["kind"] for job in served] == ["convert", "explain"]
+    assert len(stub.take_records()) == 2
+
+
+def test_a_slow_job_does_not_stall_the_other_clients(served, stub, monkeypatch):
+    from nl2sql import validate
+    started, release = threading.Event(), threading.Event()
+    load = validate.load_validator
+
+    def slow_load(schema, query_type):
+        started.set()
+        release.wait(5)  # a large schema being built into SQLite
+        return load(schema, query_type)
+
+    monkeypatch.setattr(validate, "load_validator", slow_load)
+    slow = threading.Thread(target=daemon.forward, args=({"kind": "convert", "nl_query": "all orders",
+                                                          "query_type": "SQL", "provider": "ollama", "model": "m",
+                                                          "no_cache": True, "no_local": True},))
+    slow.start()
+    try:
+        assert started.wait(5)
+        t0 = time.perf_counter()
+        assert daemon.running()
+        assert time.perf_counter() - t0 < 1
+    finally:
+        release.set()
+        slow.join(5)
+    assert [job["kind"] for job in served] == ["convert"]
+
+
+def test_daemon_refuses_a_wrong_token(served, stub):
+    info = daemon.read_info()
+    info["token"] = "nope"
+    daemon.info_path().write_text(json.dumps(info))
+    with pytest.raises(RuntimeError, match="wrong token"):
+        daemon.forward({"kind": "ping"})
+    assert served == []
+
+
+def test_stale_daemon_file_falls_back_to_in_process(stub, tmp_path):
+    daemon.info_path().write_text(json.dumps({"pid": 1, "token": "x", "unix": str(tmp_path / "gone.sock"),
+                                              "http": "127.0.0.1:9"}))
+    assert daemon.running() is None
+    result = CliRunner().invoke(cli, ["convert", "all orders", "--model", "m", "--no-cache", "--no-local"])
+    assert result.exit_code == 0, result.output
+    assert "SELECT * FROM orders" in result.output
+    assert len(stub.take_records()) == 1
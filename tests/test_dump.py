@@ -0,0 +1,118 @@
+import pytest
+from click.testing import CliRunner
+
+from nl2sql.catalog import build_catalog
+from nl2sql.cli import cli
+from nl2sql.config import get_config, set_config
+from nl2sql.dump import extract_ddl
+
+PG_DUMP = r"""--
+-- PostgreSQL database dump
+--
+SET standard_conforming_strings = on;
+SELECT pg_catalog.set_config('search_path', '', false);
+
+CREATE FUNCTION public.touch() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+  NEW.updated := now(); -- CREATE TABLE nope (id int);
+  RETURN NEW;
+END;
+$$;
+
+--
+-- Name: customers; Type: TABLE; Schema: public
+--
+CREATE TABLE public.customers (
+    id integer NOT NULL,
+    name text DEFAULT 'a;b'::text,
+    status text CHECK (status IN ('Active', 'Closed'))
+);
+
+CREATE TABLE public.orders (
+    id integer NOT NULL,
+    customer_id integer
+);
+
+CREATE VIEW public.active AS SELECT * FROM public.customers WHERE status = 'Active';
+
+COPY public.customers (id, name, status) FROM stdin;
+1	semi; CREATE TABLE nope (id int);	Active
+2	back\\slash \. not the end	Closed
+\.
+
+INSERT INTO public.orders VALUES (1, 'C:\');
+INSERT INTO public.orders VALUES (2, 'it''s; CREATE TABLE nope (id int);');
+
+ALTER TABLE ONLY public.customers
+    ADD CONSTRAINT customers_pkey PRIMARY KEY (id);
+ALTER TABLE ONLY public.orders
+    ADD CONSTRAINT orders_customer_fkey FOREIGN KEY (customer_id) REFERENCES public.customers(id);
+CREATE INDEX orders_customer ON public.orders USING btree (customer_id);
+GRANT ALL ON TABLE public.orders TO reporting;
+"""
+
+MYSQL_DUMP = r"""/*!40101 SET NAMES utf8mb4 */;
+DROP TABLE IF EXISTS `users`;
+CREATE TABLE `users` (
+  `id` int NOT NULL AUTO_INCREMENT,
+  `bio` text,
+  PRIMARY KEY (`id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+LOCK TABLES `users` WRITE;
+/*!40000 ALTER TABLE `users` DISABLE KEYS */;
+INSERT INTO `users` VALUES (1,'it\'s; CREATE TABLE nope (id int);'),(2,'a \\');
+INSERT INTO `users` VALUES (3,'line\nbreak;\n');
+/*!40000 ALTER TABLE `users` ENABLE KEYS */;
+UNLOCK TABLES;
+DELIMITER ;;
+/*!50003 CREATE*/ /*!50003 TRIGGER `t` BEFORE INSERT ON `users` FOR EACH ROW SET NEW.bio = 'x;' */;;
+DELIMITER ;
+/*!50001 CREATE ALGORITHM=UNDEFINED */
+/*!50013 DEFINER=`root`@`localhost` SQL SECURITY DEFINER */
+/*!50001 VIEW `v` AS select `users`.`id` AS `id` from `users` */;
+"""
+
+
+def test_pg_dump_keeps_only_the_ddl(tmp_path):
+    path = tmp_path / "shop.sql"
+    path.write_text(PG_DUMP)
+    ddl, info = extract_ddl(path)
+    assert "nope" not in ddl and "GRANT" not in ddl and "FUNCTION" not in ddl
+    assert info["statements"] == 6 and info["skipped"] > 0
+    assert "CREATE INDEX orders_customer" in ddl and "CREATE VIEW public.active" in ddl
+    catalog = build_catalog(ddl)
+    assert catalog.names == ["customers", "orders"]
+    assert catalog.table("orders").foreign_keys[0].ref_table == "customers"
+    assert catalog.column("customers", "status").check_values == ["Active", "Closed"]
+
+
+def test_mysqldump_keeps_only_the_ddl(tmp_path):
+    path = tmp_path / "users.sql"
+    path.write_text(MYSQL_DUMP)
+    ddl, info = extract_ddl(path)
+    assert "nope" not in ddl and "TRIGGER" not in ddl and "DISABLE KEYS" not in ddl
+    assert info["statements"] == 2
+    assert "ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;" in ddl
+    assert "VIEW `v` AS select `users`.`id` AS `id` from `users`;" in ddl and "/*!" not in ddl
+
+
+def test_pg_dump_archives_are_refused(tmp_path):
+    path = tmp_path / "shop.dump"
+    path.write_bytes(b"PGDMP\x01\x0e\x00")
+    with pytest.raises(ValueError, match="pg_restore"):
+        extract_ddl(path)
+
+
+def test_method_extract_stores_the_ddl_of_a_dump(tmp_path):
+    set_config("DEFAULT_PROVIDER", "ollama")
+    dump = tmp_path / "shop.sql"
+    dump.write_text(PG_DUMP)
+    result = CliRunner().invoke(cli, ["method", "--extract", str(dump)])
+    assert result.exit_code == 0 and "INSERT/COPY data skipped" in result.output, result.output
+    assert "COPY" not in get_config("SCHEMA") and "CREATE TABLE public.orders" in get_config("SCHEMA")
+    assert get_config("DEFAULT_PROVIDER") == "ollama"
+    # a schema file without data is taken as written, comments and all
+    plain = tmp_path / "schema.sql"
+    plain.write_text("-- the shop\nCREATE TABLE t (id INT);\nCOMMENT ON TABLE t IS 'rows';\n")
+    CliRunner().invoke(cli, ["method", "--extract", str(plain)])
+    assert get_config("SCHEMA") == plain.read_text()
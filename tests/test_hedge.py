@@ -0,0 +1,115 @@
+import asyncio
+import multiprocessing
+import os
+import re
+import time
+
+import pytest
+from click.testing import CliRunner
+
+from nl2sql import providers
+from nl2sql.cli import cli
+from nl2sql.hedge import latency_saved, parse_backends, parse_duration, race, record_race, typical_latencies
+
+
+def _backend(delays, started, cancelled, fail=()):
+    async def call(provider, model):
+        started.append(provider)
+        try:
+            await asyncio.sleep(delays[provider])
+        except asyncio.CancelledError:
+            cancelled.append(provider)
+            raise
+        if provider in fail:
+            raise RuntimeError("503")
+        return f"SELECT '{provider}'", 1, 1
+    return call
+
+
+def test_race_keeps_fastest_and_cancels_the_rest():
+    started, cancelled = [], []
+    call = _backend({"free": 0.5, "ollama": 0.01, "openai": 0.3}, started, cancelled)
+    result, info = asyncio.run(race([("free", None), ("ollama", "m"), ("openai", "x")], call))
+    assert result[0] == "SELECT 'ollama'"
+    assert info["winner"] == "ollama:m"
+    assert sorted(cancelled) == ["free", "openai"]
+    assert sorted(info["cancelled"]) == ["free", "openai:x"]
+
+
+def test_hedge_only_starts_after_the_deadline():
+    started, cancelled = [], []
+    call = _backend({"free": 0.01, "ollama": 0.01}, started, cancelled)
+    _, info = asyncio.run(race([("free", None), ("ollama", "m")], call, hedge_after=0.2))
+    assert started == ["free"] and info["winner"] == "free"
+
+    started.clear()
+    call = _backend({"free": 1.0, "ollama": 0.01}, started, cancelled)
+    _, info = asyncio.run(race([("free", None), ("ollama", "m")], call, hedge_after=0.05))
+    assert info["winner"] == "ollama:m"
+    assert 0.05 <= info["launched"]["ollama:m"] < 0.5
+    assert info["elapsed"] < 0.5
+
+
+def test_failure_hedges_at_once_and_all_failing_raises():
+    started, cancelled = [], []
+    call = _backend({"free": 0.01, "ollama": 0.01}, started, cancelled, fail={"free"})
+    _, info = asyncio.run(race([("free", None), ("ollama", "m")], call, hedge_after=5))
+    assert info["winner"] == "ollama:m" and "free" in info["failed"]
+    assert info["elapsed"] < 1
+
+    call = _backend({"free": 0.01, "ollama": 0.01}, started, cancelled, fail={"free", "ollama"})
+    with pytest.raises(RuntimeError, match="every backend failed"):
+        asyncio.run(race([("free", None), ("ollama", "m")], call))
+
+
+def test_latency_saved_uses_the_primary_typical_latency():
+    info = {"winner": "ollama:m", "elapsed": 3.0, "launched": {"free": 0.0, "ollama:m": 2.0},
+            "cancelled": ["free"], "failed": {}}
+    assert latency_saved(info, ("free", None)) is None  # nothing known about free yet
+    record_race(info)
+    assert typical_latencies() == {"free": 3.0, "ollama:m": 1.0}
+    record_race({**info, "elapsed": 20.0})  # a slow run pushes free's typical latency up
+    assert latency_saved(info, ("free", None)) == pytest.approx(3.0 + 0.3 * 17.0 - 3.0)
+
+
+def _record_races(k, n):
+    for i in range(n):
+        backend = f"ollama:m{k}-{i}"
+        record_race({"winner": backend, "elapsed": 1.0, "launched": {backend: 0.0}, "cancelled": [], "failed": {}})
+
+
+@pytest.mark.skipif(os.name == "nt", reason="needs fork")
+def test_races_recorded_by_concurrent_processes_all_count():
+    ctx = multiprocessing.get_context("fork")
+    workers = [ctx.Process(target=_record_races, args=(k, 40)) for k in range(4)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    assert len(typical_latencies()) == 160
+
+
+def test_hedge_timer_starts_after_the_clients_are_ready(stub, monkeypatch):
+    # the first client in a process costs an SDK import, here a blocking pause
+    slow, client = [0.4], providers.OpenAICompatible._client
+
+    def first_slow(self):
+        time.sleep(slow.pop() if slow else 0)
+        return client(self)
+
+    monkeypatch.setattr(providers.OpenAICompatible, "_client", first_slow)
+    stub.config.latency = 0.3
+    result = CliRunner().invoke(cli, ["convert", "all orders", "--race", "ollama:m,free", "--hedge-after", "10ms",
+                                      "--no-cache", "--no-local", "--no-validate"])
+    assert result.exit_code == 0 and "Error" not in result.output, result.output
+    assert float(re.search(r"free started at \+(\d+\.\d+)s", result.output).group(1)) < 0.15
+
+
+def test_parse_helpers():
+    assert parse_duration("2s") == 2.0 and parse_duration("250ms") == 0.25 and parse_duration("1.5") == 1.5
+    with pytest.raises(ValueError):
+        parse_duration("soon")
+    assert parse_backends("free, ollama:llama3,openai", "gpt-4o-mini") == [
+        ("free", None), ("ollama", "llama3"), ("openai", "gpt-4o-mini")]
+    with pytest.raises(ValueError):
+        parse_backends("bard")
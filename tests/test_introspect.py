@@ -0,0 +1,79 @@
+import sqlite3
+
+from click.testing import CliRunner
+
+from nl2sql import introspect
+from nl2sql.catalog import build_catalog
+from nl2sql.cli import cli
+from nl2sql.config import get_config, set_config
+from nl2sql.introspect import connect, ddl_from_information_schema, read_dbapi, read_sqlite
+
+SHOP = """
+CREATE TABLE customers (customer_id INTEGER PRIMARY KEY, name TEXT NOT NULL);
+CREATE TABLE orders (
+    order_id INTEGER PRIMARY KEY,
+    customer_id INT REFERENCES customers(customer_id),
+    status TEXT CHECK (status IN ('Open', 'Closed'))
+);
+CREATE VIEW open_orders AS SELECT * FROM orders WHERE status = 'Open';
+CREATE VIRTUAL TABLE notes USING fts5(body);
+INSERT INTO customers VALUES (1, 'Ann');
+"""
+
+
+def _shop(tmp_path):
+    path = tmp_path / "shop.db"
+    conn = sqlite3.connect(path)
+    conn.executescript(SHOP)
+    conn.close()
+    return path
+
+
+def test_read_sqlite(tmp_path):
+    path = _shop(tmp_path)
+    ddl, fingerprint = read_sqlite(path)
+    assert "CREATE VIEW open_orders" in ddl and "notes_data" not in ddl and "INSERT" not in ddl
+    assert fingerprint == introspect.sqlite_fingerprint(path)
+    catalog = build_catalog(ddl)
+    assert catalog.names == ["customers", "orders", "notes"]  # the virtual table from its pragmas
+    assert catalog.table("orders").foreign_keys[0].ref_table == "customers"
+    assert catalog.column("orders", "status").check_values == ["Open", "Closed"]
+    assert read_dbapi(connect("sqlite3:connect", str(path)))[0] == ddl
+
+
+def test_ddl_from_information_schema():
+    columns = [("public", "customers", "id", "integer", "NO"), ("public", "orders", "id", "integer", "NO"),
+               ("public", "orders", "customer_id", "integer", "YES"), ("pg_catalog", "pg_class", "oid", "oid", "NO")]
+    keys = [("public", "customers", "customers_pkey", "PRIMARY KEY", "id"),
+            ("public", "orders", "orders_pkey", "PRIMARY KEY", "id"),
+            ("public", "orders", "orders_customer_fk", "FOREIGN KEY", "customer_id")]
+    references = [("public", "orders_customer_fk", "customers", "id")]
+    catalog = build_catalog(ddl_from_information_schema(columns, keys, references))
+    assert catalog.names == ["customers", "orders"]
+    assert catalog.table("orders").primary_key == ["id"]
+    assert catalog.table("orders").foreign_keys[0].ref_table == "customers"
+    assert not catalog.column("orders", "id").nullable
+
+
+def test_method_from_sqlite_refreshes_only_on_change(tmp_path, monkeypatch):
+    path = _shop(tmp_path)
+    set_config("DEFAULT_PROVIDER", "ollama")
+    set_config("REC_Q", "all customers")
+    result = CliRunner().invoke(cli, ["method", "--from-sqlite", str(path)])
+    assert result.exit_code == 0 and "Schema read from" in result.output, result.output
+    assert get_config("DEFAULT_PROVIDER") == "ollama" and get_config("REC_Q") is None
+    assert "CREATE TABLE orders" in get_config("SCHEMA")
+
+    read = introspect.read_sqlite
+    monkeypatch.setattr(introspect, "read_sqlite", lambda p: (_ for _ in ()).throw(AssertionError("re-read")))
+    result = CliRunner().invoke(cli, ["method", "--refresh"])
+    assert "Schema unchanged" in result.output, result.output
+
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE refunds (refund_id INTEGER PRIMARY KEY, order_id INT REFERENCES orders(order_id))")
+    conn.close()
+    monkeypatch.setattr(introspect, "read_sqlite", read)
+    result = CliRunner().invoke(cli, ["method", "--refresh"])
+    assert "Schema read from" in result.output, result.output
+    assert "CREATE TABLE refunds" in get_config("SCHEMA")
+    assert get_config("SCHEMA_FINGERPRINT") == introspect.sqlite_fingerprint(path)
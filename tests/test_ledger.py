@@ -0,0 +1,42 @@
+import io
+import json
+
+from nl2sql import ledger
+
+
+def test_record_appends_one_line_per_call():
+    ledger.record("convert", "ollama", "llama3", "CREATE TABLE t (id INT)", 0.5, 100, 20)
+    ledger.record("retry", "free", None, "CREATE TABLE t (id INT)", 0.1, ok=False, error="HTTP 500")
+    lines = ledger._path().read_text().splitlines()
+    assert len(lines) == 2 and all(len(json.loads(line)) == len(ledger.FIELDS) for line in lines)
+    entries = ledger.read()
+    assert [e["command"] for e in entries] == ["convert", "retry"]
+    assert entries[1]["ok"] == 0 and entries[1]["error"] == "HTTP 500"
+    assert [e["command"] for e in ledger.read(command="retry")] == ["retry"]
+
+
+def test_summary_ignores_hits_for_latency_and_skips_torn_lines():
+    for latency in (1.0, 2.0, 3.0, 4.0):
+        ledger.record("convert", "ollama", "m", "s", latency, 10, 40)
+    ledger.record("convert", "ollama", "m", "s", 0.001, 10, 40, hit=True)
+    ledger.record("convert", "openai", "gpt", "s", 1.0, ok=False, error="timeout")
+    with open(ledger._path(), "a") as f:
+        f.write('[1700000000.0,"convert","oll')  # a write cut short by a crash
+    rows = ledger.summarize(ledger.read(), by=("provider", "model"))
+    ollama, openai = rows
+    assert (ollama["calls"], ollama["hits"], ollama["errors"]) == (5, 1, 0)
+    assert (ollama["p50"], ollama["p95"]) == (2.0, 4.0)
+    assert ollama["tokens_per_sec"] == 16.0  # 160 tokens over 10 seconds
+    assert (openai["errors"], openai["p50"], openai["tokens_per_sec"]) == (1, 0.0, 0.0)
+
+
+def test_export_csv_and_json():
+    ledger.record("explain", "free", None, "s", 2.0, 5, 50)
+    rows = ledger.summarize(ledger.read())
+    out = io.StringIO()
+    ledger.export(rows, "csv", out)
+    header, line = out.getvalue().splitlines()
+    assert header.startswith("provider,model,day,calls") and line.startswith("free,,")
+    out = io.StringIO()
+    ledger.export(rows, "json", out)
+    assert json.loads(out.getvalue())[0]["tokens_per_sec"] == 25.0
@@ -0,0 +1,132 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from nl2sql import llm, providers
+from nl2sql.config import set_config
+from nl2sql.transport import Transport, set_transport
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    active = peak = 0
+    lock = threading.Lock()
+    prompts = []
+    auth = []
+
+    def do_POST(self):
+        cls = type(self)
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        with cls.lock:
+            cls.active += 1
+            cls.peak = max(cls.peak, cls.active)
+            cls.prompts.append(body)
+            cls.auth.append(self.headers.get("Authorization"))
+        time.sleep(0.05)
+        with cls.lock:
+            cls.active -= 1
+        if self.path.endswith("/chat/completions"):
+            out = {"id": "x", "object": "chat.completion", "created": 0, "model": body["model"],
+                   "choices": [{"index": 0, "finish_reason": "stop",
+                                "message": {"role": "assistant", "content": " SELECT 2 "}}],
+                   "usage": {"prompt_tokens": 11, "completion_tokens": 3, "total_tokens": 14,
+                             "prompt_tokens_details": {"cached_tokens": 8}}}
+        else:
+            out = {"response": "SELECT 1", "usage": {"input_tokens": 7, "output_tokens": 2}}
+        data = json.dumps(out).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    _Handler.active = _Handler.peak = 0
+    _Handler.prompts, _Handler.auth = [], []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    monkeypatch.setattr(llm, "FREE_URL", base + "/api/chat")
+    monkeypatch.setitem(providers.BASE_URLS, "ollama", base + "/v1")
+    set_config("SCHEMA", "CREATE TABLE t (id INT)")
+    set_transport(Transport())
+    yield base
+    set_transport(Transport())
+    server.shutdown()
+    server.server_close()
+
+
+def test_sync_wrapper_answers_free_and_openai_compatible(stub):
+    assert providers.complete("free", None, "", "convert", "CREATE TABLE t (id INT)", "sqlite",
+                              nl_query="all rows") == ("SELECT 1", 7, 2)
+    assert "all rows" in _Handler.prompts[-1]["message"]
+    # second call reuses the thread's loop and its pooled client
+    assert providers.complete("ollama", "llama3", "", "retry", "CREATE TABLE t (id INT)", "sqlite",
+                              rec_q="all rows", rec_o="SELECT 1", reason="wrong table") == ("SELECT 2", 11, 3)
+    assert "wrong table" in _Handler.prompts[-1]["messages"][1]["content"]
+
+
+def test_free_endpoint_is_sent_no_api_key(stub):
+    providers.complete("free", None, "", "convert", "CREATE TABLE t (id INT)", "sqlite", nl_query="all rows")
+    providers.complete("ollama", "llama3", "", "convert", "CREATE TABLE t (id INT)", "sqlite", nl_query="all rows")
+    free, ollama = _Handler.auth
+    assert free is None and ollama.startswith("Bearer ")
+
+
+def test_per_provider_limit_caps_requests_in_flight(stub):
+    set_config("OLLAMA_CONCURRENCY", "3")
+
+    async def burst():
+        ollama = providers.get_provider("ollama", "llama3")
+        return await asyncio.gather(*[
+            ollama.complete("explain", "CREATE TABLE t (id INT)", "sqlite", rec_q="q", rec_o="SELECT 1")
+            for _ in range(12)])
+
+    start = time.perf_counter()
+    results = providers.run(burst())
+    elapsed = time.perf_counter() - start
+    assert len(results) == 12
+    assert _Handler.peak == 3
+    assert elapsed >= 4 * 0.05  # 12 requests, 3 at a time
+
+
+def test_unknown_provider():
+    with pytest.raises(ValueError):
+        providers.get_provider("bard")
+
+
+def test_complete_many_tops_up_single_choice_servers(stub):
+    texts, i_tokens, o_tokens = providers.run(providers.get_provider("ollama", "llama3").complete_many(
+        "convert", "CREATE TABLE t (id INT)", "sqlite", 3, nl_query="all rows"))
+    # the stub ignores `n`, so two more requests make up the difference
+    assert texts == ["SELECT 2"] * 3 and (i_tokens, o_tokens) == (33, 9)
+    assert _Handler.prompts[0]["n"] == 3 and len(_Handler.prompts) == 3
+
+
+def test_prompts_share_a_byte_stable_prefix_with_the_task_last():
+    schema = "CREATE TABLE t (id INT)"
+    prompts = [llm.AsyncOpenAI.prompt("convert", schema, "sqlite", nl_query="all rows"),
+               llm.AsyncOpenAI.prompt("retry", schema, "sqlite", rec_q="all rows", rec_o="SELECT 1", reason="wrong"),
+               llm.AsyncOpenAI.prompt("explain", schema, "sqlite", rec_q="all rows", rec_o="SELECT 1")]
+    assert len({system for system, _ in prompts}) == 1 and schema in prompts[0][0]
+    assert all("all rows" not in system for system, _ in prompts)
+    free = llm.free_prompt("retry", schema, "sqlite", rec_q="all rows", rec_o="SELECT 1", reason="wrong")
+    assert free.startswith(prompts[0][0]) and free.endswith(prompts[1][1])
+
+
+def test_cached_prompt_tokens_are_counted(stub):
+    ollama = providers.get_provider("ollama", "llama3")
+    providers.run(ollama.complete("convert", "CREATE TABLE t (id INT)", "sqlite", nl_query="all rows"))
+    providers.run(ollama.complete("convert", "CREATE TABLE t (id INT)", "sqlite", nl_query="all rows"))
+    assert ollama.cached_tokens == 16
+    assert providers.get_provider("free").cached_tokens == 0
@@ -0,0 +1,32 @@
+from pathlib import Path
+
+from nl2sql.prune import estimate_tokens, prune_schema, tokenize
+
+SCHEMA = (Path(__file__).parent.parent / "schema.txt").read_text()
+
+
+def test_tokenize_splits_identifiers():
+    assert tokenize("orderItems order_items Customers") == ["order", "item", "order", "item", "customer"]
+
+
+def test_small_schema_is_left_alone():
+    text, info = prune_schema(SCHEMA, "all products", budget=10_000)
+    assert text == SCHEMA and not info["pruned"]
+
+
+def test_prune_keeps_relevant_tables_and_fk_neighbours():
+    filler = "\n".join(
+        f"CREATE TABLE audit_log_{i} (id INT PRIMARY KEY, payload TEXT, created_at DATE);" for i in range(200))
+    schema = SCHEMA + "\n" + filler
+    text, info = prune_schema(schema, "quantity of each product in order items", budget=400)
+    assert info["pruned"]
+    assert info["tables"][0] == "order_items"
+    assert {"orders", "products"} <= set(info["tables"])
+    assert "audit_log" not in text
+    assert info["tokens_after"] == estimate_tokens(text) <= 400 < info["tokens_before"]
+
+
+def test_no_match_falls_back_to_full_schema():
+    filler = "\n".join(f"CREATE TABLE t{i} (id INT);" for i in range(100))
+    text, info = prune_schema(filler, "weather tomorrow", budget=50)
+    assert text == filler and not info["pruned"]
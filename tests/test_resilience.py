@@ -0,0 +1,130 @@
+import multiprocessing
+import os
+import time
+
+import pytest
+from click.testing import CliRunner
+
+from nl2sql import providers, resilience
+from nl2sql.cli import cli
+from nl2sql.config import set_config
+from nl2sql.transport import Transport, set_transport
+
+SCHEMA = "CREATE TABLE t (id INT)"
+
+
+@pytest.fixture
+def stub(stub, monkeypatch):
+    monkeypatch.setattr(resilience, "BACKOFF_BASE", 0.01)
+    set_config("SCHEMA", SCHEMA)
+    return stub
+
+
+def _ask(provider="ollama"):
+    return providers.complete(provider, "m", "", "convert", SCHEMA, "sqlite", nl_query="all rows")
+
+
+def test_transient_failures_are_retried(stub):
+    stub.config.fail_first, stub.config.error_status = 2, 503
+    assert _ask()[0].startswith("SELECT * FROM t")
+    assert [r["status"] for r in stub.take_records()] == [503, 503, 200]
+    assert resilience.circuits() == {}  # the success closed it again
+    stub.config.fail_first = 1
+    assert _ask("free")[0].startswith("SELECT * FROM t")
+    assert len(stub.take_records()) == 2
+
+
+def test_rejected_requests_are_not_retried(stub):
+    stub.config.fail_first, stub.config.error_status = 1, 400
+    with pytest.raises(Exception):
+        _ask()
+    assert len(stub.take_records()) == 1
+    assert resilience.circuits() == {}
+
+
+def test_retry_after_is_honoured_within_the_deadline(stub):
+    stub.config.fail_first, stub.config.error_status, stub.config.retry_after = 1, 429, 0.3
+    _ask()
+    first, second = stub.take_records()
+    assert second["start"] - first["end"] >= 0.3
+    # a pause that would run past the deadline fails at once instead
+    stub.config.fail_first = 1
+    start = time.perf_counter()
+    with resilience.within(0.2), pytest.raises(resilience.DeadlineExceeded, match="past the deadline"):
+        _ask()
+    assert time.perf_counter() - start < 0.2 and len(stub.take_records()) == 1
+
+
+def test_deadline_cuts_a_stalled_request(stub):
+    stub.config.latency = 2
+    start = time.perf_counter()
+    with resilience.within(0.3), pytest.raises(resilience.DeadlineExceeded):
+        _ask()
+    assert time.perf_counter() - start < 1
+    assert resilience.circuits() == {}  # running out of time is not the provider's failure
+
+
+def test_circuit_opens_across_invocations_and_closes_after_a_trial(stub):
+    set_config("RETRY_ATTEMPTS", "2")
+    set_config("BREAKER_THRESHOLD", "3")
+    stub.config.error_rate, stub.config.error_status = 1.0, 502
+    with pytest.raises(Exception, match="502"):
+        _ask()
+    with pytest.raises(resilience.CircuitOpen, match="failed 3 times in a row"):
+        _ask()  # the first try is the third failure in a row, so no second one
+    assert len(stub.take_records()) == 3
+    # a new process reads the same state and does not even try
+    set_transport(Transport())
+    stub.config.error_rate = 0.0
+    with pytest.raises(resilience.CircuitOpen):
+        _ask()
+    assert stub.take_records() == []
+    assert _ask("free")[0].startswith("SELECT")  # other providers are not affected
+    stub.take_records()
+    # once the cooldown is over a single trial request goes through
+    set_config("BREAKER_COOLDOWN", "0.2")
+    time.sleep(0.25)
+    assert _ask()[0].startswith("SELECT")
+    assert len(stub.take_records()) == 1 and resilience.circuits() == {}
+
+
+def _fail(n):
+    for _ in range(n):
+        resilience.record_failure("ollama")
+
+
+@pytest.mark.skipif(os.name == "nt", reason="needs fork")
+def test_failures_counted_by_concurrent_processes_all_count():
+    ctx = multiprocessing.get_context("fork")
+    workers = [ctx.Process(target=_fail, args=(50,)) for _ in range(4)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    assert resilience.circuits()["ollama"]["failures"] == 200
+
+
+def test_convert_deadline_option(stub):
+    stub.config.latency = 2
+    args = ["convert", "all rows", "--provider", "ollama", "--model", "m", "--no-cache", "--no-local"]
+    start = time.perf_counter()
+    result = CliRunner().invoke(cli, [*args, "--deadline", "300ms"])
+    assert time.perf_counter() - start < 1.5
+    assert "Error:" in result.output and "before the deadline" in result.output
+    result = CliRunner().invoke(cli, [*args, "--deadline", "soon"])
+    assert result.exit_code != 0 and "invalid duration" in result.output
+
+
+def test_assist_runs_in_process_within_the_deadline(stub):
+    args = ["--provider", "ollama", "--model", "m", "--no-cache"]
+    result = CliRunner().invoke(cli, ["convert", "all rows", *args, "--no-local", "--no-validate"])
+    assert result.exit_code == 0 and "Error" not in result.output, result.output
+    stub.take_records()
+    for action in (["retry", "wrong table"], ["explain"]):
+        result = CliRunner().invoke(cli, ["assist", *action, *args, "--deadline", "5s"])
+        assert result.exit_code == 0 and "Error" not in result.output, result.output
+    assert len(stub.take_records()) == 2
+    stub.config.latency = 2
+    start = time.perf_counter()
+    result = CliRunner().invoke(cli, ["assist", "explain", *args, "--deadline", "300ms"])
+    assert time.perf_counter() - start < 1.5 and "before the deadline" in result.output
@@ -0,0 +1,92 @@
+import pytest
+from click.testing import CliRunner
+
+from nl2sql.catalog import build_catalog
+from nl2sql.cli import cli
+from nl2sql.config import set_config
+from nl2sql.rules import generate
+
+SCHEMA = """
+CREATE TABLE customers (customer_id INT PRIMARY KEY, first_name VARCHAR(50), last_name VARCHAR(50),
+    city VARCHAR(50), state VARCHAR(50), email VARCHAR(100));
+CREATE TABLE products (product_id INT PRIMARY KEY, name VARCHAR(100), price DECIMAL(10, 2), category VARCHAR(50));
+CREATE TABLE orders (order_id INT PRIMARY KEY, customer_id INT NOT NULL, order_date DATE NOT NULL,
+    total_amount DECIMAL(10, 2) NOT NULL,
+    status VARCHAR(20) CHECK (status IN ('Pending', 'Shipped', 'Delivered', 'Cancelled')),
+    FOREIGN KEY (customer_id) REFERENCES customers(customer_id));
+"""
+
+
+@pytest.mark.parametrize("question, sql", [
+    ("show all customers", "SELECT * FROM customers;"),
+    ("customers in state CA", "SELECT * FROM customers WHERE state = 'CA';"),
+    ("how many orders are shipped", "SELECT COUNT(*) AS count FROM orders WHERE status = 'Shipped';"),
+    ("orders not cancelled", "SELECT * FROM orders WHERE status != 'Cancelled';"),
+    ("count orders by status", "SELECT status, COUNT(*) AS count FROM orders GROUP BY status;"),
+    ("average price of products", "SELECT AVG(price) AS avg_price FROM products;"),
+    ("delivered orders with total amount at least 1,000",
+     "SELECT * FROM orders WHERE status = 'Delivered' AND total_amount >= 1000;"),
+    ("top 5 products by price?", "SELECT * FROM products ORDER BY price DESC LIMIT 5;"),
+    ("products with price over 10 and price under 20",
+     "SELECT * FROM products WHERE price > 10 AND price < 20;"),
+    ("orders shipped and not cancelled",
+     "SELECT * FROM orders WHERE status = 'Shipped' AND status != 'Cancelled';"),
+    ("customers whose last name is O'Neil", "SELECT * FROM customers WHERE last_name = 'O''Neil';"),
+    ("count orders by customer state",
+     "SELECT customers.state, COUNT(*) AS count FROM orders JOIN customers ON orders.customer_id = "
+     "customers.customer_id GROUP BY customers.state;"),
+])
+def test_simple_questions_are_answered_locally(question, sql):
+    assert " ".join(generate(build_catalog(SCHEMA), question, "PostgreSQL").split()) == sql
+
+
+@pytest.mark.parametrize("question", [
+    "customers who never ordered",  # a word the rules do not know
+    "orders with status Lost",  # not a value the CHECK allows
+    "products with price over cheap",  # not a number
+    "products in category Home and Garden",  # a value split by a filler word
+    "customers with orders",  # names a table it does not use
+    "average price",  # no table
+    "customers with email john@x.com",  # characters that are not words: never dropped
+    "products with name like %phone%",
+    "orders total amount over 50%",
+    "customers in state CA, TX",
+    "customers whose email is null",  # NULL, LIKE and BETWEEN are not values
+    "customers whose email is not null",
+    "products with price between 10 and 20",
+    "customers with state CA or NY",  # either of two values: IN, not one value
+    "orders with status Shipped or Pending",
+    "orders with status Shipped and Pending",
+    "orders with status Shipped and status Pending",
+    "shipped and pending orders",
+])
+def test_anything_else_falls_through(question):
+    assert generate(build_catalog(SCHEMA), question, "PostgreSQL") is None
+
+
+def test_dialects():
+    catalog = build_catalog(SCHEMA)
+    assert generate(catalog, "top 3 products by price", "SQL Server").startswith("SELECT TOP 3 *")
+    assert generate(catalog, "top 3 products by price", "Oracle").endswith("FETCH FIRST 3 ROWS ONLY;")
+    assert generate(catalog, "top 3 products by price", "mongo db") is None
+
+
+@pytest.fixture
+def stub(stub):
+    set_config("SCHEMA", SCHEMA)
+    return stub
+
+
+def test_convert_answers_locally_and_falls_back_to_the_model(stub):
+    args = ["--provider", "ollama", "--model", "m", "--no-cache"]
+    result = CliRunner().invoke(cli, ["convert", "shipped orders", *args])
+    assert result.exit_code == 0, result.output
+    assert "WHERE status = 'Shipped'" in result.output
+    assert "Answered by: local rules" in result.output
+    assert stub.take_records() == []
+    result = CliRunner().invoke(cli, ["convert", "shipped orders", *args, "--no-local"])
+    assert "Answered by" not in result.output
+    assert len(stub.take_records()) == 1
+    set_config("LOCAL_RULES", "off")
+    CliRunner().invoke(cli, ["convert", "shipped orders", *args])
+    assert len(stub.take_records()) == 1
@@ -0,0 +1,27 @@
+from click.testing import CliRunner
+
+from nl2sql.cli import cli
+from nl2sql.config import get_config
+
+
+def test_shell_answers_several_questions_in_one_process(stub):
+    session = "all orders\n:explain\n:retry wrong columns\n:type postgres\n:history\n:quit\n"
+    result = CliRunner().invoke(cli, ["shell", "--provider", "ollama", "--model", "m", "--no-cache", "--no-local",
+                                      "--no-validate"], input=session)
+    assert result.exit_code == 0, result.output
+    assert result.output.count("SELECT * FROM orders") >= 3
+    assert "This query reads the table" in result.output
+    assert "Query type set to 'postgres'" in result.output
+    records = stub.take_records()
+    assert [r["path"] for r in records] == ["/v1/chat/completions"] * 3
+    # the session is kept in memory; only the last answer is left for `assist` afterwards
+    assert get_config("REC_Q") == "all orders"
+    assert get_config("TYPE") == "sqlite"
+
+
+def test_shell_commands_need_an_answer_first(stub):
+    result = CliRunner().invoke(cli, ["shell", "--provider", "ollama", "--no-validate"], input=":explain\n:bogus\n")
+    assert result.exit_code == 0, result.output
+    assert "Nothing to explain yet" in result.output
+    assert "Unknown command :bogus" in result.output
+    assert stub.take_records() == []
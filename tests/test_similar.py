@@ -0,0 +1,84 @@
+import pytest
+from click.testing import CliRunner
+
+from nl2sql.cache import ResponseCache
+from nl2sql.cli import cli
+from nl2sql.config import set_config
+from nl2sql.similar import features, similarity, vocabulary
+
+
+@pytest.mark.parametrize("a, b, alike", [
+    ("orders under 1000$", "orders below $1,000", True),
+    ("show me all customers in paris", "customers in Paris", True),
+    ("orders under 1000", "orders under 2000", False),
+    ("orders under 1000", "orders over 1000", False),
+    ("customers in paris", "customers not in paris", False),
+    ("customers named 'Ann'", "customers named 'Bob'", False),
+    ("orders by status", "customers by country", False),
+])
+def test_similarity_folds_wording_but_not_values(a, b, alike):
+    assert (similarity(features(a), features(b)) >= 0.8) is alike
+
+
+SHOP = """CREATE TABLE customers (customer_id INT PRIMARY KEY, name TEXT, state TEXT);
+CREATE TABLE orders (order_id INT PRIMARY KEY, customer_id INT REFERENCES customers(customer_id),
+    order_date DATE, total_amount REAL, status TEXT CHECK (status IN ('Pending', 'Shipped')));
+CREATE TABLE products (product_id INT PRIMARY KEY, name TEXT, category TEXT, price REAL);"""
+
+LONG = "with their customer name, order id, order date and total amount for each customer"
+
+
+@pytest.mark.parametrize("a, b", [
+    (f"orders {LONG} sorted by order date ascending", f"orders {LONG} sorted by order date descending"),
+    (f"orders with status Shipped {LONG}", f"orders with status Pending {LONG}"),
+    (f"orders of customers in state California {LONG}", f"orders of customers in state Texas {LONG}"),
+    (f"average price of products per category with product name and product id",
+     f"maximum price of products per category with product name and product id"),
+    (f"products in category Electronics with product name, product id and price per category",
+     f"products in category Books with product name, product id and price per category"),
+])
+def test_one_meaningful_word_apart_is_not_alike(a, b, tmp_path):
+    words = vocabulary(SHOP)
+    fa, fb = features(a, words), features(b, words)
+    assert len(fa & fb) / len(fa | fb) >= 0.8  # close enough to have passed on wording alone
+    assert similarity(fa, fb) == 0.0
+    cache = ResponseCache(tmp_path / "c.db")
+    cache.put_similar("s", a, "SELECT 1", vocabulary=words)
+    assert cache.find_similar("s", b, 0.8, words) is None
+    assert cache.find_similar("s", "show me " + a, 0.8, words)[0] == "SELECT 1"
+
+
+def test_vocabulary_keeps_names_and_leaves_out_values():
+    words = vocabulary(SHOP)
+    assert {"order", "customer", "total", "amount", "state", "category"} <= words
+    assert "shipped" not in words and "pending" not in words
+    assert "shipped" not in vocabulary("orders(order_id pk, status∈{Pending,Shipped})")
+    assert features("orders in Texas", words) == {"order", "in", "~texa"}
+
+
+def test_find_similar_scopes_and_evicts(tmp_path):
+    cache = ResponseCache(tmp_path / "c.db", max_similar=3)
+    cache.put_similar("s1", "orders under 1000$", "SELECT * FROM orders WHERE total < 1000", 50, 9)
+    response, i_tokens, o_tokens, question, score = cache.find_similar("s1", "Orders below 1000", 0.8)
+    assert (response, i_tokens, o_tokens, question, score) == (
+        "SELECT * FROM orders WHERE total < 1000", 50, 9, "orders under 1000$", 1.0)
+    assert cache.find_similar("s2", "orders below 1000", 0.8) is None  # another schema
+    assert cache.find_similar("s1", "orders below 5000", 0.8) is None
+    for i in range(3):
+        cache.put_similar("s1", f"customers from city {i}", f"SELECT {i}")
+    assert cache.find_similar("s1", "orders under 1000", 0.8) is None  # the oldest went first
+    assert cache.stats()["similar"] == 3
+
+
+def test_convert_reuses_a_near_duplicate_answer(stub):
+    args = ["--provider", "ollama", "--model", "m"]
+    assert CliRunner().invoke(cli, ["convert", "orders under 1000$", *args]).exit_code == 0
+    result = CliRunner().invoke(cli, ["convert", "show all orders below $1000", *args])
+    assert result.exit_code == 0, result.output
+    assert 'reused the answer to "orders under 1000$"' in result.output
+    assert "Cache: similar (hits: 0, similar: 1, misses: 2)" in result.output
+    assert len(stub.take_records()) == 1
+    set_config("SIMILAR_THRESHOLD", "off")
+    result = CliRunner().invoke(cli, ["convert", "every order below $1000", *args])
+    assert "reused the answer" not in result.output
+    assert len(stub.take_records()) == 1
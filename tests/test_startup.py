@@ -0,0 +1,10 @@
+from benchmarks.bench_startup import SUBCOMMANDS, run
+
+
+def test_quick_subcommands_stay_lazy():
+    # import budgets are generous on purpose, the module lists are the real gate
+    results = run([(argv, budget * 3, forbidden) for argv, budget, forbidden in SUBCOMMANDS])
+    for result in results:
+        assert result["returncode"] == 0, result["argv"]
+        assert result["forbidden"] == [], (result["argv"], result["forbidden"])
+        assert result["import_ms"] <= result["budget_ms"], result
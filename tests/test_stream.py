@@ -0,0 +1,38 @@
+import time
+
+from click.testing import CliRunner
+
+from nl2sql import cli as cli_module
+from nl2sql.cli import cli
+from nl2sql.config import get_config
+
+ARGS = ["convert", "all orders", "--provider", "ollama", "--model", "m", "--no-cache", "--no-local", "--no-validate"]
+
+
+def test_convert_stream_prints_tokens_as_they_arrive(stub, monkeypatch):
+    stub.config.latency, stub.config.tokens_per_sec, stub.config.completion_tokens = 0.1, 20, 6
+    result = CliRunner().invoke(cli, ARGS)
+    assert result.exit_code == 0 and "Error" not in result.output, result.output
+    plain = get_config("REC_OUTPUT")
+    assert "Time to first token" not in result.output
+    stub.take_records()
+
+    arrivals = []
+    write = cli_module._Streamer.__call__
+
+    def timed(self, delta):
+        arrivals.append((time.perf_counter(), delta))
+        write(self, delta)
+
+    monkeypatch.setattr(cli_module._Streamer, "__call__", timed)
+    result = CliRunner().invoke(cli, [*ARGS, "--stream"])
+    assert result.exit_code == 0 and "Error" not in result.output, result.output
+    [record] = stub.take_records()
+    # one write per token, the first long before the server sent the last one
+    assert len(arrivals) == 6
+    assert record["first_token"] <= arrivals[0][0] < record["end"] - 0.15
+    assert arrivals[-1][0] - arrivals[0][0] >= 0.2
+    streamed = "".join(delta for _, delta in arrivals).strip()
+    assert streamed == get_config("REC_OUTPUT") == plain
+    assert streamed in result.output
+    assert "Time to first token:" in result.output and "tokens/sec" in result.output
@@ -0,0 +1,49 @@
+import asyncio
+
+from nl2sql import trace
+
+
+def test_span_is_a_shared_noop_when_disabled():
+    assert not trace.enabled()
+    assert trace.span("a") is trace.span("b", x=1)
+    with trace.span("a"):
+        trace.record("b", 0.0, 1.0)
+
+
+def test_breakdown_nests_phases_under_their_parent():
+    tracer = trace.start()
+    try:
+        with trace.span("request"):
+            with trace.span("wait"):
+                pass
+        with trace.span("validate"):
+            pass
+        with trace.span("request"):
+            with trace.span("wait"):
+                pass
+            with trace.span("decode"):
+                pass
+    finally:
+        assert trace.stop() is tracer
+    rows = [(depth, name, count) for depth, name, _, count in tracer.breakdown()]
+    assert rows == [(0, "request", 2), (1, "wait", 2), (1, "decode", 1), (0, "validate", 1)]
+    assert trace.span("x") is trace.span("y")  # off again
+
+
+def test_concurrent_tasks_get_their_own_chrome_trace_rows():
+    tracer = trace.start()
+
+    async def call(i):
+        with trace.span("provider.request", n=i):
+            await asyncio.sleep(0.01)
+
+    async def main():
+        await asyncio.gather(call(1), call(2))
+
+    try:
+        asyncio.run(main())
+    finally:
+        trace.stop()
+    events = [e for e in tracer.chrome_trace()["traceEvents"] if e["ph"] == "X"]
+    assert len(events) == 2 and len({e["tid"] for e in events}) == 2
+    assert all(e["dur"] >= 10_000 for e in events) and events[0]["args"]["n"] in ("1", "2")
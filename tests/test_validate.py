@@ -0,0 +1,54 @@
+from pathlib import Path
+
+from nl2sql import validate
+from nl2sql.validate import is_sql, load_validator, split_statements
+
+SCHEMA = (Path(__file__).resolve().parent.parent / "schema.txt").read_text()
+
+
+def test_names_are_checked_in_any_sql_dialect():
+    v = load_validator(SCHEMA, "PostgreSQL")
+    assert v.check("SELECT o.order_id, c.email FROM orders o JOIN customers c USING (customer_id)") == ("ok", None)
+    assert v.check("SELECT order_state FROM orders") == ("error", "no such column: order_state")
+    assert v.check("SELECT * FROM order_lines")[0] == "error"
+    assert v.check("SELECT order_id FROM orders JOIN order_items USING (product_id)")[0] == "error"
+    # Postgres syntax SQLite does not know is reported, not treated as a failure
+    assert v.check("SELECT email FROM customers WHERE email ILIKE '%@x.com'")[0] == "unchecked"
+    assert v.check("```sql\nUPDATE orders SET status = 'Shipped;' WHERE order_id = 1; SELECT 1;\n```") == ("ok", None)
+
+
+def test_sqlite_type_is_strict_and_other_types_are_skipped():
+    assert load_validator(SCHEMA, "sqlite").check("SELECT NOW()")[0] == "error"
+    assert load_validator(SCHEMA, "mongo db") is None
+    assert not is_sql("nosql") and is_sql("MySQL") and is_sql("T-SQL")
+
+
+def test_database_is_cached_between_runs(monkeypatch):
+    validate._validators.clear()
+    load_validator(SCHEMA, "mysql")
+    validate._validators.clear()
+    monkeypatch.setattr(validate, "sqlite_script", lambda *a: (_ for _ in ()).throw(AssertionError("rebuilt")))
+    assert load_validator(SCHEMA, "mysql").check("SELECT price FROM products") == ("ok", None)
+
+
+def test_qualified_names_and_views():
+    schema = SCHEMA.replace("CREATE TABLE orders", "CREATE TABLE public.orders") + "\nCREATE VIEW recent_orders AS SELECT 1;"
+    v = load_validator(schema, "postgres")
+    assert v.check("SELECT status FROM public.orders") == ("ok", None)
+    assert v.check("SELECT nope FROM public.orders")[0] == "error"
+    assert v.check("SELECT * FROM recent_orders")[0] == "unchecked"
+
+
+def test_split_statements_respects_strings():
+    assert split_statements("SELECT ';'; SELECT 2") == ["SELECT ';';", "SELECT 2"]
+
+
+def test_changed_schema_patches_the_previous_database(monkeypatch):
+    validate.build_database(SCHEMA)
+    changed = SCHEMA[:SCHEMA.index("CREATE TABLE order_items")] + \
+        "CREATE TABLE refunds (refund_id INT PRIMARY KEY, order_id INT);"
+    monkeypatch.setattr(validate, "sqlite_script", lambda *a: (_ for _ in ()).throw(AssertionError("rebuilt")))
+    validate.build_database(changed, previous=SCHEMA)
+    v = load_validator(changed, "sqlite")
+    assert v.check("SELECT refund_id, status FROM refunds JOIN orders USING (order_id)") == ("ok", None)
+    assert v.check("SELECT * FROM order_items")[0] == "error"